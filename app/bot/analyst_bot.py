@@ -29,6 +29,7 @@ class AnalystBot:
 /trends - Анализ трендов
 /appeals - Последние обращения
 /charts - Графики и диаграммы
+/sla - Время до ответа
 /refresh - Обновить данные
 /help - Справка
 
@@ -47,7 +48,7 @@ class AnalystBot:
         """Показать статистику по муниципалитетам"""
         try:
             # Получаем статистику по муниципалитетам
-            stats = self.system.database.get_municipality_stats(30)
+            stats = await self.system.async_database.get_municipality_stats(30)
             
             if not stats:
                 await update.message.reply_text("❌ Нет данных по муниципалитетам за указанный период.")
@@ -93,8 +94,10 @@ class AnalystBot:
             await update.message.reply_text("🏛️ Генерирую графики по муниципалитетам...")
             
             # Получаем данные
-            stats = self.system.database.get_municipality_stats(30)
-            type_stats = self.system.database.get_municipality_type_stats(30)
+            stats, type_stats = await asyncio.gather(
+                self.system.async_database.get_municipality_stats(30),
+                self.system.async_database.get_municipality_type_stats(30)
+            )
             
             logger.info(f"📊 Получено {len(stats)} записей статистики по муниципалитетам")
             logger.info(f"📊 Получено {len(type_stats)} записей по типам обращений")
@@ -383,10 +386,12 @@ class AnalystBot:
         try:
             await update.message.reply_text("📊 Генерирую все графики...")
             
-            # Получаем данные за последние 30 дней
-            stats = self.system.database.get_appeals_stats(30)
-            municipality_stats = self.system.database.get_municipality_stats(30)
-            municipality_type_stats = self.system.database.get_municipality_type_stats(30)
+            # Получаем данные за последние 30 дней (запросы выполняются параллельно)
+            stats, municipality_stats, municipality_type_stats = await asyncio.gather(
+                self.system.async_database.get_appeals_stats(30),
+                self.system.async_database.get_municipality_stats(30),
+                self.system.async_database.get_municipality_type_stats(30)
+            )
             
             logger.info(f"📊 Получено {len(municipality_stats)} записей статистики по муниципалитетам")
             logger.info(f"📊 Получено {len(municipality_type_stats)} записей по типам обращений")
@@ -523,7 +528,8 @@ class AnalystBot:
             })
             
             # 3. График динамики обращений по дням
-            timeline_chart = self._create_timeline_chart(stats)
+            daily_stats = await self.system.async_database.get_municipality_trends(30)
+            timeline_chart = self._create_timeline_chart(daily_stats)
             if timeline_chart:
                 charts.append({
                     'figure': timeline_chart,
@@ -671,27 +677,20 @@ class AnalystBot:
         
         return fig
 
-    def _create_timeline_chart(self, stats):
-        """Создание графика динамики обращений по дням"""
+    def _create_timeline_chart(self, daily_stats):
+        """Создание графика динамики обращений по дням (по дневной статистике муниципалитетов)"""
         try:
-            # Получаем более детальные данные для временной шкалы
-            appeals = self.system.database.get_appeals({
-                'date_from': datetime.now() - timedelta(days=30)
-            }, limit=1000)
-            
-            if not appeals:
+            if not daily_stats:
                 return None
             
-            # Группируем по дням
+            # Суммируем по дням все муниципалитеты
             daily_counts = {}
-            for appeal in appeals:
-                if isinstance(appeal['created_at'], datetime):
-                    date_key = appeal['created_at'].date()
-                else:
-                    # Если это строка, преобразуем в datetime
-                    date_key = datetime.strptime(appeal['created_at'], '%Y-%m-%d %H:%M:%S').date()
+            for row in daily_stats:
+                date_key = row['date']
+                if isinstance(date_key, str):
+                    date_key = datetime.strptime(date_key, '%Y-%m-%d').date()
                 
-                daily_counts[date_key] = daily_counts.get(date_key, 0) + 1
+                daily_counts[date_key] = daily_counts.get(date_key, 0) + row['daily_count']
             
             # Сортируем по дате
             dates = sorted(daily_counts.keys())
@@ -726,7 +725,7 @@ class AnalystBot:
         """Показать актуальную статистику в реальном времени"""
         try:
             # Получаем актуальные данные из базы
-            stats = self.system.database.get_real_time_stats()
+            stats = await self.system.async_database.get_real_time_stats()
             
             if not stats:
                 await update.message.reply_text("❌ Нет данных для отображения.")
@@ -789,7 +788,7 @@ class AnalystBot:
         """Показать последние обращения (актуальные данные)"""
         try:
             # Получаем актуальные данные из базы
-            appeals = self.system.database.get_recent_appeals(5)
+            appeals = await self.system.async_database.get_recent_appeals(5)
             
             if not appeals:
                 await update.message.reply_text("📭 Нет обращений для отображения.")
@@ -815,6 +814,80 @@ class AnalystBot:
             logger.error(f"❌ Ошибка получения обращений: {e}")
             await update.message.reply_text("❌ Ошибка при получении обращений.")
 
+    @staticmethod
+    def _format_duration(seconds):
+        """Длительность в минутах, часах или днях"""
+        if seconds is None:
+            return '—'
+        if seconds < 3600:
+            return f"{round(seconds / 60)} мин"
+        if seconds < 86400:
+            return f"{seconds / 3600:.1f} ч"
+        return f"{seconds / 86400:.1f} дн"
+
+    async def show_sla_stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Показать время до ответа (медиана, p90, p99) по муниципалитетам и типам"""
+        try:
+            stats = await self.system.async_database.get_response_time_stats(30)
+            
+            if not stats or not stats['groups']:
+                await update.message.reply_text("❌ Нет обращений с ответом за последние 30 дней.")
+                return
+            
+            overall = stats['overall']
+            response = "⏱️ ВРЕМЯ ДО ОТВЕТА (30 дней)\n\n"
+            response += f"📊 Всего с ответом: {overall['responded_count']}\n"
+            response += (f"  • Медиана: {self._format_duration(overall['median_seconds'])}\n"
+                         f"  • p90: {self._format_duration(overall['p90_seconds'])}\n"
+                         f"  • p99: {self._format_duration(overall['p99_seconds'])}\n\n")
+            
+            response += "🏛️ По муниципалитетам и типам (топ-10 по числу ответов):\n"
+            for group in stats['groups'][:10]:
+                response += (f"  • {group['municipality']} / {group['appeal_type']} ({group['responded_count']} шт.): "
+                             f"медиана {self._format_duration(group['median_seconds'])}, "
+                             f"p90 {self._format_duration(group['p90_seconds'])}, "
+                             f"p99 {self._format_duration(group['p99_seconds'])}\n")
+            
+            response += f"\n⏰ Обновлено: {datetime.now().strftime('%H:%M:%S')}"
+            
+            await update.message.reply_text(response)
+            
+        except Exception as e:
+            logger.error(f"❌ Ошибка получения времени до ответа: {e}")
+            await update.message.reply_text("❌ Ошибка при получении времени до ответа.")
+
+    async def show_db_stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Показать задержки запросов к базе данных и медленные запросы"""
+        try:
+            stats = await self.system.async_database.get_query_stats(5)
+            
+            if not stats['queries']:
+                await update.message.reply_text("❌ Запросов к базе пока не было.")
+                return
+            
+            response = "🗄️ ЗАПРОСЫ К БАЗЕ ДАННЫХ\n\n"
+            response += "⏱️ Топ-10 по суммарному времени:\n"
+            for query in stats['queries'][:10]:
+                response += (f"  • {query['method']} / {query['query']}: {query['count']} шт., "
+                             f"p50 ≤{query['p50_ms']:g} мс, p95 ≤{query['p95_ms']:g} мс, "
+                             f"макс. {query['max_ms']:g} мс\n")
+            
+            waits = [wait for wait in stats['connection_wait'] if wait['max_ms'] >= 1]
+            if waits:
+                response += "\n🔌 Ожидание соединения:\n"
+                for wait in waits[:5]:
+                    response += f"  • {wait['method']}: среднее {wait['avg_ms']:g} мс, макс. {wait['max_ms']:g} мс\n"
+            
+            response += f"\n🐢 Медленных запросов (≥{stats['slow_query_ms']} мс): {stats['slow_queries_total']}\n"
+            for slow in reversed(stats['slow_queries']):
+                response += f"  • {slow['time']} {slow['method']} / {slow['query']}: {slow['elapsed_ms']:g} мс\n"
+            
+            await update.message.reply_text(response)
+            
+        except Exception as e:
+            logger.error(f"❌ Ошибка получения метрик запросов: {e}")
+            await update.message.reply_text("❌ Ошибка при получении метрик запросов.")
+
     async def refresh_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Принудительное обновление данных"""
         try:
@@ -836,7 +909,9 @@ class AnalystBot:
 */trends* - Анализ трендов за 30 дней
 */appeals* - Просмотр последних обращений
 */charts* - Графики и диаграммы
+*/sla* - Время до ответа: медиана, p90, p99
 */refresh* - Принудительное обновление данных
+*/dbstats* - Задержки запросов к базе данных
 */help* - Эта справка
 
 🏛️ *Статистика по муниципалитетам:*
@@ -897,6 +972,8 @@ class AnalystBot:
         self.application.add_handler(CommandHandler("appeals", self.show_recent_appeals))
         self.application.add_handler(CommandHandler("charts", self.show_charts))  # Теперь включает всё
         self.application.add_handler(CommandHandler("refresh", self.refresh_command))
+        self.application.add_handler(CommandHandler("sla", self.show_sla_stats))
+        self.application.add_handler(CommandHandler("dbstats", self.show_db_stats))
         self.application.add_handler(CommandHandler("help", self.help_command))
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
 
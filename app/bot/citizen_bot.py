@@ -2,9 +2,9 @@ from telegram import Update, ReplyKeyboardMarkup, InlineKeyboardMarkup, InlineKe
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, ConversationHandler, CallbackQueryHandler
 import logging
 import asyncio
-import mysql.connector
 from enum import Enum
 from bot.knowledge_base import knowledge_base
+from gigachat.circuit_breaker import OPEN
 
 logger = logging.getLogger(__name__)
 
@@ -21,15 +21,8 @@ class CitizenBot:
         self.application = None
         self.db_config = db_config
         self.knowledge_base = knowledge_base
+        self._reprocess_task = None
         
-    def get_settlements_db(self):
-        """Подключение к базе данных населенных пунктов"""
-        try:
-            return mysql.connector.connect(**self.db_config)
-        except Exception as e:
-            logger.error(f"Ошибка подключения к базе данных: {e}")
-            raise
-
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Команда начала работы"""
         welcome_text = """
@@ -120,31 +113,9 @@ class CitizenBot:
         # Сохраняем введенное название временно
         context.user_data['settlement_input'] = settlement_name
         
-        # Проверяем существование населенного пункта в базе
+        # Проверяем существование населенного пункта в базе (без блокировки event loop)
         try:
-            conn = self.get_settlements_db()
-            cursor = conn.cursor(dictionary=True)
-            
-            # Ищем точное совпадение по названию
-            cursor.execute(
-                "SELECT name, type, district, population FROM settlements WHERE name = %s",
-                (settlement_name,)
-            )
-            
-            exact_results = cursor.fetchall()
-            
-            # Если точное совпадение не найдено, ищем похожие
-            if not exact_results:
-                cursor.execute(
-                    "SELECT name, type, district, population FROM settlements WHERE name LIKE %s",
-                    (f'%{settlement_name}%',)
-                )
-                results = cursor.fetchall()
-            else:
-                results = exact_results
-            
-            cursor.close()
-            conn.close()
+            results = await self.system.async_database.find_settlements(settlement_name)
             
             # Убираем дубликаты
             unique_results = []
@@ -287,7 +258,7 @@ class CitizenBot:
                     address_info['district'] = settlement_info['district']
             
             # Обработка обращения с адресом
-            response = self.system.process_citizen_appeal(
+            response = await self.system.process_citizen_appeal_async(
                 user_id=str(user.id),
                 appeal_text=appeal_text,
                 platform="telegram",
@@ -536,7 +507,7 @@ class CitizenBot:
         user = update.message.from_user
         
         try:
-            appeals = self.system.database.get_appeals({
+            appeals = await self.system.async_database.get_appeals({
                 'user_id': str(user.id)
             }, limit=5)
             
@@ -623,13 +594,54 @@ class CitizenBot:
             pattern="^(main_menu|back_to_categories|category_.*|question_.*)$"
         ))
 
+    async def _reprocess_pending(self, application):
+        """Повторная обработка обращений, принятых без GigaChat, когда цепь снова
+        замкнута (или полуоткрыта - тогда первое обращение служит пробным запросом).
+        Граждане получают ответ по существу отдельным сообщением."""
+        while True:
+            await asyncio.sleep(self.system.reprocess_interval)
+            if self.system.circuit_breaker.state == OPEN:
+                continue
+            
+            try:
+                reprocessed = await self.system.reprocess_pending_appeals()
+            except Exception as e:
+                logger.error(f"❌ Ошибка повторной обработки обращений: {e}")
+                continue
+            
+            for appeal, response in reprocessed:
+                try:
+                    await application.bot.send_message(
+                        chat_id=int(appeal['user_id']),
+                        text=f"📬 Ответ на ваше обращение №{appeal['id']}:\n\n{response}"
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️ Не удалось отправить ответ на обращение {appeal['id']}: {e}")
+
+    async def _post_init(self, application):
+        """Запуск фонового обновления токена GigaChat до первого обращения
+        и повторной обработки обращений, принятых в резервном режиме"""
+        await self.system.async_gigachat.start()
+        self._reprocess_task = asyncio.create_task(self._reprocess_pending(application))
+
+    async def _post_shutdown(self, application):
+        """Остановка фоновых задач и закрытие соединений асинхронного клиента GigaChat в event loop бота"""
+        if self._reprocess_task is not None:
+            self._reprocess_task.cancel()
+            try:
+                await self._reprocess_task
+            except asyncio.CancelledError:
+                pass
+            self._reprocess_task = None
+        await self.system.async_gigachat.aclose()
+
     def run(self):
         """Запуск бота с созданием нового event loop"""
         try:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
             
-            self.application = Application.builder().token(self.token).build()
+            self.application = Application.builder().token(self.token).post_init(self._post_init).post_shutdown(self._post_shutdown).build()
             self.setup_handlers()
 
             logger.info("🤖 Бот для граждан запущен...")
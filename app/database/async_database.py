@@ -0,0 +1,87 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabaseManager:
+    """Неблокирующий фасад над DatabaseManager для асинхронных обработчиков ботов.
+
+    Синхронные методы DatabaseManager выполняются в отдельном ограниченном пуле
+    потоков, поэтому медленный запрос не останавливает event loop. Потоки фасада
+    берут соединения из собственного пула (pool.async_size в настройках базы), а не
+    из пула синхронных вызовов процесса. Размер пула потоков по умолчанию равен
+    размеру этого пула: каждый поток работает со своим соединением и не ждет
+    соседей в очереди.
+    """
+
+    def __init__(self, database, max_workers=None):
+        self.database = database
+        self.pool = database.create_async_pool()
+        self.max_workers = max_workers or self.pool.pool_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='async-db',
+            initializer=database.bind_thread_pool,
+            initargs=(self.pool,)
+        )
+        logger.info(f"✅ Асинхронный фасад базы данных инициализирован ({self.max_workers} потоков)")
+
+    async def run(self, func, *args, **kwargs):
+        """Выполнение блокирующего вызова базы данных в пуле потоков фасада"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def store_appeal(self, appeal_data):
+        return await self.run(self.database.store_appeal, appeal_data)
+
+    async def update_appeal(self, appeal_id, update_data):
+        return await self.run(self.database.update_appeal, appeal_id, update_data)
+
+    async def get_appeals(self, filters=None, limit=100, offset=0):
+        return await self.run(self.database.get_appeals, filters, limit, offset)
+
+    async def get_pending_appeals(self, status, limit=20):
+        return await self.run(self.database.get_pending_appeals, status, limit)
+
+    async def get_appeals_page(self, filters=None, limit=100, cursor=None):
+        return await self.run(self.database.get_appeals_page, filters, limit, cursor)
+
+    async def search_appeals(self, query, filters=None, cursor=None, limit=20):
+        return await self.run(self.database.search_appeals, query, filters, cursor, limit)
+
+    async def get_recent_appeals(self, limit=10):
+        return await self.run(self.database.get_recent_appeals, limit)
+
+    async def get_appeals_stats(self, period_days=30):
+        return await self.run(self.database.get_appeals_stats, period_days)
+
+    async def get_municipality_stats(self, period_days=30):
+        return await self.run(self.database.get_municipality_stats, period_days)
+
+    async def get_municipality_trends(self, period_days=30):
+        return await self.run(self.database.get_municipality_trends, period_days)
+
+    async def get_municipality_type_stats(self, period_days=30):
+        return await self.run(self.database.get_municipality_type_stats, period_days)
+
+    async def get_response_time_stats(self, period_days=30):
+        return await self.run(self.database.get_response_time_stats, period_days)
+
+    async def get_real_time_stats(self):
+        return await self.run(self.database.get_real_time_stats)
+
+    async def get_changes(self, since=None, limit=500):
+        return await self.run(self.database.get_changes, since, limit)
+
+    async def find_settlements(self, name):
+        return await self.run(self.database.find_settlements, name)
+
+    async def get_query_stats(self, slow_limit=20):
+        return await self.run(self.database.get_query_stats, slow_limit)
+
+    def shutdown(self, wait=True):
+        """Остановка пула потоков фасада"""
+        self._executor.shutdown(wait=wait)
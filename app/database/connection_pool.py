@@ -0,0 +1,224 @@
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector import errors as mysql_errors
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhaustedError(Error):
+    """Не удалось получить соединение из пула за отведенное время"""
+
+
+class PoolClosedError(Error):
+    """Пул соединений уже закрыт"""
+
+
+class ConnectionPool:
+    """Ограниченный потокобезопасный пул соединений MySQL.
+
+    Соединение выдается на время одного вызова (``with pool.connection()``),
+    при выдаче проверяется ping'ом не чаще чем раз в ``validation_interval``
+    секунд. Если все ``pool_size`` соединений заняты, вызывающий поток ждет
+    освобождения не дольше ``checkout_timeout`` секунд.
+    """
+
+    def __init__(self, db_config, pool_size=5, checkout_timeout=10.0,
+                 validation_interval=30.0, name='primary'):
+        if pool_size < 1:
+            raise ValueError("Размер пула должен быть не меньше 1")
+
+        self.db_config = db_config
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        self.validation_interval = validation_interval
+        self.name = name
+
+        self._condition = threading.Condition()
+        self._idle = []
+        self._validated_at = {}
+        self._created = 0
+        self._closed = False
+        self._pid = os.getpid()
+        self._stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats():
+        return {
+            'checkouts': 0,
+            'waits': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+            'timeouts': 0,
+            'validations': 0,
+            'reconnects': 0,
+            'discarded': 0
+        }
+
+    def _check_pid(self):
+        """Сброс соединений, унаследованных от родительского процесса после fork"""
+        if self._pid != os.getpid():
+            # Сокеты родителя не закрываем: они все еще принадлежат ему
+            self._idle = []
+            self._validated_at = {}
+            self._created = 0
+            self._pid = os.getpid()
+            self._stats = self._empty_stats()
+
+    def _open(self):
+        conn = mysql.connector.connect(**self.db_config)
+        conn.autocommit = True
+        logger.info(f"✅ Открыто соединение с MySQL (пул {self.name}, всего {self._created})")
+        return conn
+
+    def _open_validated(self):
+        """Новое соединение считается проверенным в момент открытия"""
+        conn = self._open()
+        self._validated_at[id(conn)] = time.monotonic()
+        return conn
+
+    def _close_quietly(self, conn):
+        self._validated_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _validate(self, conn):
+        """Проверка соединения при выдаче с ограничением частоты ping"""
+        now = time.monotonic()
+        if now - self._validated_at.get(id(conn), 0) < self.validation_interval:
+            return conn
+
+        self._stats['validations'] += 1
+        try:
+            conn.ping(reconnect=False)
+        except Error:
+            logger.warning(f"⚠️ Соединение пула {self.name} потеряно, переподключаемся")
+            self._stats['reconnects'] += 1
+            self._close_quietly(conn)
+            return self._open_validated()
+        self._validated_at[id(conn)] = time.monotonic()
+        return conn
+
+    def acquire(self):
+        """Получение соединения из пула (с ожиданием при исчерпании)"""
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        waited = False
+        conn = None
+
+        with self._condition:
+            self._check_pid()
+            while True:
+                if self._closed:
+                    raise PoolClosedError(msg=f"Пул соединений {self.name} закрыт")
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._created < self.pool_size:
+                    self._created += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolExhaustedError(
+                        msg=f"Нет свободных соединений в пуле {self.name} за {self.checkout_timeout} с"
+                    )
+                waited = True
+                self._condition.wait(remaining)
+
+            wait_ms = (time.monotonic() - started) * 1000
+            self._stats['checkouts'] += 1
+            self._stats['total_wait_ms'] += wait_ms
+            self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], wait_ms)
+            if waited:
+                self._stats['waits'] += 1
+
+        try:
+            return self._open_validated() if conn is None else self._validate(conn)
+        except Exception:
+            with self._condition:
+                self._created -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, conn, discard=False):
+        """Возврат соединения в пул"""
+        if self._pid != os.getpid():
+            return
+
+        if not discard:
+            try:
+                if getattr(conn, 'unread_result', False):
+                    # Недочитанный потоковый результат (прерванная выгрузка): соединение не переиспользуем
+                    discard = True
+                elif conn.in_transaction:
+                    conn.rollback()
+            except Error:
+                discard = True
+
+        with self._condition:
+            if discard or self._closed:
+                if discard:
+                    self._stats['discarded'] += 1
+                self._close_quietly(conn)
+                self._created -= 1
+            else:
+                self._idle.append(conn)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """Контекстный менеджер: соединение на время одного вызова"""
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+        except (mysql_errors.OperationalError, mysql_errors.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def get_stats(self):
+        """Метрики пула, включая время ожидания в очереди"""
+        with self._condition:
+            stats = dict(self._stats)
+            stats.update({
+                'name': self.name,
+                'pool_size': self.pool_size,
+                'open': self._created,
+                'idle': len(self._idle),
+                'in_use': self._created - len(self._idle),
+                'avg_wait_ms': round(stats['total_wait_ms'] / stats['checkouts'], 3) if stats['checkouts'] else 0.0
+            })
+            stats['total_wait_ms'] = round(stats['total_wait_ms'], 3)
+            stats['max_wait_ms'] = round(stats['max_wait_ms'], 3)
+            return stats
+
+    def close(self, timeout=5.0):
+        """Закрытие пула: ждем возврата выданных соединений и закрываем все"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._check_pid()
+            self._closed = True
+            while self._created > len(self._idle):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"⚠️ Пул {self.name}: {self._created - len(self._idle)} соединений не возвращено к закрытию")
+                    break
+                self._condition.wait(remaining)
+
+            for conn in self._idle:
+                self._close_quietly(conn)
+            self._created -= len(self._idle)
+            self._idle = []
+            self._condition.notify_all()
+
+        logger.info(f"🔌 Пул соединений {self.name} закрыт")
@@ -1,166 +1,435 @@
 import mysql.connector
 from mysql.connector import Error
 import logging
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import threading
+import time
 import json
+import base64
+from contextlib import contextmanager
+from database.connection_pool import ConnectionPool
+from database.migrations import MigrationRunner
+from database.replicas import ReplicaRouter
+from database.partitioning import AppealsPartitioner, partition_name
+from database.result_cache import ResultCache, cached_read
+from database.instrumentation import QueryMetrics, instrumented_connection, tracked
+from database.export import resolve_export_columns
+from database.lookups import LookupCache, LOOKUP_FIELDS, NO_CODE
+from database.district_resolver import DistrictResolver
+from database.write_behind import WriteBehindBuffer, WriteJournal
+from database.search import (
+    extract_terms, build_boolean_query, build_snippet,
+    encode_search_cursor, decode_search_cursor
+)
 
 logger = logging.getLogger(__name__)
 
+def encode_cursor(created_at, appeal_id):
+    """Непрозрачный курсор пагинации по паре (created_at, id)"""
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, appeal_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor):
+    """Разбор курсора пагинации, ValueError для некорректного значения"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii'))
+        created_at, appeal_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(appeal_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Некорректный курсор пагинации: {cursor}") from e
+
 class DatabaseManager:
     _instance = None
     _lock = threading.Lock()
+
+    # Поля, от которых зависят ключи дневного агрегата и счетчиков реального времени
+    AGGREGATE_KEY_FIELDS = ('created_at', 'district_code', 'type_code', 'status_code')
+    # Подпись обращений без района в статистике
+    NO_DISTRICT_LABEL = 'Не указан'
+    # Поля, копируемые в поисковую таблицу appeal_search
+    SEARCH_FIELDS = ('text', 'response')
+    # Поля изменения, которые сливаются с INSERT еще не записанного обращения из очереди
+    INSERT_MERGE_FIELDS = ('status', 'type', 'district', 'response', 'responded_at', 'settlement', 'street', 'house', 'full_address')
+    # Конечные статусы: переход в них фиксирует время ответа (responded_at)
+    TERMINAL_STATUSES = ('отвечено', 'закрыто')
+    # Поля, которые UPDATE не перезаписывает: время ответа - время первого ответа
+    WRITE_ONCE_FIELDS = ('responded_at',)
+    # Блокировка читаемых строк до конца транзакции (в SQLite не нужна: запись идет под блокировкой базы)
+    ROW_LOCK = 'FOR UPDATE'
     
-    def __new__(cls, config=None):
+    def __new__(cls, config=None, replica_config=None):
         with cls._lock:
             if cls._instance is None:
                 cls._instance = super(DatabaseManager, cls).__new__(cls)
                 if config:
-                    cls._instance._initialize(config)
+                    cls._instance._initialize(config, replica_config)
             return cls._instance
     
-    def _initialize(self, config):
-        self.config = config
-        self.connection = None
-        self._connect()
-        self._create_tables()
-    
-    def _connect(self):
-        """Подключение к MySQL"""
-        try:
-            self.connection = mysql.connector.connect(**self.config)
-            self.connection.autocommit = True
-            logger.info("✅ Успешное подключение к MySQL")
-        except Error as e:
-            logger.error(f"❌ Ошибка подключения к MySQL: {e}")
-            raise
+    def _initialize(self, config, replica_config=None):
+        # Параметры пула задаются во вложенном блоке "pool" и не передаются в mysql.connector
+        self.config = dict(config)
+        pool_config = self.config.pop('pool', None) or {}
+        # Секционирование: сколько месяцев создавать заранее и сколько хранить (без срока - не архивировать)
+        partition_config = self.config.pop('partitioning', None) or {}
+        self.partitioner = AppealsPartitioner(
+            future_months=partition_config.get('future_months', 3),
+            retention_months=partition_config.get('retention_months')
+        )
+        self._pool_config = pool_config
+        self.pool = self._create_pool(pool_config)
+        # Отдельный пул асинхронного фасада (create_async_pool) и пул, закрепленный за потоком
+        self.async_pool = None
+        self._thread_pools = threading.local()
+        # Кэш результатов статистики; версия данных перечитывается не чаще version_check_interval секунд
+        cache_config = self.config.pop('cache', None) or {}
+        self.cache = ResultCache(
+            max_entries=cache_config.get('max_entries', 256),
+            ttl=cache_config.get('ttl', 30)
+        )
+        self.version_check_interval = cache_config.get('version_check_interval', 1.0)
+        self._data_version = None
+        self._lookups_version = None
+        self._version_checked_at = 0.0
+        # Справочники статусов, типов и районов (код <-> название) в памяти процесса
+        self.lookups = LookupCache()
+        # Индекс населенный пункт -> район; перестраивается после перезагрузки settlements парсером
+        self.district_resolver = DistrictResolver()
+        self._settlements_version = None
+        # Метрики запросов и журнал медленных запросов
+        instrumentation_config = self.config.pop('instrumentation', None) or {}
+        self.metrics = QueryMetrics(
+            slow_query_ms=instrumentation_config.get('slow_query_ms', 500),
+            explain_slow=instrumentation_config.get('explain_slow', False),
+            slow_log_size=instrumentation_config.get('slow_log_size', 100),
+            slow_log_file=instrumentation_config.get('slow_log_file')
+        )
+        # Необязательные реплики для аналитических запросов на чтение
+        self.replicas = ReplicaRouter.from_config(replica_config) if replica_config else None
+        # Отложенная запись новых обращений: пакет пишется каждые max_rows операций или max_delay_ms
+        write_config = self.config.pop('write_behind', None) or {}
+        self._run_migrations()
+        # Многострочный INSERT допустим, только если сервер выдает его строкам ID подряд
+        self.consecutive_insert_ids = self._check_insert_id_mode()
+        self.write_buffer = None
+        if write_config.get('enabled'):
+            journal_dir = write_config.get('journal_dir', 'write_behind')
+            self.write_buffer = WriteBehindBuffer(
+                self._flush_write_batch,
+                journal=WriteJournal(journal_dir, fsync=write_config.get('fsync', True)) if journal_dir else None,
+                max_rows=write_config.get('max_rows', 100),
+                max_delay_ms=write_config.get('max_delay_ms', 200),
+                retry_interval=write_config.get('retry_interval', 5),
+                forget_journal=self._forget_write_journal
+            )
     
+    def _create_pool(self, pool_config, name='primary'):
+        return ConnectionPool(
+            self.config,
+            pool_size=pool_config.get('size', 5),
+            checkout_timeout=pool_config.get('checkout_timeout', 10),
+            validation_interval=pool_config.get('validation_interval', 30),
+            name=name
+        )
+
+    def create_async_pool(self):
+        """Пул соединений асинхронного фасада размером pool.async_size (по умолчанию как
+        основной): обработчики ботов не ждут соединений, занятых синхронными вызовами"""
+        if self.async_pool is None:
+            async_config = dict(self._pool_config, size=self._pool_config.get('async_size', self.pool.pool_size))
+            self.async_pool = self._create_pool(async_config, name='async')
+        return self.async_pool
+
+    def bind_thread_pool(self, pool):
+        """Соединения с основным сервером для текущего потока берутся из pool"""
+        self._thread_pools.pool = pool
+
+    def _primary_pool(self):
+        return getattr(self._thread_pools, 'pool', None) or self.pool
+
     def get_connection(self):
-        """Получение соединения с базой данных"""
+        """Получение соединения из пула на время одного вызова (with ... as conn)"""
         try:
-            if not self.connection or not self.connection.is_connected():
-                self._connect()
-            return self.connection
+            return instrumented_connection(self._primary_pool().connection(), self.metrics)
         except Error as e:
             logger.error(f"❌ Ошибка получения соединения: {e}")
             raise
 
-    def _create_tables(self):
-        """Создание таблиц для системы обращений и населенных пунктов"""
-        try:
-            cursor = self.connection.cursor()
-
-            # Таблица обращений (обновленная с полями для адреса)
-            create_appeals_table = """
-            CREATE TABLE IF NOT EXISTS appeals (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id VARCHAR(255) NOT NULL,
-                text TEXT NOT NULL,
-                type VARCHAR(100),
-                platform VARCHAR(50),
-                status VARCHAR(50) DEFAULT 'new',
-                response TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                responded_at TIMESTAMP NULL,
-                tags JSON,
-                settlement VARCHAR(255),
-                street VARCHAR(255),
-                house VARCHAR(50),
-                full_address TEXT,
-                district VARCHAR(255),  -- Добавлено поле для района
-                INDEX idx_user (user_id),
-                INDEX idx_type (type),
-                INDEX idx_status (status),
-                INDEX idx_created (created_at),
-                INDEX idx_settlement (settlement),
-                INDEX idx_district (district)  -- Добавлен индекс для района
-            )
-            """
+    def _read_connection(self, consistent=False):
+        """Соединение для запросов на чтение: реплика, если она настроена и
+        не требуется чтение собственных записей (consistent=True)"""
+        if self.replicas and not consistent:
+            return instrumented_connection(self.replicas.connection(self._primary_pool()), self.metrics)
+        return self.get_connection()
 
-            # Таблица трендов
-            create_trends_table = """
-            CREATE TABLE IF NOT EXISTS trends (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                keyword VARCHAR(255) NOT NULL,
-                frequency INT DEFAULT 0,
-                period DATE NOT NULL,
-                appeal_type VARCHAR(100),
-                UNIQUE KEY unique_trend (keyword, period, appeal_type)
-            )
-            """
+    @contextmanager
+    def _transaction(self):
+        """Курсор в рамках одной транзакции: commit при успехе, rollback при ошибке"""
+        with self.get_connection() as conn:
+            conn.start_transaction()
+            cursor = conn.cursor()
+            try:
+                yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
 
-            # Таблица населенных пунктов (для парсера)
-            create_settlements_table = """
-            CREATE TABLE IF NOT EXISTS settlements (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                type VARCHAR(100) NOT NULL,
-                district VARCHAR(255),
-                population INT,
-                latitude DECIMAL(10, 8),
-                longitude DECIMAL(11, 8),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX idx_name (name),
-                INDEX idx_district (district)
-            )
-            """
+    def get_pool_stats(self):
+        """Метрики пулов соединений (основной сервер, асинхронный фасад и реплики): занятость и время ожидания в очереди"""
+        return {
+            'primary': self.pool.get_stats(),
+            'async': self.async_pool.get_stats() if self.async_pool else None,
+            'replicas': self.replicas.get_stats() if self.replicas else []
+        }
+
+    def get_query_stats(self, slow_limit=20):
+        """Метрики запросов процесса: гистограммы задержек по методам и запросам,
+        время ожидания соединения и последние медленные запросы"""
+        return self.metrics.get_stats(slow_limit)
+
+    def get_cache_stats(self):
+        """Метрики кэша результатов: попадания, промахи, ожидания общего вычисления, вытеснения"""
+        stats = self.cache.get_stats()
+        stats['data_version'] = self._data_version
+        return stats
+
+    @tracked
+    def get_data_version(self):
+        """Текущая версия данных обращений (None, если прочитать ее не удалось).
+        
+        Версия хранится в базе и увеличивается каждой пишущей транзакцией, поэтому
+        записи из других процессов (боты, дашборд) тоже сбрасывают кэш.
+        """
+        now = time.monotonic()
+        if self._data_version is not None and now - self._version_checked_at < self.version_check_interval:
+            return self._data_version
+        
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT name, version FROM data_version WHERE name IN ('appeals', 'lookups', 'settlements')")
+                versions = dict(cursor.fetchall())
+                cursor.close()
+        except Error as e:
+            logger.warning(f"⚠️ Не удалось прочитать версию данных, кэш не используется: {e}")
+            return None
+        
+        # Переименование в справочниках другим процессом: перечитываем справочники
+        lookups_version = versions.get('lookups', 0)
+        if self._lookups_version is not None and lookups_version != self._lookups_version:
+            self.lookups.invalidate()
+        self._lookups_version = lookups_version
+        
+        # Парсер перезагрузил населенные пункты: индекс районов строится заново
+        settlements_version = versions.get('settlements', 0)
+        if self._settlements_version is not None and settlements_version != self._settlements_version:
+            self.district_resolver.invalidate()
+        self._settlements_version = settlements_version
+        
+        self._data_version = versions.get('appeals', 0)
+        self._version_checked_at = now
+        return self._data_version
+
+    def _bump_data_version(self, cursor, name='appeals'):
+        """Увеличение версии данных в транзакции вызывающего; возвращает новую версию.
+        
+        Строка версии заблокирована до конца транзакции, поэтому версии выдаются
+        в порядке фиксации транзакций: по версии 'appeals' нумеруется журнал изменений.
+        """
+        cursor.execute("UPDATE data_version SET version = version + 1 WHERE name = %s", (name,))
+        cursor.execute("SELECT version FROM data_version WHERE name = %s", (name,))
+        return cursor.fetchone()[0]
+
+    def _data_changed(self):
+        """Собственная запись процесса видна кэшу сразу, без ожидания интервала проверки"""
+        self._version_checked_at = 0.0
+
+    def _ensure_lookups(self, reload=False):
+        """Загрузка справочников, если они еще не загружены или устарели"""
+        self.get_data_version()
+        if reload or not self.lookups.loaded:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                self.lookups.load(cursor)
+                cursor.close()
+
+    def _label(self, field, code):
+        """Название по коду справочника; неизвестный код (добавлен другим процессом) - перезагрузка"""
+        self._ensure_lookups()
+        try:
+            return self.lookups.label(field, code)
+        except KeyError:
+            self._ensure_lookups(reload=True)
+        try:
+            return self.lookups.label(field, code)
+        except KeyError:
+            logger.warning(f"⚠️ Неизвестный код справочника {field}: {code}")
+            return None
 
-            cursor.execute(create_appeals_table)
-            cursor.execute(create_trends_table)
-            cursor.execute(create_settlements_table)
-            self.connection.commit()
+    def _code(self, field, label):
+        """Код существующего названия (None, если такого названия нет)"""
+        self._ensure_lookups()
+        return self.lookups.code(field, label)
+
+    def _ensure_code(self, field, label):
+        """Код названия с добавлением нового значения в справочник"""
+        if label is None:
+            return None
+        self._ensure_lookups()
+        code = self.lookups.code(field, label)
+        if code is not None:
+            return code
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            code = self.lookups.ensure_code(cursor, field, label)
             cursor.close()
-            logger.info("✅ Таблицы созданы успешно")
+        return code
+
+    def _status_codes(self, *labels):
+        """Коды статусов для условий в запросах (-1 для отсутствующего статуса: не совпадет ни с чем)"""
+        codes = [self._code('status', label) for label in labels]
+        return [-1 if code is None else code for code in codes]
+
+    @staticmethod
+    def _period_start(period_days):
+        """Первый день периода статистики: сегодня минус period_days дней"""
+        return date.today() - timedelta(days=period_days)
+
+    def _district_label(self, code):
+        return self._label('district', code) or self.NO_DISTRICT_LABEL
 
+    def _decorate_appeals(self, appeals):
+        """Замена кодов справочников в строках обращений на названия (status, type, district)"""
+        for appeal in appeals:
+            for field, (_, column) in LOOKUP_FIELDS.items():
+                if column in appeal:
+                    appeal[field] = self._label(field, appeal.pop(column))
+        return appeals
+
+    @tracked
+    def rename_lookup_label(self, field, old_label, new_label):
+        """Переименование статуса, типа или района: одна строка справочника вместо UPDATE всех обращений"""
+        if field not in LOOKUP_FIELDS:
+            raise ValueError(f"Неизвестный справочник: {field}")
+        table, _ = LOOKUP_FIELDS[field]
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(f"UPDATE {table} SET label = %s WHERE label = %s", (new_label, old_label))
+                renamed = cursor.rowcount
+                self._bump_data_version(cursor, 'lookups')
+                self._bump_data_version(cursor)
+            self.lookups.invalidate()
+            self._data_changed()
+            
+            logger.info(f"🏷️ Справочник {table}: '{old_label}' -> '{new_label}' ({renamed} записей)")
+            return renamed > 0
+            
         except Error as e:
-            logger.error(f"❌ Ошибка создания таблиц: {e}")
+            logger.error(f"❌ Ошибка переименования в справочнике: {e}")
             raise
 
+    @tracked
+    def _run_migrations(self):
+        """Приведение схемы базы к актуальной версии (таблица schema_version)"""
+        with self.get_connection() as conn:
+            return MigrationRunner(conn).run()
+
+    def _check_insert_id_mode(self):
+        """Выдает ли сервер подряд идущие ID строкам одного многострочного INSERT.
+        
+        Это гарантировано при auto_increment_increment = 1 и innodb_autoinc_lock_mode
+        0 или 1. При шаге больше 1 или режиме 2 (interleaved) ID строк пакета могут
+        перемежаться с ID параллельных вставок, и обращения пакета вставляются по одному.
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT @@auto_increment_increment, @@innodb_autoinc_lock_mode")
+                increment, lock_mode = cursor.fetchone()
+                cursor.close()
+        except Error as e:
+            logger.warning(f"⚠️ Не удалось проверить настройки AUTO_INCREMENT, пакеты вставляются построчно: {e}")
+            return False
+        
+        if int(increment) == 1 and int(lock_mode) in (0, 1):
+            return True
+        logger.warning(
+            f"⚠️ auto_increment_increment={increment}, innodb_autoinc_lock_mode={lock_mode}: "
+            f"ID многострочного INSERT могут идти не подряд, пакеты обращений вставляются построчно "
+            f"(для пакетной вставки нужны auto_increment_increment=1 и innodb_autoinc_lock_mode=1)"
+        )
+        return False
+
+    def _prepare_appeal_row(self, appeal_data, status='новое'):
+        """Список полей и значений для INSERT обращения (поля адреса добавляются, только если заполнены).
+        Статус, тип и район записываются кодами справочников."""
+        fields = ['user_id', 'text', 'type_code', 'platform', 'status_code', 'created_at']
+        values = [
+            appeal_data['user_id'],
+            appeal_data['text'],
+            self._ensure_code('type', appeal_data.get('type')),
+            appeal_data.get('platform'),
+            self._ensure_code('status', status),
+            appeal_data.get('created_at') or datetime.now()
+        ]
+        
+        # Добавляем ответ и поля адреса, если они есть
+        optional_fields = ['response', 'responded_at', 'settlement', 'street', 'house', 'full_address']
+        for field in optional_fields:
+            if field in appeal_data and appeal_data[field]:
+                fields.append(field)
+                values.append(appeal_data[field])
+        if appeal_data.get('district'):
+            fields.append('district_code')
+            values.append(self._ensure_code('district', appeal_data['district']))
+        
+        return fields, values
+
+    @tracked
     def store_appeal(self, appeal_data):
         """Сохранение обращения в базу с поддержкой адреса и автоматическим определением района"""
-        conn = self.get_connection()
         try:
-            cursor = conn.cursor()
-            
             # Если есть населенный пункт, но нет района, пытаемся определить район
             settlement = appeal_data.get('settlement')
             district = appeal_data.get('district')
             
             if settlement and not district:
                 # Пытаемся определить район по населенному пункту
-                district = self._determine_district_by_settlement(settlement)
+                district = self._resolve_district(settlement)
                 if district:
                     appeal_data['district'] = district
                     logger.info(f"📍 Автоматически определен район для {settlement}: {district}")
             
+            if self.write_buffer:
+                # Обращение подтверждается после записи в журнал, в базу оно попадет пакетом
+                if not appeal_data.get('created_at'):
+                    appeal_data['created_at'] = datetime.now()
+                appeal_id = self.write_buffer.submit_insert(appeal_data)
+                logger.info(f"🕒 Обращение поставлено в очередь записи, временный ID: {appeal_id}, район: {district}")
+                return appeal_id
+            
             # Определяем поля и значения в зависимости от наличия адреса
-            fields = ['user_id', 'text', 'type', 'platform', 'status', 'created_at']
-            placeholders = ['%s'] * len(fields)
-            values = [
-                appeal_data['user_id'],
-                appeal_data['text'],
-                appeal_data.get('type'),
-                appeal_data.get('platform'),
-                'новое',  # УЖЕ ИСПОЛЬЗУЕТСЯ РУССКИЙ СТАТУС
-                appeal_data.get('created_at')
-            ]
-            
-            # Добавляем поля адреса, если они есть
-            address_fields = ['settlement', 'street', 'house', 'full_address', 'district']
-            for field in address_fields:
-                if field in appeal_data and appeal_data[field]:
-                    fields.append(field)
-                    placeholders.append('%s')
-                    values.append(appeal_data[field])
+            # (УЖЕ ИСПОЛЬЗУЕТСЯ РУССКИЙ СТАТУС 'новое')
+            fields, values = self._prepare_appeal_row(appeal_data)
             
             query = f"""
             INSERT INTO appeals ({', '.join(fields)})
-            VALUES ({', '.join(placeholders)})
+            VALUES ({', '.join(['%s'] * len(fields))})
             """
             
-            cursor.execute(query, values)
-            appeal_id = cursor.lastrowid
-            cursor.close()
+            with self._transaction() as cursor:
+                cursor.execute(query, values)
+                appeal_id = cursor.lastrowid
+                self._apply_aggregate_deltas(cursor, appeal_id, 1)
+                self._record_arrivals(cursor, appeal_id)
+                self._index_for_search(cursor, appeal_id)
+                seq = self._bump_data_version(cursor)
+                self._log_changes(cursor, seq, inserted=[(appeal_id, appeal_id)])
+            self._data_changed()
             
             logger.info(f"💾 Сохранено обращение ID: {appeal_id}, район: {district}")
             return appeal_id
@@ -169,106 +438,474 @@ class DatabaseManager:
             logger.error(f"❌ Ошибка сохранения обращения: {e}")
             raise
 
-    def migrate_statuses_to_russian(self):
-        """Миграция статусов с английских на русские"""
-        conn = self.get_connection()
+    @tracked
+    def store_appeals(self, appeals_data, chunk_size=500):
+        """Пакетное сохранение обращений многострочными INSERT.
+        
+        Районы определяются один раз на каждый уникальный населенный пункт, строки
+        с одинаковым набором полей объединяются в INSERT по chunk_size строк, каждый
+        фрагмент записывается в своей транзакции. Возвращает ID в порядке входного списка.
+        Если сервер не гарантирует подряд идущие ID многострочному INSERT
+        (см. _check_insert_id_mode), строки фрагмента вставляются по одной.
+        """
+        if not appeals_data:
+            return []
+        if chunk_size < 1:
+            raise ValueError("Размер пакета должен быть не меньше 1")
+        
+        # Районы по уникальным населенным пунктам
+        settlements = {
+            a['settlement'] for a in appeals_data
+            if a.get('settlement') and not a.get('district')
+        }
+        districts = {name: self._resolve_district(name) for name in settlements}
+        
+        # Группировка строк по набору полей с сохранением исходных позиций
+        groups = {}
+        for index, appeal_data in enumerate(appeals_data):
+            row_data = dict(appeal_data)
+            if row_data.get('settlement') and not row_data.get('district'):
+                row_data['district'] = districts.get(row_data['settlement'])
+            fields, values = self._prepare_appeal_row(row_data, row_data.get('status') or 'новое')
+            groups.setdefault(tuple(fields), []).append((index, values))
+        
+        appeal_ids = [None] * len(appeals_data)
         try:
-            cursor = conn.cursor()
+            for fields, rows in groups.items():
+                for start in range(0, len(rows), chunk_size):
+                    chunk = rows[start:start + chunk_size]
+                    
+                    with self._transaction() as cursor:
+                        ids = self._insert_appeal_rows(cursor, fields, [values for _, values in chunk])
+                        ranges = self._apply_inserted(cursor, ids)
+                        seq = self._bump_data_version(cursor)
+                        self._log_changes(cursor, seq, inserted=ranges)
+                    self._data_changed()
+                    
+                    for (index, _), appeal_id in zip(chunk, ids):
+                        appeal_ids[index] = appeal_id
             
-            status_mapping = {
-                'new': 'новое',
-                'answered': 'отвечено',
-                'requires_manual_review': 'требует проверки',
-                'in_progress': 'в работе'
-            }
+            logger.info(f"💾 Пакетно сохранено {len(appeals_data)} обращений ({len(groups)} групп полей)")
+            return appeal_ids
             
-            for eng_status, ru_status in status_mapping.items():
+        except Error as e:
+            saved = sum(1 for appeal_id in appeal_ids if appeal_id is not None)
+            logger.error(f"❌ Ошибка пакетного сохранения обращений (сохранено {saved} из {len(appeals_data)}): {e}")
+            raise
+
+    def _first_insert_id(self, cursor, row_count):
+        """ID первой строки многострочного INSERT (MySQL возвращает его в lastrowid)"""
+        return cursor.lastrowid
+
+    def _insert_appeal_rows(self, cursor, fields, rows):
+        """Вставка строк обращений в транзакции вызывающего; возвращает их ID по порядку.
+        
+        Один многострочный INSERT используется, только если ID его строк идут подряд
+        (consecutive_insert_ids); ROW_COUNT() при этом должен совпасть с числом строк,
+        иначе транзакция откатывается, а следующие пакеты вставляются построчно.
+        """
+        row_placeholder = f"({', '.join(['%s'] * len(fields))})"
+        query = f"INSERT INTO appeals ({', '.join(fields)}) VALUES "
+        
+        if len(rows) > 1 and self.consecutive_insert_ids:
+            cursor.execute(
+                query + ', '.join([row_placeholder] * len(rows)),
+                [value for values in rows for value in values]
+            )
+            if cursor.rowcount != len(rows):
+                self.consecutive_insert_ids = False
+                raise Error(msg=f"Многострочный INSERT вставил {cursor.rowcount} строк из {len(rows)}")
+            first_id = self._first_insert_id(cursor, len(rows))
+            return list(range(first_id, first_id + len(rows)))
+        
+        ids = []
+        for values in rows:
+            cursor.execute(query + row_placeholder, values)
+            ids.append(cursor.lastrowid)
+        return ids
+
+    @staticmethod
+    def _id_ranges(ids):
+        """Диапазоны подряд идущих ID: [1, 2, 3, 7] -> [(1, 3), (7, 7)]"""
+        ranges = []
+        for appeal_id in sorted(ids):
+            if ranges and appeal_id == ranges[-1][1] + 1:
+                ranges[-1] = (ranges[-1][0], appeal_id)
+            else:
+                ranges.append((appeal_id, appeal_id))
+        return ranges
+
+    def _apply_inserted(self, cursor, ids):
+        """Агрегаты, поминутные корзины и поисковый индекс для новых обращений
+        по диапазонам их ID; возвращает диапазоны для журнала изменений"""
+        ranges = self._id_ranges(ids)
+        for first_id, last_id in ranges:
+            self._apply_aggregate_deltas(cursor, first_id, 1, last_id=last_id)
+            self._record_arrivals(cursor, first_id, last_id=last_id)
+            self._index_for_search(cursor, first_id, last_id=last_id)
+        return ranges
+
+    def _apply_rollup_delta(self, cursor, appeal_id, delta, last_id=None):
+        """Изменение дневного агрегата на delta по текущим значениям обращений
+        с ID от appeal_id до last_id включительно (в транзакции вызывающего)"""
+        cursor.execute("""
+            INSERT INTO appeals_daily_rollup (day, district_code, type_code, status_code, appeal_count)
+            SELECT DATE(created_at), COALESCE(district_code, 0), COALESCE(type_code, 0), COALESCE(status_code, 0), COUNT(*) * %s
+            FROM appeals
+            WHERE id BETWEEN %s AND %s
+            GROUP BY DATE(created_at), COALESCE(district_code, 0), COALESCE(type_code, 0), COALESCE(status_code, 0)
+            ON DUPLICATE KEY UPDATE appeal_count = appeal_count + VALUES(appeal_count)
+        """, (delta, appeal_id, appeal_id if last_id is None else last_id))
+
+    def _apply_counter_delta(self, cursor, appeal_id, delta, last_id=None):
+        """Изменение счетчиков реального времени (всего, по статусам, по типам) на delta"""
+        last_id = appeal_id if last_id is None else last_id
+        cursor.execute("""
+            INSERT INTO appeal_counters (counter_group, counter_key, value)
+            SELECT d.grp, d.k, d.n FROM (
+                SELECT 'total' AS grp, '' AS k, COUNT(*) * %s AS n
+                FROM appeals WHERE id BETWEEN %s AND %s
+                UNION ALL
+                SELECT 'status', COALESCE(CAST(status_code AS CHAR), ''), COUNT(*) * %s
+                FROM appeals WHERE id BETWEEN %s AND %s GROUP BY status_code
+                UNION ALL
+                SELECT 'type', COALESCE(CAST(type_code AS CHAR), ''), COUNT(*) * %s
+                FROM appeals WHERE id BETWEEN %s AND %s GROUP BY type_code
+            ) AS d
+            ON DUPLICATE KEY UPDATE value = value + VALUES(value)
+        """, (delta, appeal_id, last_id) * 3)
+
+    def _apply_aggregate_deltas(self, cursor, appeal_id, delta, last_id=None):
+        """Согласованное изменение всех агрегатов по обращениям в транзакции вызывающего"""
+        self._apply_rollup_delta(cursor, appeal_id, delta, last_id=last_id)
+        self._apply_counter_delta(cursor, appeal_id, delta, last_id=last_id)
+
+    def _minute_bucket_sql(self, column):
+        """Выражение начала минуты для поминутных корзин (для запросов с параметрами)"""
+        return f"DATE_FORMAT({column}, '%%Y-%%m-%%d %%H:%%i:00')"
+
+    def _record_arrivals(self, cursor, appeal_id, last_id=None):
+        """Учет новых обращений в поминутных корзинах для окна последних 24 часов"""
+        minute = self._minute_bucket_sql('created_at')
+        cursor.execute(f"""
+            INSERT INTO appeal_minute_buckets (bucket_minute, appeal_count)
+            SELECT {minute}, COUNT(*)
+            FROM appeals
+            WHERE id BETWEEN %s AND %s
+            GROUP BY {minute}
+            ON DUPLICATE KEY UPDATE appeal_count = appeal_count + VALUES(appeal_count)
+        """, (appeal_id, appeal_id if last_id is None else last_id))
+
+    def _index_for_search(self, cursor, appeal_id, last_id=None):
+        """Копирование текста и ответа обращений в поисковую таблицу (в транзакции вызывающего)"""
+        cursor.execute("""
+            INSERT INTO appeal_search (appeal_id, text, response)
+            SELECT id, text, response FROM appeals
+            WHERE id BETWEEN %s AND %s
+            ON DUPLICATE KEY UPDATE text = VALUES(text), response = VALUES(response)
+        """, (appeal_id, appeal_id if last_id is None else last_id))
+
+    @tracked
+    def reconcile_counters(self, repair=True):
+        """Сверка счетчиков реального времени с таблицей appeals и исправление расхождений.
+        
+        Строки счетчиков блокируются на время сверки, поэтому параллельные записи
+        дожидаются ее окончания и применяют свои изменения уже к исправленным значениям.
+        Поминутные корзины старше суток удаляются.
+        """
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(f"SELECT counter_group, counter_key, value FROM appeal_counters {self.ROW_LOCK}")
+                stored = {(group, key): value for group, key, value in cursor.fetchall()}
+                
+                cursor.execute("""
+                    SELECT 'total', '', COUNT(*) FROM appeals
+                    UNION ALL
+                    SELECT 'status', COALESCE(CAST(status_code AS CHAR), ''), COUNT(*) FROM appeals GROUP BY status_code
+                    UNION ALL
+                    SELECT 'type', COALESCE(CAST(type_code AS CHAR), ''), COUNT(*) FROM appeals GROUP BY type_code
+                """)
+                actual = {(group, key): value for group, key, value in cursor.fetchall()}
+                
+                drift = {}
+                for counter in set(stored) | set(actual):
+                    difference = actual.get(counter, 0) - stored.get(counter, 0)
+                    if difference:
+                        drift[':'.join(counter)] = difference
+                
+                now = datetime.now()
+                since = now - timedelta(hours=24)
+                cursor.execute(f"""
+                    SELECT bucket_minute, appeal_count FROM appeal_minute_buckets
+                    WHERE bucket_minute >= %s
+                    {self.ROW_LOCK}
+                """, (since,))
+                stored_buckets = dict(cursor.fetchall())
+                minute = self._minute_bucket_sql('created_at')
+                cursor.execute(f"""
+                    SELECT {minute}, COUNT(*)
+                    FROM appeals
+                    WHERE created_at >= %s
+                    GROUP BY {minute}
+                """, (since,))
+                actual_buckets = {
+                    datetime.fromisoformat(str(bucket_minute)): count
+                    for bucket_minute, count in cursor.fetchall()
+                }
+                bucket_drift = sum(
+                    1 for minute in set(stored_buckets) | set(actual_buckets)
+                    if stored_buckets.get(minute, 0) != actual_buckets.get(minute, 0)
+                )
+                
+                if repair and drift:
+                    cursor.execute("DELETE FROM appeal_counters")
+                    cursor.executemany(
+                        "INSERT INTO appeal_counters (counter_group, counter_key, value) VALUES (%s, %s, %s)",
+                        [(group, key, value) for (group, key), value in actual.items()]
+                    )
+                if repair and (drift or bucket_drift):
+                    self._bump_data_version(cursor)
+                if repair and bucket_drift:
+                    cursor.execute("DELETE FROM appeal_minute_buckets WHERE bucket_minute >= %s", (since,))
+                    cursor.executemany(
+                        "INSERT INTO appeal_minute_buckets (bucket_minute, appeal_count) VALUES (%s, %s)",
+                        list(actual_buckets.items())
+                    )
                 cursor.execute(
-                    "UPDATE appeals SET status = %s WHERE status = %s",
-                    (ru_status, eng_status)
+                    "DELETE FROM appeal_minute_buckets WHERE bucket_minute < %s",
+                    (now - timedelta(hours=25),)
                 )
-                updated_count = cursor.rowcount
-                if updated_count > 0:
-                    logger.info(f"🔄 Мигрированы статусы: {eng_status} -> {ru_status} ({updated_count} записей)")
+            self._data_changed()
             
-            conn.commit()
-            cursor.close()
-            logger.info("✅ Миграция статусов завершена")
+            if drift or bucket_drift:
+                action = "исправлено" if repair else "обнаружено"
+                logger.warning(f"⚠️ Расхождение счетчиков {action}: {drift}, поминутных корзин: {bucket_drift}")
+            else:
+                logger.info("✅ Счетчики реального времени совпадают с таблицей обращений")
+            
+            return {'counters': drift, 'minute_buckets': bucket_drift, 'repaired': repair}
             
         except Error as e:
-            logger.error(f"❌ Ошибка миграции статусов: {e}")
+            logger.error(f"❌ Ошибка сверки счетчиков: {e}")
             raise
-    
-    def _determine_district_by_settlement(self, settlement):
-        """Определение района по названию населенного пункта"""
-        if not settlement:
-            return None
+
+    @tracked
+    def rebuild_daily_rollup(self):
+        """Полный пересчет дневного агрегата по таблице appeals (backfill и исправление расхождений)"""
+        try:
+            with self._transaction() as cursor:
+                cursor.execute("DELETE FROM appeals_daily_rollup")
+                cursor.execute("""
+                    INSERT INTO appeals_daily_rollup (day, district_code, type_code, status_code, appeal_count)
+                    SELECT DATE(created_at), COALESCE(district_code, 0), COALESCE(type_code, 0), COALESCE(status_code, 0), COUNT(*)
+                    FROM appeals
+                    GROUP BY DATE(created_at), COALESCE(district_code, 0), COALESCE(type_code, 0), COALESCE(status_code, 0)
+                """)
+                rows = cursor.rowcount
+                self._bump_data_version(cursor)
+            self._data_changed()
             
-        settlement_lower = settlement.lower()
-        
-        # Сопоставление населенных пунктов с районами
-        district_mapping = {
-            'тамбов': 'Городской округ город Тамбов',
-            'мичуринск': 'Городской округ город Мичуринск',
-            'моршанск': 'Городской округ город Моршанск',
-            'кирсанов': 'Городской округ город Кирсанов',
-            'котовск': 'Городской округ город Котовск',
-            'рассказово': 'Городской округ город Рассказово',
-            'уварово': 'Городской округ город Уварово',
-            'бондари': 'Бондарский район',
-            'гавриловка': 'Гавриловский район',
-            'жердевка': 'Жердевский район',
-            'знаменка': 'Знаменский район',
-            'инжавино': 'Инжавинский район',
-            'мордово': 'Мордовский район',
-            'мучкапский': 'Мучкапский район',
-            'первомайский': 'Первомайский район',
-            'петровское': 'Петровский район',
-            'пичаево': 'Пичаевский район',
-            'ржакса': 'Ржаксинский район',
-            'сатинка': 'Сампурский район',
-            'сосновка': 'Сосновский район',
-            'староюрьево': 'Староюрьевский район',
-            'токарёвка': 'Токарёвский район',
-            'умёт': 'Умётский район'
-        }
+            logger.info(f"🧮 Дневной агрегат обращений пересчитан: {rows} строк")
+            return rows
+            
+        except Error as e:
+            logger.error(f"❌ Ошибка пересчета дневного агрегата: {e}")
+            raise
+
+    def _subtract_archived_aggregates(self, cursor, archive_table):
+        """Снятие перенесенных в архив обращений с дневного агрегата и счетчиков реального времени"""
+        cursor.execute(f"""
+            INSERT INTO appeals_daily_rollup (day, district_code, type_code, status_code, appeal_count)
+            SELECT DATE(created_at), COALESCE(district_code, 0), COALESCE(type_code, 0), COALESCE(status_code, 0), -COUNT(*)
+            FROM {archive_table}
+            GROUP BY DATE(created_at), COALESCE(district_code, 0), COALESCE(type_code, 0), COALESCE(status_code, 0)
+            ON DUPLICATE KEY UPDATE appeal_count = appeal_count + VALUES(appeal_count)
+        """)
+        cursor.execute("DELETE FROM appeals_daily_rollup WHERE appeal_count <= 0")
+        cursor.execute(f"""
+            INSERT INTO appeal_counters (counter_group, counter_key, value)
+            SELECT d.grp, d.k, d.n FROM (
+                SELECT 'total' AS grp, '' AS k, -COUNT(*) AS n FROM {archive_table}
+                UNION ALL
+                SELECT 'status', COALESCE(CAST(status_code AS CHAR), ''), -COUNT(*) FROM {archive_table} GROUP BY status_code
+                UNION ALL
+                SELECT 'type', COALESCE(CAST(type_code AS CHAR), ''), -COUNT(*) FROM {archive_table} GROUP BY type_code
+            ) AS d
+            ON DUPLICATE KEY UPDATE value = value + VALUES(value)
+        """)
+
+    @tracked
+    def maintain_partitions(self):
+        """Обслуживание секций appeals: создание секций на будущие месяцы и перенос
+        секций старше окна хранения в архивные таблицы appeals_archive_YYYYMM.
         
-        for key, district in district_mapping.items():
-            if key in settlement_lower:
-                return district
+        Перенос выполняется обменом секции с пустой таблицей (EXCHANGE PARTITION) и
+        удалением опустевшей секции - без построчного DELETE. Агрегаты уменьшаются в
+        отдельной транзакции вместе с записью в appeals_archive_log, поэтому прерванный
+        запуск можно безопасно повторить.
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    created = self.partitioner.ensure_future_partitions(cursor)
+                    expired = self.partitioner.expired_months(cursor)
+                    archived = []
+                    
+                    for month in expired:
+                        archive_table = self.partitioner.detach_partition(cursor, month)
+                        
+                        conn.start_transaction()
+                        try:
+                            cursor.execute(
+                                "SELECT 1 FROM appeals_archive_log WHERE archive_table = %s FOR UPDATE",
+                                (archive_table,)
+                            )
+                            if not cursor.fetchall():
+                                cursor.execute(f"SELECT COUNT(*) FROM {archive_table}")
+                                appeal_count = cursor.fetchone()[0]
+                                self._subtract_archived_aggregates(cursor, archive_table)
+                                cursor.execute(f"""
+                                    DELETE s FROM appeal_search s
+                                    JOIN {archive_table} a ON a.id = s.appeal_id
+                                """)
+                                cursor.execute(
+                                    "INSERT INTO appeals_archive_log (archive_table, partition_name, appeal_count) "
+                                    "VALUES (%s, %s, %s)",
+                                    (archive_table, partition_name(month), appeal_count)
+                                )
+                                self._bump_data_version(cursor)
+                                logger.info(f"📦 Секция {partition_name(month)} перенесена в {archive_table}: {appeal_count} обращений")
+                            conn.commit()
+                            self._data_changed()
+                        except Exception:
+                            conn.rollback()
+                            raise
+                        
+                        if self.partitioner.drop_partition(cursor, month):
+                            archived.append(archive_table)
+                finally:
+                    cursor.close()
+            
+            logger.info(f"🗂️ Обслуживание секций завершено: создано {len(created)}, архивировано {len(archived)}")
+            return {'created': created, 'archived': archived}
+            
+        except Error as e:
+            logger.error(f"❌ Ошибка обслуживания секций: {e}")
+            raise
+
+    @tracked
+    def _resolve_district(self, settlement):
+        """Определение района по населенному пункту через индекс таблицы settlements.
+        Для неоднозначного названия (одноименные пункты в разных районах) район не выбирается."""
+        if not settlement:
+            return None
         
-        # Если точного совпадения нет, проверяем частичные совпадения
-        for key, district in district_mapping.items():
-            if any(word in settlement_lower for word in key.split()):
-                return district
+        self.get_data_version()
+        if not self.district_resolver.loaded:
+            try:
+                with self.get_connection() as conn:
+                    cursor = conn.cursor()
+                    count = self.district_resolver.load(cursor)
+                    cursor.close()
+                logger.info(f"📍 Индекс районов загружен: {count} населенных пунктов")
+            except Error as e:
+                logger.warning(f"⚠️ Не удалось загрузить индекс районов, используются только центры районов: {e}")
         
-        return None
+        match = self.district_resolver.resolve(settlement)
+        if match.ambiguous:
+            logger.warning(
+                f"⚠️ Населенный пункт '{settlement}' есть в нескольких районах "
+                f"({', '.join(match.candidates)}), район не определен"
+            )
+        return match.district
 
-    def get_municipality_stats(self, period_days=30):
-        """Статистика по муниципалитетам за период с русскими статусами"""
-        conn = self.get_connection()
+    @tracked
+    def find_settlements(self, name):
+        """Поиск населенного пункта: сначала точное совпадение названия, затем по подстроке"""
+        try:
+            with self._read_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                
+                # Ищем точное совпадение по названию
+                cursor.execute(
+                    "SELECT name, type, district, population FROM settlements WHERE name = %s",
+                    (name,)
+                )
+                results = cursor.fetchall()
+                
+                # Если точное совпадение не найдено, ищем похожие
+                if not results:
+                    cursor.execute(
+                        "SELECT name, type, district, population FROM settlements WHERE name LIKE %s",
+                        (f'%{name}%',)
+                    )
+                    results = cursor.fetchall()
+                
+                cursor.close()
+            
+            return results
+            
+        except Error as e:
+            logger.error(f"❌ Ошибка поиска населенного пункта: {e}")
+            raise
+
+    @tracked
+    def replace_settlements(self, settlements):
+        """Полная замена таблицы населенных пунктов (загрузка парсером). Версия 'settlements'
+        увеличивается в той же транзакции, и процессы системы перестраивают индекс районов."""
         try:
-            cursor = conn.cursor(dictionary=True)
+            with self._transaction() as cursor:
+                cursor.execute("DELETE FROM settlements")
+                cursor.executemany(
+                    "INSERT INTO settlements (name, type, population, district) VALUES (%s, %s, %s, %s)",
+                    [
+                        (settlement['name'], settlement['type'], settlement['population'], settlement['district'])
+                        for settlement in settlements
+                    ]
+                )
+                self._bump_data_version(cursor, 'settlements')
+            self.district_resolver.invalidate()
+            self._data_changed()
             
+            logger.info(f"💾 Таблица населенных пунктов перезагружена: {len(settlements)} записей")
+            return len(settlements)
+            
+        except Error as e:
+            logger.error(f"❌ Ошибка сохранения населенных пунктов: {e}")
+            raise
+
+    @cached_read
+    @tracked
+    def get_municipality_stats(self, period_days=30):
+        """Статистика по муниципалитетам за период с русскими статусами (по дневному агрегату)"""
+        try:
             query = """
             SELECT 
-                COALESCE(a.district, 'Не указан') as municipality,
-                COUNT(*) as appeal_count,
-                COUNT(CASE WHEN a.status = 'отвечено' THEN 1 END) as answered_count,
-                COUNT(CASE WHEN a.status = 'новое' THEN 1 END) as new_count,
-                COUNT(CASE WHEN a.status = 'в работе' THEN 1 END) as in_progress_count,
-                COUNT(CASE WHEN a.status = 'требует проверки' THEN 1 END) as requires_review_count,
-                ROUND(COUNT(CASE WHEN a.status = 'отвечено' THEN 1 END) * 100.0 / COUNT(*), 2) as response_rate
-            FROM appeals a
-            WHERE a.created_at >= DATE_SUB(NOW(), INTERVAL %s DAY)
-            GROUP BY COALESCE(a.district, 'Не указан')
+                r.district_code,
+                CAST(SUM(r.appeal_count) AS SIGNED) as appeal_count,
+                CAST(SUM(CASE WHEN r.status_code = %s THEN r.appeal_count ELSE 0 END) AS SIGNED) as answered_count,
+                CAST(SUM(CASE WHEN r.status_code = %s THEN r.appeal_count ELSE 0 END) AS SIGNED) as new_count,
+                CAST(SUM(CASE WHEN r.status_code = %s THEN r.appeal_count ELSE 0 END) AS SIGNED) as in_progress_count,
+                CAST(SUM(CASE WHEN r.status_code = %s THEN r.appeal_count ELSE 0 END) AS SIGNED) as requires_review_count,
+                ROUND(SUM(CASE WHEN r.status_code = %s THEN r.appeal_count ELSE 0 END) * 100.0 / SUM(r.appeal_count), 2) as response_rate
+            FROM appeals_daily_rollup r
+            WHERE r.day >= %s
+            GROUP BY r.district_code
+            HAVING SUM(r.appeal_count) > 0
             ORDER BY appeal_count DESC
             LIMIT 15
             """
+            answered, new, in_progress, review = self._status_codes('отвечено', 'новое', 'в работе', 'требует проверки')
             
-            cursor.execute(query, (period_days,))
-            stats = cursor.fetchall()
-            cursor.close()
+            with self._read_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(query, (answered, new, in_progress, review, answered, self._period_start(period_days)))
+                stats = cursor.fetchall()
+                cursor.close()
+            
+            for row in stats:
+                row['municipality'] = self._district_label(row.pop('district_code'))
             
             logger.info(f"🏛️ Получена статистика по {len(stats)} муниципалитетам")
             return stats
@@ -277,26 +914,31 @@ class DatabaseManager:
             logger.error(f"❌ Ошибка получения статистики по муниципалитетам: {e}")
             return []
 
+    @cached_read
+    @tracked
     def get_municipality_trends(self, period_days=30):
-        """Динамика обращений по муниципалитетам за период"""
-        conn = self.get_connection()
+        """Динамика обращений по муниципалитетам за период (по дневному агрегату)"""
         try:
-            cursor = conn.cursor(dictionary=True)
-            
             query = """
             SELECT 
-                DATE(a.created_at) as date,
-                COALESCE(a.district, 'Не указан') as municipality,
-                COUNT(*) as daily_count
-            FROM appeals a
-            WHERE a.created_at >= DATE_SUB(NOW(), INTERVAL %s DAY)
-            GROUP BY DATE(a.created_at), COALESCE(a.district, 'Не указан')
-            ORDER BY date, municipality
+                r.day as date,
+                r.district_code,
+                CAST(SUM(r.appeal_count) AS SIGNED) as daily_count
+            FROM appeals_daily_rollup r
+            WHERE r.day >= %s
+            GROUP BY r.day, r.district_code
+            HAVING SUM(r.appeal_count) > 0
             """
             
-            cursor.execute(query, (period_days,))
-            trends = cursor.fetchall()
-            cursor.close()
+            with self._read_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(query, (self._period_start(period_days),))
+                trends = cursor.fetchall()
+                cursor.close()
+            
+            for row in trends:
+                row['municipality'] = self._district_label(row.pop('district_code'))
+            trends.sort(key=lambda row: (row['date'], row['municipality']))
             
             return trends
             
@@ -304,26 +946,32 @@ class DatabaseManager:
             logger.error(f"❌ Ошибка получения трендов по муниципалитетам: {e}")
             return []
 
+    @cached_read
+    @tracked
     def get_municipality_type_stats(self, period_days=30):
-        """Статистика по типам обращений в разрезе муниципалитетов"""
-        conn = self.get_connection()
+        """Статистика по типам обращений в разрезе муниципалитетов (по дневному агрегату)"""
         try:
-            cursor = conn.cursor(dictionary=True)
-            
             query = """
             SELECT 
-                COALESCE(a.district, 'Не указан') as municipality,
-                COALESCE(a.type, 'Не определен') as appeal_type,
-                COUNT(*) as type_count
-            FROM appeals a
-            WHERE a.created_at >= DATE_SUB(NOW(), INTERVAL %s DAY)
-            GROUP BY COALESCE(a.district, 'Не указан'), COALESCE(a.type, 'Не определен')
-            ORDER BY municipality, type_count DESC
+                r.district_code,
+                r.type_code,
+                CAST(SUM(r.appeal_count) AS SIGNED) as type_count
+            FROM appeals_daily_rollup r
+            WHERE r.day >= %s
+            GROUP BY r.district_code, r.type_code
+            HAVING SUM(r.appeal_count) > 0
             """
             
-            cursor.execute(query, (period_days,))
-            stats = cursor.fetchall()
-            cursor.close()
+            with self._read_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(query, (self._period_start(period_days),))
+                stats = cursor.fetchall()
+                cursor.close()
+            
+            for row in stats:
+                row['municipality'] = self._district_label(row.pop('district_code'))
+                row['appeal_type'] = self._label('type', row.pop('type_code')) or 'Не определен'
+            stats.sort(key=lambda row: (row['municipality'], -row['type_count']))
             
             return stats
             
@@ -331,21 +979,189 @@ class DatabaseManager:
             logger.error(f"❌ Ошибка получения статистики по типам обращений: {e}")
             return []
 
+    def _seconds_between_sql(self, start_column, end_column):
+        """SQL-выражение: число секунд между двумя моментами времени"""
+        return f"TIMESTAMPDIFF(SECOND, {start_column}, {end_column})"
+
+    @cached_read
+    @tracked
+    def get_response_time_stats(self, period_days=30):
+        """Время до ответа (SLA) по районам и типам обращений, созданных за период.
+
+        Медиана, p90 и p99 считаются в базе оконными функциями (процентиль по
+        ближайшему рангу: первое значение, до которого набирается нужная доля
+        обращений), в Python передаются только итоговые строки. Учитываются
+        обращения с заполненным responded_at. Возвращает {'overall': {...}, 'groups': [...]},
+        времена - в секундах.
+        """
+        try:
+            seconds = self._seconds_between_sql('created_at', 'responded_at')
+            percentiles = (('median_seconds', 50), ('p90_seconds', 90), ('p99_seconds', 99))
+            group_columns = ",\n                ".join(
+                f"MIN(CASE WHEN position * 100 >= total * {rank} THEN seconds END) AS {name}"
+                for name, rank in percentiles
+            )
+            overall_columns = ",\n                ".join(
+                f"MIN(CASE WHEN overall_position * 100 >= overall_total * {rank} THEN seconds END)"
+                for _, rank in percentiles
+            )
+            query = f"""
+            WITH durations AS (
+                SELECT
+                    COALESCE(district_code, 0) AS district_code,
+                    COALESCE(type_code, 0) AS type_code,
+                    {seconds} AS seconds,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY COALESCE(district_code, 0), COALESCE(type_code, 0) ORDER BY {seconds}
+                    ) AS position,
+                    COUNT(*) OVER (PARTITION BY COALESCE(district_code, 0), COALESCE(type_code, 0)) AS total,
+                    ROW_NUMBER() OVER (ORDER BY {seconds}) AS overall_position,
+                    COUNT(*) OVER () AS overall_total
+                FROM appeals
+                WHERE created_at >= %s AND responded_at IS NOT NULL
+            )
+            SELECT
+                district_code,
+                type_code,
+                MAX(total) AS responded_count,
+                {group_columns},
+                AVG(seconds) AS avg_seconds
+            FROM durations
+            GROUP BY district_code, type_code
+            UNION ALL
+            SELECT
+                NULL,
+                NULL,
+                MAX(overall_total),
+                {overall_columns},
+                AVG(seconds)
+            FROM durations
+            """
+
+            with self._read_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(query, (self._period_start(period_days),))
+                rows = cursor.fetchall()
+                cursor.close()
+
+            overall = {'responded_count': 0, 'median_seconds': None, 'p90_seconds': None,
+                       'p99_seconds': None, 'avg_seconds': None}
+            groups = []
+            for row in rows:
+                stats = {
+                    'responded_count': int(row['responded_count'] or 0),
+                    'avg_seconds': None if row['avg_seconds'] is None else round(float(row['avg_seconds']))
+                }
+                for name, _ in percentiles:
+                    stats[name] = None if row[name] is None else int(row[name])
+                if row['district_code'] is None:
+                    overall = stats
+                    continue
+                stats['municipality'] = self._district_label(row['district_code'])
+                stats['appeal_type'] = self._label('type', row['type_code']) or 'Не определен'
+                groups.append(stats)
+            groups.sort(key=lambda row: (-row['responded_count'], row['municipality'], row['appeal_type']))
+
+            logger.info(f"⏱️ Время до ответа: {overall['responded_count']} обращений, {len(groups)} групп")
+            return {'period_days': period_days, 'overall': overall, 'groups': groups}
+
+        except Error as e:
+            logger.error(f"❌ Ошибка получения статистики времени до ответа: {e}")
+            return {}
+
     # Остальные существующие методы остаются без изменений...
+    def _encode_update(self, update_data):
+        """Данные изменения обращения с названиями справочников, замененными кодами"""
+        update_data = dict(update_data)
+        for field, (_, column) in LOOKUP_FIELDS.items():
+            if field in update_data:
+                update_data[column] = self._ensure_code(field, update_data.pop(field))
+        return update_data
+
+    def _mark_responded(self, update_data):
+        """Время ответа для изменения, переводящего обращение в конечный статус
+        (если вызывающий не передал его сам)"""
+        if update_data.get('status') in self.TERMINAL_STATUSES and not update_data.get('responded_at'):
+            update_data = dict(update_data, responded_at=datetime.now())
+        return update_data
+
+    def _apply_appeal_update(self, cursor, appeal_id, update_data):
+        """UPDATE обращения в транзакции вызывающего (с переносом в дневном агрегате
+        при смене статуса, типа или района и обновлением поисковой таблицы).
+        Возвращает ключи агрегатов до изменения для журнала изменений."""
+        set_clause = ", ".join([
+            f"{key} = COALESCE({key}, %s)" if key in self.WRITE_ONCE_FIELDS else f"{key} = %s"
+            for key in update_data.keys()
+        ])
+        values = list(update_data.values())
+        values.append(appeal_id)
+        
+        query = f"UPDATE appeals SET {set_clause} WHERE id = %s"
+        
+        # Строка блокируется до конца транзакции, прежние ключи агрегатов попадают в журнал изменений
+        cursor.execute(
+            f"SELECT DATE(created_at), district_code, type_code, status_code FROM appeals WHERE id = %s {self.ROW_LOCK}",
+            (appeal_id,)
+        )
+        previous = cursor.fetchone()
+        moves_aggregates = any(key in self.AGGREGATE_KEY_FIELDS for key in update_data)
+        if moves_aggregates:
+            # Снимаем обращение со старых ключей агрегатов и добавляем на новые в той же транзакции
+            self._apply_aggregate_deltas(cursor, appeal_id, -1)
+        cursor.execute(query, values)
+        if moves_aggregates:
+            self._apply_aggregate_deltas(cursor, appeal_id, 1)
+        if any(key in self.SEARCH_FIELDS for key in update_data):
+            self._index_for_search(cursor, appeal_id)
+        return previous
+
+    def _log_changes(self, cursor, seq, inserted=(), updated=()):
+        """Запись в журнал изменений appeal_changes в транзакции вызывающего.
+        
+        seq - версия данных 'appeals', полученная транзакцией; inserted - диапазоны ID
+        новых обращений, updated - пары (ID, ключи агрегатов до изменения).
+        """
+        changed_at = datetime.now()
+        for first_id, last_id in inserted:
+            cursor.execute("""
+                INSERT INTO appeal_changes (seq, appeal_id, change_type, day, district_code, type_code, status_code, changed_at)
+                SELECT %s, id, 'insert', DATE(created_at), district_code, type_code, status_code, %s
+                FROM appeals
+                WHERE id BETWEEN %s AND %s
+            """, (seq, changed_at, first_id, last_id))
+        for appeal_id, previous in updated:
+            if previous is None:
+                continue
+            cursor.execute("""
+                INSERT INTO appeal_changes (
+                    seq, appeal_id, change_type, day, district_code, type_code, status_code,
+                    prev_day, prev_district_code, prev_type_code, prev_status_code, changed_at
+                )
+                SELECT %s, id, 'update', DATE(created_at), district_code, type_code, status_code, %s, %s, %s, %s, %s
+                FROM appeals
+                WHERE id = %s
+            """, (seq, *previous, changed_at, appeal_id))
+
+    @tracked
     def update_appeal(self, appeal_id, update_data):
-        """Обновление обращения"""
-        conn = self.get_connection()
+        """Обновление обращения (с переносом в дневном агрегате при смене статуса, типа или района).
+        Обращение с временным ID из очереди отложенной записи обновляется тоже через очередь.
+        При переходе в конечный статус фиксируется время ответа."""
+        update_data = self._mark_responded(update_data)
+        if appeal_id < 0 and self.write_buffer:
+            self.write_buffer.submit_update(appeal_id, update_data)
+            logger.info(f"🕒 Изменение обращения {appeal_id} поставлено в очередь записи")
+            return
+        
         try:
-            cursor = conn.cursor()
-            
-            set_clause = ", ".join([f"{key} = %s" for key in update_data.keys()])
-            values = list(update_data.values())
-            values.append(appeal_id)
+            # Статус, тип и район записываются кодами справочников
+            update_data = self._encode_update(update_data)
             
-            query = f"UPDATE appeals SET {set_clause} WHERE id = %s"
-            
-            cursor.execute(query, values)
-            cursor.close()
+            with self._transaction() as cursor:
+                previous = self._apply_appeal_update(cursor, appeal_id, update_data)
+                seq = self._bump_data_version(cursor)
+                self._log_changes(cursor, seq, updated=[(appeal_id, previous)])
+            self._data_changed()
             
             logger.info(f"✏️ Обновлено обращение ID: {appeal_id}")
             
@@ -353,93 +1169,402 @@ class DatabaseManager:
             logger.error(f"❌ Ошибка обновления обращения: {e}")
             raise
 
+    @tracked
+    def _flush_write_batch(self, operations, journal_name=None, resolved=None):
+        """Запись пакета отложенных операций одной транзакцией (групповая фиксация).
+        
+        Изменения обращений из того же пакета сливаются с их INSERT, поэтому новое
+        обращение вместе со статусом и ответом записывается одной строкой. Операции
+        журнала, уже записанные до падения процесса, пропускаются по контрольной точке
+        в write_behind_checkpoints, а временные ID записанных ранее обращений берутся
+        из write_behind_refs. Возвращает соответствие временных ID настоящим.
+        """
+        resolved = dict(resolved or {})
+        
+        try:
+            new_ids = {}
+            inserted = []
+            updated = []
+            with self._transaction() as cursor:
+                done = 0
+                if journal_name:
+                    cursor.execute(
+                        f"SELECT seq FROM write_behind_checkpoints WHERE journal = %s {self.ROW_LOCK}",
+                        (journal_name,)
+                    )
+                    row = cursor.fetchone()
+                    done = row[0] if row else 0
+                operations = [operation for operation in operations if operation['seq'] > done]
+                if not operations:
+                    return new_ids
+                
+                # Слияние изменений с обращениями пакета; остальное - отдельными UPDATE
+                inserts = {}
+                updates = []
+                for operation in operations:
+                    if operation['op'] == 'insert':
+                        inserts[operation['ref']] = dict(operation['data'])
+                        continue
+                    data = dict(operation['data'])
+                    pending = inserts.get(operation['appeal_id'])
+                    if pending is not None:
+                        merged = {key: data.pop(key) for key in list(data) if key in self.INSERT_MERGE_FIELDS}
+                        for key in self.WRITE_ONCE_FIELDS:
+                            if pending.get(key):
+                                merged.pop(key, None)
+                        pending.update(merged)
+                    if data:
+                        updates.append((operation['seq'], operation['appeal_id'], self._encode_update(data)))
+                
+                groups = {}
+                for ref, appeal_data in inserts.items():
+                    fields, values = self._prepare_appeal_row(appeal_data, appeal_data.get('status') or 'новое')
+                    groups.setdefault(tuple(fields), []).append((ref, values))
+                
+                for fields, rows in groups.items():
+                    ids = self._insert_appeal_rows(cursor, fields, [values for _, values in rows])
+                    inserted.extend(self._apply_inserted(cursor, ids))
+                    for (ref, _), appeal_id in zip(rows, ids):
+                        new_ids[ref] = appeal_id
+                
+                for seq, appeal_id, update_data in updates:
+                    if appeal_id < 0:
+                        appeal_id = self._resolve_write_ref(cursor, journal_name, appeal_id, new_ids, resolved)
+                        if appeal_id is None:
+                            logger.warning(f"⚠️ Изменение неизвестного обращения из очереди записи пропущено (операция {seq})")
+                            continue
+                    updated.append((appeal_id, self._apply_appeal_update(cursor, appeal_id, update_data)))
+                
+                if journal_name:
+                    if new_ids:
+                        cursor.executemany(
+                            "INSERT INTO write_behind_refs (journal, ref, appeal_id) VALUES (%s, %s, %s)",
+                            [(journal_name, ref, appeal_id) for ref, appeal_id in new_ids.items()]
+                        )
+                    cursor.execute(
+                        "REPLACE INTO write_behind_checkpoints (journal, seq) VALUES (%s, %s)",
+                        (journal_name, operations[-1]['seq'])
+                    )
+                seq = self._bump_data_version(cursor)
+                self._log_changes(cursor, seq, inserted, updated)
+            self._data_changed()
+            
+            logger.info(f"💾 Записан пакет отложенной записи: {len(operations)} операций, новых обращений: {len(new_ids)}")
+            return new_ids
+            
+        except Error as e:
+            logger.error(f"❌ Ошибка записи пакета отложенной записи: {e}")
+            raise
+
+    def _resolve_write_ref(self, cursor, journal_name, ref, new_ids, resolved):
+        """Настоящий ID обращения по временному: из текущего пакета, из памяти процесса
+        или из write_behind_refs (обращение записано до падения процесса)"""
+        appeal_id = new_ids.get(ref) or resolved.get(ref)
+        if appeal_id is None and journal_name:
+            cursor.execute(
+                "SELECT appeal_id FROM write_behind_refs WHERE journal = %s AND ref = %s",
+                (journal_name, ref)
+            )
+            row = cursor.fetchone()
+            appeal_id = row[0] if row else None
+        return appeal_id
+
+    def _forget_write_journal(self, journal_name):
+        """Удаление контрольной точки и временных ID журнала, полностью записанного в базу"""
+        try:
+            with self._transaction() as cursor:
+                cursor.execute("DELETE FROM write_behind_refs WHERE journal = %s", (journal_name,))
+                cursor.execute("DELETE FROM write_behind_checkpoints WHERE journal = %s", (journal_name,))
+        except Error as e:
+            logger.warning(f"⚠️ Не удалось удалить служебные записи журнала {journal_name}: {e}")
+
+    def flush_writes(self, timeout=None):
+        """Немедленная запись очереди отложенной записи (True, если очередь пуста)"""
+        if not self.write_buffer:
+            return True
+        return self.write_buffer.flush(timeout)
+
+    def _build_appeals_filters(self, filters):
+        """Формирование условия WHERE для выборки обращений"""
+        where_clause = "WHERE 1=1"
+        params = []
+        
+        if filters:
+            if 'user_id' in filters:
+                where_clause += " AND user_id = %s"
+                params.append(filters['user_id'])
+            # Фильтр по названию из справочника; неизвестное название - пустой результат
+            for field in ('type', 'status'):
+                if field in filters:
+                    code = self._code(field, filters[field])
+                    if code is None:
+                        where_clause += " AND 1 = 0"
+                    else:
+                        where_clause += f" AND {LOOKUP_FIELDS[field][1]} = %s"
+                        params.append(code)
+            if 'date_from' in filters:
+                where_clause += " AND created_at >= %s"
+                params.append(filters['date_from'])
+            if 'date_to' in filters:
+                where_clause += " AND created_at <= %s"
+                params.append(filters['date_to'])
+        
+        return where_clause, params
+
+    @tracked
     def get_appeals(self, filters=None, limit=100, offset=0):
-        """Получение обращений с фильтрами"""
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor(dictionary=True)
-            
-            where_clause = "WHERE 1=1"
-            params = []
-            
-            if filters:
-                if 'user_id' in filters:
-                    where_clause += " AND user_id = %s"
-                    params.append(filters['user_id'])
-                if 'type' in filters:
-                    where_clause += " AND type = %s"
-                    params.append(filters['type'])
-                if 'status' in filters:
-                    where_clause += " AND status = %s"
-                    params.append(filters['status'])
-                if 'date_from' in filters:
-                    where_clause += " AND created_at >= %s"
-                    params.append(filters['date_from'])
-                if 'date_to' in filters:
-                    where_clause += " AND created_at <= %s"
-                    params.append(filters['date_to'])
+        """Получение обращений с фильтрами (постраничный режим через OFFSET для совместимости)"""
+        try:
+            where_clause, params = self._build_appeals_filters(filters)
             
             query = f"""
             SELECT * FROM appeals 
             {where_clause}
-            ORDER BY created_at DESC 
+            ORDER BY created_at DESC, id DESC
             LIMIT %s OFFSET %s
             """
             
             params.extend([limit, offset])
-            cursor.execute(query, params)
-            appeals = cursor.fetchall()
-            cursor.close()
+            # Обращения конкретного пользователя читаем с основного сервера (read-your-writes)
+            with self._read_connection(consistent=bool(filters and 'user_id' in filters)) as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(query, params)
+                appeals = cursor.fetchall()
+                cursor.close()
             
-            return appeals
+            return self._decorate_appeals(appeals)
             
         except Error as e:
             logger.error(f"❌ Ошибка получения обращений: {e}")
             return []
 
+    @tracked
+    def get_pending_appeals(self, status, limit=20):
+        """Обращения в статусе status в порядке поступления (от старых к новым).
+        Читаются с основного сервера: отставшая реплика вернула бы уже обработанные обращения"""
+        try:
+            where_clause, params = self._build_appeals_filters({'status': status})
+            
+            query = f"""
+            SELECT * FROM appeals 
+            {where_clause}
+            ORDER BY created_at ASC, id ASC
+            LIMIT %s
+            """
+            
+            params.append(limit)
+            with self._read_connection(consistent=True) as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(query, params)
+                appeals = cursor.fetchall()
+                cursor.close()
+            
+            return self._decorate_appeals(appeals)
+        
+        except Error as e:
+            logger.error(f"❌ Ошибка получения обращений, ожидающих обработки: {e}")
+            return []
+
+    @tracked
+    def get_appeals_page(self, filters=None, limit=100, cursor=None):
+        """Курсорная (keyset) пагинация обращений: стоимость не зависит от номера страницы"""
+        where_clause, params = self._build_appeals_filters(filters)
+        
+        if cursor:
+            created_at, last_id = decode_cursor(cursor)
+            where_clause += " AND (created_at < %s OR (created_at = %s AND id < %s))"
+            params.extend([created_at, created_at, last_id])
+        
+        try:
+            query = f"""
+            SELECT * FROM appeals 
+            {where_clause}
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s
+            """
+            
+            # Берем на одну строку больше, чтобы понять, есть ли следующая страница
+            params.append(limit + 1)
+            with self._read_connection(consistent=bool(filters and 'user_id' in filters)) as conn:
+                db_cursor = conn.cursor(dictionary=True)
+                db_cursor.execute(query, params)
+                appeals = db_cursor.fetchall()
+                db_cursor.close()
+            
+            next_cursor = None
+            if len(appeals) > limit:
+                appeals = appeals[:limit]
+                last = appeals[-1]
+                next_cursor = encode_cursor(last['created_at'], last['id'])
+            
+            return {'appeals': self._decorate_appeals(appeals), 'next_cursor': next_cursor}
+            
+        except Error as e:
+            logger.error(f"❌ Ошибка получения страницы обращений: {e}")
+            return {'appeals': [], 'next_cursor': None}
+
+    @tracked
+    def iter_appeals(self, columns=None, filters=None, batch_size=1000):
+        """Потоковое чтение обращений для выгрузки: генератор кортежей в порядке колонок.
+        
+        Использует небуферизованный курсор: строки читаются с сервера порциями по
+        batch_size по мере потребления, поэтому память не зависит от объема выгрузки.
+        Соединение занято, пока генератор не исчерпан или не закрыт; при досрочном
+        закрытии недочитанный результат не дочитывается, а соединение закрывается пулом.
+        """
+        columns = resolve_export_columns(columns)
+        where_clause, params = self._build_appeals_filters(filters)
+        # Статус, тип и район читаются кодами и заменяются названиями из справочников
+        select_columns = [LOOKUP_FIELDS[column][1] if column in LOOKUP_FIELDS else column for column in columns]
+        lookup_positions = [(index, column) for index, column in enumerate(columns) if column in LOOKUP_FIELDS]
+        query = f"""
+        SELECT {', '.join(select_columns)} FROM appeals
+        {where_clause}
+        ORDER BY created_at, id
+        """
+        
+        self._ensure_lookups()
+        with self._read_connection() as conn:
+            cursor = conn.cursor(buffered=False)
+            exhausted = False
+            try:
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    if not lookup_positions:
+                        yield from rows
+                        continue
+                    for row in rows:
+                        row = list(row)
+                        for index, field in lookup_positions:
+                            row[index] = self._label(field, row[index])
+                        yield row
+                exhausted = True
+            finally:
+                if exhausted:
+                    cursor.close()
+        
+        logger.info("📤 Потоковая выгрузка обращений завершена")
+
+    @tracked
+    def search_appeals(self, query, filters=None, cursor=None, limit=20):
+        """Полнотекстовый поиск по текстам обращений и ответам с ранжированием по релевантности.
+        
+        Все слова запроса обязательны. Страницы листаются курсором по паре (релевантность, id).
+        Каждое найденное обращение дополняется полями relevance и snippet (фрагмент с
+        подсветкой <mark>). Возвращает {'appeals': [...], 'next_cursor': ...}.
+        """
+        terms = extract_terms(query)
+        if not terms:
+            return {'appeals': [], 'next_cursor': None}
+        after = decode_search_cursor(cursor) if cursor else None
+        
+        try:
+            # Берем на одну строку больше, чтобы понять, есть ли следующая страница
+            appeals = self._find_search_matches(terms, filters, after, limit + 1)
+            
+            next_cursor = None
+            if len(appeals) > limit:
+                appeals = appeals[:limit]
+                last = appeals[-1]
+                next_cursor = encode_search_cursor(last['relevance'], last['id'])
+            
+            self._decorate_appeals(appeals)
+            for appeal in appeals:
+                appeal['snippet'] = build_snippet(appeal.get('text'), terms)
+                if appeal.get('response'):
+                    appeal['response_snippet'] = build_snippet(appeal['response'], terms)
+            
+            logger.info(f"🔎 Поиск '{query}': найдено {len(appeals)} обращений на странице")
+            return {'appeals': appeals, 'next_cursor': next_cursor}
+            
+        except Error as e:
+            logger.error(f"❌ Ошибка полнотекстового поиска: {e}")
+            return {'appeals': [], 'next_cursor': None}
+
+    def _find_search_matches(self, terms, filters, after, limit):
+        """Строки обращений с полем relevance по убыванию релевантности (FULLTEXT-индекс
+        таблицы appeal_search с ngram-парсером); after - пара (релевантность, id) курсора"""
+        boolean_query = build_boolean_query(terms)
+        match = "MATCH(s.text, s.response) AGAINST (%s IN BOOLEAN MODE)"
+        
+        where_clause, filter_params = self._build_appeals_filters(filters)
+        where_clause += f" AND {match}"
+        params = [boolean_query] + filter_params + [boolean_query]
+        
+        if after:
+            relevance, last_id = after
+            where_clause += f" AND ({match} < %s OR ({match} = %s AND a.id < %s))"
+            params.extend([boolean_query, relevance, boolean_query, relevance, last_id])
+        
+        sql = f"""
+        SELECT a.*, {match} AS relevance
+        FROM appeal_search s
+        JOIN appeals a ON a.id = s.appeal_id
+        {where_clause}
+        ORDER BY relevance DESC, a.id DESC
+        LIMIT %s
+        """
+        params.append(limit)
+        with self._read_connection() as conn:
+            db_cursor = conn.cursor(dictionary=True)
+            db_cursor.execute(sql, params)
+            appeals = db_cursor.fetchall()
+            db_cursor.close()
+        return appeals
+
+    @cached_read
+    @tracked
     def get_recent_appeals(self, limit=10):
         """Получение последних обращений (актуальные данные)"""
-        conn = self.get_connection()
         try:
-            cursor = conn.cursor(dictionary=True)
-            
             query = """
             SELECT * FROM appeals 
             ORDER BY created_at DESC 
             LIMIT %s
             """
             
-            cursor.execute(query, (limit,))
-            appeals = cursor.fetchall()
-            cursor.close()
+            with self._read_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(query, (limit,))
+                appeals = cursor.fetchall()
+                cursor.close()
             
             logger.info(f"📝 Получено {len(appeals)} последних обращений")
-            return appeals
+            return self._decorate_appeals(appeals)
             
         except Error as e:
             logger.error(f"❌ Ошибка получения последних обращений: {e}")
             return []
 
+    @cached_read
+    @tracked
     def get_appeals_stats(self, period_days=30):
-        """Статистика по обращениям за период с русскими статусами"""
-        conn = self.get_connection()
+        """Статистика по обращениям за период с русскими статусами (по дневному агрегату)"""
         try:
-            cursor = conn.cursor(dictionary=True)
-            
             query = """
             SELECT 
-                type,
-                status,
-                COUNT(*) as count
-            FROM appeals 
-            WHERE created_at >= DATE_SUB(NOW(), INTERVAL %s DAY)
-            GROUP BY type, status
+                r.type_code,
+                r.status_code,
+                CAST(SUM(r.appeal_count) AS SIGNED) as count
+            FROM appeals_daily_rollup r
+            WHERE r.day >= %s
+            GROUP BY r.type_code, r.status_code
+            HAVING SUM(r.appeal_count) > 0
             ORDER BY count DESC
             """
             
-            cursor.execute(query, (period_days,))
-            stats = cursor.fetchall()
-            cursor.close()
+            with self._read_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(query, (self._period_start(period_days),))
+                stats = cursor.fetchall()
+                cursor.close()
+            
+            for row in stats:
+                row['type'] = self._label('type', row.pop('type_code'))
+                row['status'] = self._label('status', row.pop('status_code'))
             
             return stats
             
@@ -447,44 +1572,44 @@ class DatabaseManager:
             logger.error(f"❌ Ошибка получения статистики: {e}")
             return []
 
+    @cached_read
+    @tracked
     def get_real_time_stats(self):
-        """Получение актуальной статистики в реальном времени с русскими статусами"""
-        conn = self.get_connection()
+        """Получение актуальной статистики в реальном времени с русскими статусами.
+        
+        Читает только таблицу счетчиков и поминутные корзины за сутки одним запросом.
+        """
         try:
-            cursor = conn.cursor(dictionary=True)
+            with self._read_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute("""
+                    SELECT counter_group, counter_key, value
+                    FROM appeal_counters
+                    UNION ALL
+                    SELECT 'last_24h', '', COALESCE(SUM(appeal_count), 0)
+                    FROM appeal_minute_buckets
+                    WHERE bucket_minute >= %s
+                """, (datetime.now() - timedelta(hours=24),))
+                rows = cursor.fetchall()
+                cursor.close()
             
-            # Общее количество обращений
-            cursor.execute("SELECT COUNT(*) as total FROM appeals")
-            total = cursor.fetchone()['total']
-            
-            # По статусам (русские)
-            cursor.execute("""
-                SELECT status, COUNT(*) as count 
-                FROM appeals 
-                GROUP BY status
-            """)
-            status_stats = {row['status']: row['count'] for row in cursor.fetchall()}
+            total = 0
+            last_24h = 0
+            status_stats = {}
+            type_counts = []
+            for row in rows:
+                group, key, value = row['counter_group'], row['counter_key'], int(row['value'])
+                if group == 'total':
+                    total = value
+                elif group == 'last_24h':
+                    last_24h = value
+                elif group == 'status' and value > 0:
+                    status_stats[self._label('status', int(key)) if key else None] = value
+                elif group == 'type' and key and value > 0:
+                    type_counts.append({'type': self._label('type', int(key)), 'count': value})
             
             # По типам (топ-5)
-            cursor.execute("""
-                SELECT type, COUNT(*) as count 
-                FROM appeals 
-                WHERE type IS NOT NULL 
-                GROUP BY type 
-                ORDER BY count DESC 
-                LIMIT 5
-            """)
-            type_stats = cursor.fetchall()
-            
-            # Последние 24 часа
-            cursor.execute("""
-                SELECT COUNT(*) as last_24h 
-                FROM appeals 
-                WHERE created_at >= DATE_SUB(NOW(), INTERVAL 24 HOUR)
-            """)
-            last_24h = cursor.fetchone()['last_24h']
-            
-            cursor.close()
+            type_stats = sorted(type_counts, key=lambda t: t['count'], reverse=True)[:5]
             
             logger.info(f"📊 Реальная статистика: всего {total}, за 24ч: {last_24h}")
             
@@ -500,8 +1625,188 @@ class DatabaseManager:
             return {}
 
 
+    @tracked
+    def get_changes(self, since=None, limit=500):
+        """Изменения обращений после версии since для инкрементального обновления дашборда.
+
+        Возвращает текущую версию seq, измененные и новые обращения (текущее состояние)
+        и приращения дневного агрегата по ключам (день, муниципалитет, тип, статус).
+        Без since возвращается только текущая версия. reset=True означает, что
+        изменения с since уже удалены из журнала или их больше limit: клиент должен
+        перезагрузить данные целиком. Изменение справочников видно по lookups_version.
+        """
+        try:
+            with self._read_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(
+                    "SELECT name, version FROM data_version WHERE name IN ('appeals', 'lookups', 'changes_pruned')"
+                )
+                versions = {row['name']: row['version'] for row in cursor.fetchall()}
+                # Версия читается первой: все запросы ниже ограничены ею, поэтому
+                # изменения, зафиксированные во время чтения, попадут в следующий ответ
+                seq = versions.get('appeals', 0)
+                result = {
+                    'seq': seq,
+                    'lookups_version': versions.get('lookups', 0),
+                    'reset': False,
+                    'appeals': [],
+                    'deltas': []
+                }
+                if since is None:
+                    cursor.close()
+                    return result
+
+                # Реплика может отставать от предыдущего ответа: версия клиента не уменьшается
+                result['seq'] = max(seq, since)
+                if since < versions.get('changes_pruned', 0):
+                    result['reset'] = True
+                    cursor.close()
+                    return result
+
+                cursor.execute(
+                    "SELECT COUNT(DISTINCT appeal_id) AS changed FROM appeal_changes WHERE seq > %s AND seq <= %s",
+                    (since, seq)
+                )
+                changed = cursor.fetchone()['changed']
+                if changed > limit:
+                    result['reset'] = True
+                    cursor.close()
+                    return result
+                if not changed:
+                    cursor.close()
+                    return result
+
+                cursor.execute("""
+                    SELECT * FROM appeals
+                    WHERE id IN (SELECT appeal_id FROM appeal_changes WHERE seq > %s AND seq <= %s)
+                    ORDER BY created_at DESC, id DESC
+                """, (since, seq))
+                appeals = cursor.fetchall()
+
+                # Новое обращение добавляется на свои ключи, изменение переносит его со старых ключей на новые
+                cursor.execute("""
+                    SELECT day, district_code, type_code, status_code, SUM(delta) AS delta
+                    FROM (
+                        SELECT day, COALESCE(district_code, 0) AS district_code, COALESCE(type_code, 0) AS type_code,
+                               COALESCE(status_code, 0) AS status_code, 1 AS delta
+                        FROM appeal_changes
+                        WHERE seq > %s AND seq <= %s
+                        UNION ALL
+                        SELECT prev_day, COALESCE(prev_district_code, 0), COALESCE(prev_type_code, 0),
+                               COALESCE(prev_status_code, 0), -1
+                        FROM appeal_changes
+                        WHERE seq > %s AND seq <= %s AND change_type = 'update'
+                    ) AS moves
+                    GROUP BY day, district_code, type_code, status_code
+                    HAVING SUM(delta) <> 0
+                """, (since, seq, since, seq))
+                deltas = cursor.fetchall()
+                cursor.close()
+
+            result['appeals'] = self._decorate_appeals(appeals)
+            for row in deltas:
+                result['deltas'].append({
+                    'day': str(row['day']),
+                    'municipality': self._district_label(row['district_code']),
+                    'type': self._label('type', row['type_code']),
+                    'status': self._label('status', row['status_code']),
+                    'delta': int(row['delta'])
+                })
+
+            logger.info(f"🔁 Изменения после версии {since}: {len(appeals)} обращений, {len(deltas)} приращений")
+            return result
+
+        except Error as e:
+            logger.error(f"❌ Ошибка получения журнала изменений: {e}")
+            raise
+
+    @tracked
+    def prune_changes(self, retention_hours=24):
+        """Удаление записей журнала изменений старше retention_hours. Граница удаления
+        сохраняется в data_version ('changes_pruned'): клиентам с более старой версией
+        get_changes() отвечает reset=True."""
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM appeal_changes WHERE changed_at < %s",
+                    (datetime.now() - timedelta(hours=retention_hours),)
+                )
+                pruned_seq = cursor.fetchone()[0]
+                cursor.execute("DELETE FROM appeal_changes WHERE seq <= %s", (pruned_seq,))
+                removed = cursor.rowcount
+                cursor.execute(
+                    "UPDATE data_version SET version = %s WHERE name = 'changes_pruned' AND version < %s",
+                    (pruned_seq, pruned_seq)
+                )
+
+            logger.info(f"🧹 Журнал изменений очищен до версии {pruned_seq}: удалено {removed} записей")
+            return removed
+
+        except Error as e:
+            logger.error(f"❌ Ошибка очистки журнала изменений: {e}")
+            raise
+
+    @tracked
+    def get_classification(self, text_hash, types_version):
+        """Тип обращения из кэша классификации или None"""
+        try:
+            with self._read_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT appeal_type FROM classification_cache WHERE text_hash = %s AND types_version = %s",
+                    (text_hash, types_version)
+                )
+                row = cursor.fetchone()
+                cursor.close()
+            return row[0] if row else None
+
+        except Error as e:
+            logger.error(f"❌ Ошибка чтения кэша классификации: {e}")
+            raise
+
+    @tracked
+    def store_classification(self, text_hash, types_version, appeal_type):
+        """Сохранение классификации; при одновременной записи остается первая"""
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(
+                    """
+                    INSERT IGNORE INTO classification_cache (text_hash, types_version, appeal_type, created_at)
+                    VALUES (%s, %s, %s, %s)
+                    """,
+                    (text_hash, types_version, appeal_type, datetime.now())
+                )
+
+        except Error as e:
+            logger.error(f"❌ Ошибка записи кэша классификации: {e}")
+            raise
+
+    @tracked
+    def purge_classifications(self, types_version):
+        """Удаление записей кэша классификации для прежних списков категорий"""
+        try:
+            with self._transaction() as cursor:
+                cursor.execute("DELETE FROM classification_cache WHERE types_version <> %s", (types_version,))
+                removed = cursor.rowcount
+
+            if removed:
+                logger.info(f"🧹 Кэш классификации: удалено {removed} записей прежних категорий")
+            return removed
+
+        except Error as e:
+            logger.error(f"❌ Ошибка очистки кэша классификации: {e}")
+            raise
+
     def close(self):
-        """Закрытие соединения"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
-            logger.info("🔌 Соединение с MySQL закрыто")
\ No newline at end of file
+        """Запись очереди отложенной записи и закрытие пула соединений"""
+        write_buffer = getattr(self, 'write_buffer', None)
+        if write_buffer:
+            write_buffer.close()
+            self.write_buffer = None
+        for pool in (getattr(self, 'pool', None), getattr(self, 'async_pool', None)):
+            if pool:
+                pool.close()
+        replicas = getattr(self, 'replicas', None)
+        if replicas:
+            replicas.close()
+        logger.info("🔌 Соединения с MySQL закрыты")
@@ -0,0 +1,145 @@
+import re
+import threading
+from collections import namedtuple
+
+# Результат определения района: district - None, если пункт не найден или неоднозначен;
+# candidates - все подходящие районы (несколько - при неоднозначности)
+DistrictMatch = namedtuple('DistrictMatch', ['district', 'candidates', 'ambiguous'])
+
+NO_MATCH = DistrictMatch(None, (), False)
+
+# Префиксы типов населенных пунктов (после замены ё на е) и соответствующие типы
+# из таблицы settlements. Длинные варианты идут раньше коротких.
+TYPE_PREFIXES = (
+    ('поселок городского типа', 'поселок городского типа'),
+    ('рабочий поселок', 'поселок городского типа'),
+    ('пгт', 'поселок городского типа'),
+    ('поселок', 'поселок'),
+    ('пос', 'поселок'),
+    ('город', 'город'),
+    ('село', 'село'),
+    ('деревня', 'деревня'),
+    ('станция', 'станция'),
+    ('хутор', 'хутор'),
+    ('ст', 'станция'),
+    ('г', 'город'),
+    ('с', 'село'),
+    ('д', 'деревня'),
+    ('п', 'поселок'),
+    ('х', 'хутор'),
+)
+_PREFIX_TYPES = dict(TYPE_PREFIXES)
+_PREFIX_PATTERN = re.compile(
+    r"^(" + '|'.join(re.escape(prefix) for prefix, _ in TYPE_PREFIXES) + r")(?:\.\s*|\s+)"
+)
+_NOISE_PATTERN = re.compile(r"[\"«»()]")
+_SPACES_PATTERN = re.compile(r"\s+")
+
+# Районы административных центров на случай, если таблица settlements еще не заполнена
+# парсером (ключи - нормализованные названия)
+FALLBACK_DISTRICTS = {
+    'тамбов': 'Городской округ город Тамбов',
+    'мичуринск': 'Городской округ город Мичуринск',
+    'моршанск': 'Городской округ город Моршанск',
+    'кирсанов': 'Городской округ город Кирсанов',
+    'котовск': 'Городской округ город Котовск',
+    'рассказово': 'Городской округ город Рассказово',
+    'уварово': 'Городской округ город Уварово',
+    'бондари': 'Бондарский район',
+    'гавриловка': 'Гавриловский район',
+    'жердевка': 'Жердевский район',
+    'знаменка': 'Знаменский район',
+    'инжавино': 'Инжавинский район',
+    'мордово': 'Мордовский район',
+    'мучкапский': 'Мучкапский район',
+    'первомайский': 'Первомайский район',
+    'петровское': 'Петровский район',
+    'пичаево': 'Пичаевский район',
+    'ржакса': 'Ржаксинский район',
+    'сатинка': 'Сампурский район',
+    'сосновка': 'Сосновский район',
+    'староюрьево': 'Староюрьевский район',
+    'токаревка': 'Токарёвский район',
+    'умет': 'Умётский район',
+}
+
+
+def _fold(text):
+    return _SPACES_PATTERN.sub(' ', text.lower().replace('ё', 'е')).strip()
+
+
+def split_settlement_name(name):
+    """Нормализованное название и тип из префикса: "пос. Сатинка" -> ('сатинка', 'поселок').
+    Регистр и ё/е не различаются, кавычки и скобки отбрасываются."""
+    folded = _fold(_NOISE_PATTERN.sub(' ', name))
+    match = _PREFIX_PATTERN.match(folded)
+    if match and match.end() < len(folded):
+        return folded[match.end():].strip(), _PREFIX_TYPES[match.group(1)]
+    return folded, None
+
+
+class DistrictResolver:
+    """Индекс населенный пункт -> район в памяти процесса, построенный по таблице settlements.
+
+    Поиск - словарный (O(1)): сначала по точному названию без учета регистра, затем
+    по нормализованному (ё/е, префиксы типа "г.", "с.", "пос."). Одноименные пункты
+    в разных районах не угадываются: результат помечается как неоднозначный, а тип из
+    префикса используется, чтобы сузить список кандидатов.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._exact = {}
+        self._normalized = {}
+        self.loaded = False
+
+    def load(self, cursor):
+        """Полная загрузка индекса из таблицы settlements. Возвращает число пунктов."""
+        cursor.execute("SELECT name, type, district FROM settlements WHERE district IS NOT NULL")
+        exact = {}
+        normalized = {}
+        count = 0
+        for name, settlement_type, district in cursor.fetchall():
+            exact.setdefault(name.strip().lower(), set()).add(district)
+            key, _ = split_settlement_name(name)
+            normalized.setdefault(key, {}).setdefault(_fold(settlement_type or ''), set()).add(district)
+            count += 1
+
+        with self._lock:
+            self._exact = exact
+            self._normalized = normalized
+            self.loaded = True
+        return count
+
+    def invalidate(self):
+        with self._lock:
+            self.loaded = False
+
+    @staticmethod
+    def _match(districts):
+        candidates = tuple(sorted(districts))
+        if len(candidates) == 1:
+            return DistrictMatch(candidates[0], candidates, False)
+        return DistrictMatch(None, candidates, True)
+
+    def resolve(self, settlement):
+        """Район населенного пункта (DistrictMatch); NO_MATCH, если пункт неизвестен"""
+        if not settlement or not settlement.strip():
+            return NO_MATCH
+
+        districts = self._exact.get(settlement.strip().lower())
+        if districts:
+            return self._match(districts)
+
+        key, settlement_type = split_settlement_name(settlement)
+        by_type = self._normalized.get(key)
+        if by_type:
+            # Тип из префикса сужает выбор, если пункты такого типа есть
+            if settlement_type and by_type.get(settlement_type):
+                return self._match(by_type[settlement_type])
+            return self._match(set().union(*by_type.values()))
+
+        district = FALLBACK_DISTRICTS.get(key)
+        if district:
+            return DistrictMatch(district, (district,), False)
+        return NO_MATCH
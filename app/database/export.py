@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+# Колонки appeals, доступные для выгрузки
+EXPORT_COLUMNS = (
+    'id', 'user_id', 'text', 'type', 'platform', 'status', 'response',
+    'created_at', 'responded_at', 'tags', 'settlement', 'street', 'house',
+    'full_address', 'district'
+)
+DEFAULT_EXPORT_COLUMNS = (
+    'id', 'created_at', 'type', 'status', 'district', 'settlement', 'text', 'response'
+)
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+
+def resolve_export_columns(columns=None):
+    """Список колонок выгрузки: строка "a,b,c" или последовательность; ValueError для неизвестных"""
+    if not columns:
+        return list(DEFAULT_EXPORT_COLUMNS)
+    if isinstance(columns, str):
+        columns = [column.strip() for column in columns.split(',') if column.strip()]
+
+    unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Неизвестные колонки выгрузки: {', '.join(unknown)}")
+    # Без повторов, в порядке запроса
+    return list(dict.fromkeys(columns))
+
+
+def _export_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', errors='replace')
+    return value
+
+
+def stream_csv(rows, columns, batch_rows=500):
+    """CSV по частям: заголовок, затем строки порциями по batch_rows.
+    BOM в начале нужен Excel, чтобы правильно открыть кириллицу."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+
+    yield '\ufeff'
+    for row in rows:
+        writer.writerow([_export_value(value) for value in row])
+        pending += 1
+        if pending >= batch_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+
+    yield buffer.getvalue()
+
+
+def stream_jsonl(rows, columns, batch_rows=500):
+    """JSON Lines по частям: один объект на строку, порциями по batch_rows"""
+    lines = []
+    for row in rows:
+        record = {column: _export_value(value) for column, value in zip(columns, row)}
+        lines.append(json.dumps(record, ensure_ascii=False))
+        if len(lines) >= batch_rows:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+
+    if lines:
+        yield '\n'.join(lines) + '\n'
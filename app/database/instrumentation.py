@@ -0,0 +1,393 @@
+from mysql.connector import Error
+import bisect
+import functools
+import inspect
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+# Отдельный логгер медленных запросов: его можно направить в свой файл
+slow_query_logger = logging.getLogger('database.slow_queries')
+
+# Верхние границы корзин гистограммы задержек, мс (последняя корзина - все, что больше)
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_local = threading.local()
+
+_VERB_PATTERN = re.compile(r"^\s*(\w+)", re.IGNORECASE)
+_TABLE_PATTERN = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE|JOIN)\s+`?(\w+)`?", re.IGNORECASE)
+
+
+def current_method():
+    """Имя метода DatabaseManager, выполняющего запрос в текущем потоке"""
+    stack = getattr(_local, 'methods', None)
+    return stack[-1] if stack else '-'
+
+
+def _method_stack():
+    stack = getattr(_local, 'methods', None)
+    if stack is None:
+        stack = _local.methods = []
+    return stack
+
+
+def tracked(method):
+    """Отметка метода DatabaseManager: его запросы учитываются под именем метода.
+    Для генераторов имя действует на каждом шаге итерации, а не только при создании."""
+    name = method.__name__
+
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def generator_wrapper(*args, **kwargs):
+            generator = method(*args, **kwargs)
+            try:
+                while True:
+                    stack = _method_stack()
+                    stack.append(name)
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        return
+                    finally:
+                        stack.pop()
+                    yield item
+            finally:
+                stack = _method_stack()
+                stack.append(name)
+                try:
+                    generator.close()
+                finally:
+                    stack.pop()
+
+        return generator_wrapper
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        stack = _method_stack()
+        stack.append(name)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            stack.pop()
+
+    return wrapper
+
+
+def describe_query(operation):
+    """Короткое имя запроса: команда и первая таблица (SELECT appeals_daily_rollup)"""
+    verb = _VERB_PATTERN.match(operation)
+    table = _TABLE_PATTERN.search(operation)
+    name = verb.group(1).upper() if verb else 'QUERY'
+    return f"{name} {table.group(1)}" if table else name
+
+
+def redact_params(params):
+    """Параметры запроса для журнала: строки и двоичные данные заменяются их длиной,
+    чтобы тексты обращений и идентификаторы пользователей не попадали в логи"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: redact_params([value])[0] for key, value in params.items()}
+
+    redacted = []
+    for value in params:
+        if value is None or isinstance(value, (bool, int, float)):
+            redacted.append(value)
+        elif isinstance(value, datetime):
+            redacted.append(value.isoformat())
+        elif isinstance(value, (str, bytes, bytearray)):
+            redacted.append(f"<{type(value).__name__}:{len(value)}>")
+        else:
+            redacted.append(f"<{type(value).__name__}>")
+    return redacted
+
+
+class LatencyHistogram:
+    """Гистограмма задержек с фиксированными корзинами"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.fetch_ms = 0.0
+
+    def observe(self, elapsed_ms, rows=0):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.rows += rows
+
+    def add_fetch(self, elapsed_ms, rows):
+        """Чтение результата уже учтенного запроса: время и строки без нового наблюдения"""
+        self.fetch_ms += elapsed_ms
+        self.rows += rows
+
+    def percentile(self, fraction):
+        """Оценка перцентиля сверху: граница корзины, в которую он попадает"""
+        if not self.count:
+            return 0.0
+        threshold = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= threshold:
+                return float(LATENCY_BUCKETS_MS[index]) if index < len(LATENCY_BUCKETS_MS) else round(self.max_ms, 2)
+        return round(self.max_ms, 2)
+
+    def to_dict(self):
+        labels = [f"le_{bound}" for bound in LATENCY_BUCKETS_MS] + ['inf']
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 2),
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 2),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'rows': self.rows,
+            'fetch_ms': round(self.fetch_ms, 2),
+            'buckets': dict(zip(labels, self.buckets))
+        }
+
+
+class QueryMetrics:
+    """Метрики запросов процесса: гистограммы задержек по (метод, запрос), время ожидания
+    соединения по методам и журнал медленных запросов.
+
+    Запрос медленнее ``slow_query_ms`` пишется в логгер database.slow_queries с
+    обезличенными параметрами; при ``explain_slow`` к записи добавляется план EXPLAIN.
+    """
+
+    def __init__(self, slow_query_ms=500, explain_slow=False, slow_log_size=100, slow_log_file=None):
+        self.slow_query_ms = slow_query_ms
+        self.explain_slow = explain_slow
+
+        self._lock = threading.Lock()
+        self._queries = {}
+        self._waits = {}
+        self._slow = deque(maxlen=slow_log_size)
+        self._slow_total = 0
+
+        if slow_log_file and not any(
+            getattr(handler, 'baseFilename', None) for handler in slow_query_logger.handlers
+        ):
+            handler = logging.FileHandler(slow_log_file, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+            slow_query_logger.addHandler(handler)
+
+    def record_wait(self, method, elapsed_ms):
+        with self._lock:
+            histogram = self._waits.get(method)
+            if histogram is None:
+                histogram = self._waits[method] = LatencyHistogram()
+            histogram.observe(elapsed_ms)
+
+    def _query_histogram(self, method, query_name):
+        histogram = self._queries.get((method, query_name))
+        if histogram is None:
+            histogram = self._queries[(method, query_name)] = LatencyHistogram()
+        return histogram
+
+    def record_query(self, method, query_name, elapsed_ms, rows):
+        with self._lock:
+            self._query_histogram(method, query_name).observe(elapsed_ms, rows)
+
+    def record_fetch(self, method, query_name, elapsed_ms, rows):
+        with self._lock:
+            self._query_histogram(method, query_name).add_fetch(elapsed_ms, rows)
+
+    def is_slow(self, elapsed_ms):
+        return self.slow_query_ms is not None and elapsed_ms >= self.slow_query_ms
+
+    def record_slow(self, method, query_name, operation, params, elapsed_ms, rows, plan=None):
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'method': method,
+            'query': query_name,
+            'elapsed_ms': round(elapsed_ms, 2),
+            'rows': rows,
+            'sql': ' '.join(operation.split()),
+            'params': redact_params(params),
+            'plan': plan
+        }
+        with self._lock:
+            self._slow.append(entry)
+            self._slow_total += 1
+
+        slow_query_logger.warning(
+            f"🐢 Медленный запрос {elapsed_ms:.1f} мс [{method} / {query_name}], строк: {rows}: "
+            f"{entry['sql']} | параметры: {entry['params']}"
+            + (f" | план: {plan}" if plan else "")
+        )
+        return entry
+
+    def attach_plan(self, entry, plan):
+        """План EXPLAIN для уже записанного медленного запроса"""
+        with self._lock:
+            entry['plan'] = plan
+        slow_query_logger.warning(f"🐢 План медленного запроса [{entry['method']} / {entry['query']}]: {plan}")
+
+    def get_stats(self, slow_limit=20):
+        with self._lock:
+            queries = [
+                dict(method=method, query=query_name, **histogram.to_dict())
+                for (method, query_name), histogram in self._queries.items()
+            ]
+            waits = [
+                dict(method=method, **histogram.to_dict())
+                for method, histogram in self._waits.items()
+            ]
+            slow = list(self._slow)[-slow_limit:]
+            slow_total = self._slow_total
+
+        queries.sort(key=lambda q: q['total_ms'], reverse=True)
+        waits.sort(key=lambda w: w['total_ms'], reverse=True)
+        return {
+            'slow_query_ms': self.slow_query_ms,
+            'queries': queries,
+            'connection_wait': waits,
+            'slow_queries_total': slow_total,
+            'slow_queries': slow
+        }
+
+
+class InstrumentedCursor:
+    """Курсор, измеряющий время выполнения запросов.
+
+    Запрос учитывается сразу после возврата из execute(): его задержка попадает в
+    гистограмму и, если он медленный, в журнал медленных запросов. Время чтения строк
+    и их количество добавляются к тому же запросу по мере выборки. План EXPLAIN для
+    медленного SELECT можно получить на том же соединении только после чтения
+    результата, поэтому он добавляется к записи журнала позже.
+    """
+
+    def __init__(self, cursor, connection, metrics):
+        self._cursor = cursor
+        self._connection = connection
+        self._metrics = metrics
+        self._last = None
+        self._pending_explain = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _explain(self, operation, params):
+        """План запроса на том же соединении (только для SELECT)"""
+        if not operation.lstrip().upper().startswith('SELECT'):
+            return None
+        cursor = self._connection.cursor(dictionary=True)
+        try:
+            cursor.execute(f"EXPLAIN {operation}", params)
+            return cursor.fetchall()
+        except Error as e:
+            logger.debug(f"Не удалось получить план запроса: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def _explain_slow(self):
+        """План медленного запроса, когда его результат прочитан (или курсор освобождается)"""
+        pending, self._pending_explain = self._pending_explain, None
+        if pending is None:
+            return
+        entry, operation, params = pending
+        plan = self._explain(operation, params)
+        if plan:
+            self._metrics.attach_plan(entry, plan)
+
+    def _record(self, operation, params, elapsed):
+        method = current_method()
+        query_name = describe_query(operation)
+        elapsed_ms = elapsed * 1000
+        # Строки выборки считаются при чтении, rowcount - только для изменяющих запросов
+        rows = max(self._cursor.rowcount or 0, 0) if self._cursor.description is None else 0
+        self._last = (method, query_name)
+        self._metrics.record_query(method, query_name, elapsed_ms, rows)
+
+        if self._metrics.is_slow(elapsed_ms):
+            entry = self._metrics.record_slow(method, query_name, operation, params, elapsed_ms, rows)
+            if self._metrics.explain_slow and operation.lstrip().upper().startswith('SELECT'):
+                self._pending_explain = (entry, operation, params)
+
+    def _run(self, statement, operation, params, *args, **kwargs):
+        self._explain_slow()
+        self._last = None
+        started = time.perf_counter()
+        try:
+            return statement(operation, *args, **kwargs)
+        finally:
+            self._record(operation, params, time.perf_counter() - started)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        return self._run(self._cursor.execute, operation, params, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        return self._run(self._cursor.executemany, operation, None, seq_params, *args, **kwargs)
+
+    def _fetched(self, started, count, exhausted):
+        if self._last is not None:
+            self._metrics.record_fetch(*self._last, (time.perf_counter() - started) * 1000, count)
+        if exhausted:
+            self._explain_slow()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(started, 1 if row is not None else 0, row is None)
+        return row
+
+    def fetchmany(self, size=1):
+        started = time.perf_counter()
+        rows = self._cursor.fetchmany(size)
+        self._fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        try:
+            self._explain_slow()
+        finally:
+            self._cursor.close()
+
+
+class InstrumentedConnection:
+    """Соединение, выдающее инструментированные курсоры; остальное - без изменений"""
+
+    def __init__(self, connection, metrics):
+        self._connection = connection
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._connection.cursor(*args, **kwargs), self._connection, self._metrics)
+
+
+@contextmanager
+def instrumented_connection(connection_context, metrics):
+    """Соединение из пула (или маршрутизатора реплик) с учетом времени ожидания выдачи"""
+    started = time.perf_counter()
+    with connection_context as conn:
+        metrics.record_wait(current_method(), (time.perf_counter() - started) * 1000)
+        yield InstrumentedConnection(conn, metrics)
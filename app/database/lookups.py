@@ -0,0 +1,85 @@
+import threading
+
+# Справочники: поле обращения -> (таблица, колонка с кодом в appeals)
+LOOKUP_FIELDS = {
+    'status': ('appeal_statuses', 'status_code'),
+    'type': ('appeal_types', 'type_code'),
+    'district': ('districts', 'district_code'),
+}
+
+# Статусы с фиксированными кодами: код 1 - значение по умолчанию для новых обращений
+DEFAULT_STATUSES = (
+    (1, 'новое'),
+    (2, 'в работе'),
+    (3, 'отвечено'),
+    (4, 'требует проверки'),
+    (5, 'закрыто'),
+)
+
+# Код-заглушка для отсутствующего значения в ключах агрегатов
+NO_CODE = 0
+
+
+class LookupCache:
+    """Кэш справочников статусов, типов и районов в памяти процесса (код <-> название).
+
+    Справочники маленькие и меняются редко, поэтому загружаются целиком. Новые
+    названия добавляются в базу по требованию (INSERT IGNORE), неизвестный код,
+    созданный другим процессом, приводит к перезагрузке справочников.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._labels = {field: {} for field in LOOKUP_FIELDS}
+        self._codes = {field: {} for field in LOOKUP_FIELDS}
+        self.loaded = False
+
+    def load(self, cursor):
+        """Полная загрузка справочников"""
+        labels = {}
+        for field, (table, _) in LOOKUP_FIELDS.items():
+            cursor.execute(f"SELECT code, label FROM {table}")
+            labels[field] = dict(cursor.fetchall())
+
+        with self._lock:
+            self._labels = labels
+            self._codes = {
+                field: {label.lower(): code for code, label in mapping.items()}
+                for field, mapping in labels.items()
+            }
+            self.loaded = True
+
+    def invalidate(self):
+        with self._lock:
+            self.loaded = False
+
+    def label(self, field, code):
+        """Название по коду (None для пустого кода, KeyError для неизвестного)"""
+        if code is None or code == NO_CODE:
+            return None
+        return self._labels[field][code]
+
+    def code(self, field, label):
+        """Код по названию без учета регистра (None, если названия нет в справочнике)"""
+        if label is None:
+            return None
+        return self._codes[field].get(label.lower())
+
+    def ensure_code(self, cursor, field, label):
+        """Код названия с добавлением нового значения в справочник при необходимости"""
+        if label is None:
+            return None
+        code = self.code(field, label)
+        if code is not None:
+            return code
+
+        table, _ = LOOKUP_FIELDS[field]
+        cursor.execute(f"INSERT IGNORE INTO {table} (label) VALUES (%s)", (label,))
+        cursor.execute(f"SELECT code, label FROM {table} WHERE label = %s", (label,))
+        code, stored_label = cursor.fetchone()
+
+        with self._lock:
+            self._labels[field][code] = stored_label
+            self._codes[field][stored_label.lower()] = code
+            self._codes[field][label.lower()] = code
+        return code
@@ -0,0 +1,535 @@
+from mysql.connector import Error
+import logging
+from database.partitioning import AppealsPartitioner, is_partitioned
+from database.lookups import DEFAULT_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Именованная блокировка MySQL: процессы системы не применяют миграции одновременно
+MIGRATIONS_LOCK_NAME = 'citizen_appeals_schema_migrations'
+MIGRATIONS_LOCK_TIMEOUT = 300
+
+
+def index_exists(cursor, table, index_name):
+    """Проверка наличия индекса в таблице текущей базы"""
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (table, index_name))
+    return cursor.fetchone()[0] > 0
+
+
+def column_exists(cursor, table, column):
+    """Проверка наличия колонки в таблице текущей базы"""
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    return cursor.fetchone()[0] > 0
+
+
+def add_index_if_missing(cursor, table, index_name, columns):
+    if not index_exists(cursor, table, index_name):
+        cursor.execute(f"ALTER TABLE {table} ADD INDEX {index_name} {columns}")
+        logger.info(f"🗂️ Добавлен индекс {index_name} в таблицу {table}")
+
+
+def drop_index_if_exists(cursor, table, index_name):
+    if index_exists(cursor, table, index_name):
+        cursor.execute(f"ALTER TABLE {table} DROP INDEX {index_name}")
+        logger.info(f"🗂️ Удален индекс {index_name} из таблицы {table}")
+
+
+def drop_column_if_exists(cursor, table, column):
+    if column_exists(cursor, table, column):
+        cursor.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+        logger.info(f"🗂️ Удалена колонка {column} из таблицы {table}")
+
+
+def _m001_base_tables(cursor):
+    """Таблицы обращений, трендов и населенных пунктов"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS appeals (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id VARCHAR(255) NOT NULL,
+            text TEXT NOT NULL,
+            type VARCHAR(100),
+            platform VARCHAR(50),
+            status VARCHAR(50) DEFAULT 'new',
+            response TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            responded_at TIMESTAMP NULL,
+            tags JSON,
+            settlement VARCHAR(255),
+            street VARCHAR(255),
+            house VARCHAR(50),
+            full_address TEXT,
+            district VARCHAR(255),
+            INDEX idx_user (user_id),
+            INDEX idx_type (type),
+            INDEX idx_status (status),
+            INDEX idx_created (created_at),
+            INDEX idx_settlement (settlement),
+            INDEX idx_district (district)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS trends (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            keyword VARCHAR(255) NOT NULL,
+            frequency INT DEFAULT 0,
+            period DATE NOT NULL,
+            appeal_type VARCHAR(100),
+            UNIQUE KEY unique_trend (keyword, period, appeal_type)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS settlements (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            type VARCHAR(100) NOT NULL,
+            district VARCHAR(255),
+            population INT,
+            latitude DECIMAL(10, 8),
+            longitude DECIMAL(11, 8),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_name (name),
+            INDEX idx_district (district)
+        )
+    """)
+
+
+def _m002_statuses_to_russian(cursor):
+    """Перевод статусов обращений с английских на русские"""
+    status_mapping = {
+        'new': 'новое',
+        'answered': 'отвечено',
+        'requires_manual_review': 'требует проверки',
+        'in_progress': 'в работе'
+    }
+
+    for eng_status, ru_status in status_mapping.items():
+        cursor.execute(
+            "UPDATE appeals SET status = %s WHERE status = %s",
+            (ru_status, eng_status)
+        )
+        if cursor.rowcount > 0:
+            logger.info(f"🔄 Мигрированы статусы: {eng_status} -> {ru_status} ({cursor.rowcount} записей)")
+
+    cursor.execute("ALTER TABLE appeals ALTER COLUMN status SET DEFAULT 'новое'")
+
+
+def _m003_keyset_index(cursor):
+    """Индекс (created_at, id) для курсорной пагинации"""
+    add_index_if_missing(cursor, 'appeals', 'idx_created_id', '(created_at, id)')
+
+
+def _m004_daily_rollup(cursor):
+    """Дневной агрегат обращений и его первичное заполнение"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS appeals_daily_rollup (
+            day DATE NOT NULL,
+            district VARCHAR(255) NOT NULL DEFAULT '',
+            type VARCHAR(100) NOT NULL DEFAULT '',
+            status VARCHAR(50) NOT NULL DEFAULT '',
+            appeal_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, district, type, status)
+        )
+    """)
+    cursor.execute("DELETE FROM appeals_daily_rollup")
+    cursor.execute("""
+        INSERT INTO appeals_daily_rollup (day, district, type, status, appeal_count)
+        SELECT DATE(created_at), COALESCE(district, ''), COALESCE(type, ''), COALESCE(status, ''), COUNT(*)
+        FROM appeals
+        GROUP BY DATE(created_at), COALESCE(district, ''), COALESCE(type, ''), COALESCE(status, '')
+    """)
+
+
+def _m005_composite_indexes(cursor):
+    """Вычисляемая колонка district_label и составные покрывающие индексы"""
+    if not column_exists(cursor, 'appeals', 'district_label'):
+        cursor.execute("""
+            ALTER TABLE appeals
+            ADD COLUMN district_label VARCHAR(255)
+                AS (COALESCE(district, 'Не указан')) STORED
+        """)
+
+    # Диапазон по created_at с группировкой по району, типу и статусу без обращения к строкам
+    add_index_if_missing(cursor, 'appeals', 'idx_created_dims', '(created_at, district_label, type, status)')
+    # Группировка по району с фильтром по периоду
+    add_index_if_missing(cursor, 'appeals', 'idx_district_created', '(district_label, created_at)')
+    # "Мои обращения": фильтр по пользователю с сортировкой по дате
+    add_index_if_missing(cursor, 'appeals', 'idx_user_created', '(user_id, created_at)')
+
+    # Одиночные индексы, ставшие префиксами составных
+    drop_index_if_exists(cursor, 'appeals', 'idx_user')
+    drop_index_if_exists(cursor, 'appeals', 'idx_created')
+
+    # Агрегат теперь хранит район в виде district_label и пересчитывается по покрывающему индексу
+    cursor.execute("DELETE FROM appeals_daily_rollup")
+    cursor.execute("""
+        INSERT INTO appeals_daily_rollup (day, district, type, status, appeal_count)
+        SELECT DATE(created_at), district_label, COALESCE(type, ''), COALESCE(status, ''), COUNT(*)
+        FROM appeals
+        GROUP BY DATE(created_at), district_label, COALESCE(type, ''), COALESCE(status, '')
+    """)
+
+
+def _m006_realtime_counters(cursor):
+    """Счетчики реального времени и поминутные корзины за последние сутки"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS appeal_counters (
+            counter_group VARCHAR(20) NOT NULL,
+            counter_key VARCHAR(150) NOT NULL DEFAULT '',
+            value BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (counter_group, counter_key)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS appeal_minute_buckets (
+            bucket_minute DATETIME NOT NULL PRIMARY KEY,
+            appeal_count INT NOT NULL DEFAULT 0
+        )
+    """)
+
+    cursor.execute("DELETE FROM appeal_counters")
+    cursor.execute("""
+        INSERT INTO appeal_counters (counter_group, counter_key, value)
+        SELECT 'total', '', COUNT(*) FROM appeals
+        UNION ALL
+        SELECT 'status', COALESCE(status, ''), COUNT(*) FROM appeals GROUP BY COALESCE(status, '')
+        UNION ALL
+        SELECT 'type', COALESCE(type, ''), COUNT(*) FROM appeals GROUP BY COALESCE(type, '')
+    """)
+
+    cursor.execute("DELETE FROM appeal_minute_buckets")
+    cursor.execute("""
+        INSERT INTO appeal_minute_buckets (bucket_minute, appeal_count)
+        SELECT DATE_FORMAT(created_at, '%Y-%m-%d %H:%i:00'), COUNT(*)
+        FROM appeals
+        WHERE created_at >= DATE_SUB(NOW(), INTERVAL 24 HOUR)
+        GROUP BY DATE_FORMAT(created_at, '%Y-%m-%d %H:%i:00')
+    """)
+
+
+def _m007_monthly_partitions(cursor):
+    """Секционирование appeals по месяцам created_at и журнал архивации секций"""
+    if not is_partitioned(cursor, 'appeals'):
+        # Колонка секционирования должна входить в каждый уникальный ключ, включая первичный
+        cursor.execute("UPDATE appeals SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+        cursor.execute("""
+            ALTER TABLE appeals
+            MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (id, created_at)
+        """)
+        AppealsPartitioner().partition_table(cursor)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS appeals_archive_log (
+            archive_table VARCHAR(64) NOT NULL PRIMARY KEY,
+            partition_name VARCHAR(64) NOT NULL,
+            appeal_count INT NOT NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _m008_fulltext_search(cursor):
+    """Поисковый индекс по текстам обращений и ответов (FULLTEXT с ngram-парсером).
+    Секционированная таблица appeals не поддерживает FULLTEXT, поэтому индекс
+    хранится в отдельной таблице appeal_search, которая ведется вместе с appeals."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS appeal_search (
+            appeal_id INT NOT NULL PRIMARY KEY,
+            text TEXT NOT NULL,
+            response TEXT,
+            FULLTEXT INDEX ft_appeal_search (text, response) WITH PARSER ngram
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO appeal_search (appeal_id, text, response)
+        SELECT id, text, response FROM appeals
+        ON DUPLICATE KEY UPDATE text = VALUES(text), response = VALUES(response)
+    """)
+
+
+def _m009_data_version(cursor):
+    """Версия данных обращений для инвалидации кэша результатов во всех процессах"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            name VARCHAR(50) NOT NULL PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("INSERT IGNORE INTO data_version (name, version) VALUES ('appeals', 0)")
+
+
+def _m010_lookup_codes(cursor):
+    """Справочники статусов, типов и районов; appeals и агрегаты хранят короткие коды"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS appeal_statuses (
+            code TINYINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+            label VARCHAR(50) NOT NULL,
+            UNIQUE KEY uq_label (label)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS appeal_types (
+            code SMALLINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+            label VARCHAR(100) NOT NULL,
+            UNIQUE KEY uq_label (label)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS districts (
+            code SMALLINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+            label VARCHAR(255) NOT NULL,
+            UNIQUE KEY uq_label (label)
+        )
+    """)
+    cursor.executemany("INSERT IGNORE INTO appeal_statuses (code, label) VALUES (%s, %s)", list(DEFAULT_STATUSES))
+    cursor.execute("INSERT IGNORE INTO data_version (name, version) VALUES ('lookups', 0)")
+
+    if column_exists(cursor, 'appeals', 'status'):
+        # Справочники из уже существующих значений (районы - также из населенных пунктов)
+        cursor.execute("INSERT IGNORE INTO appeal_statuses (label) SELECT DISTINCT status FROM appeals WHERE status IS NOT NULL")
+        cursor.execute("INSERT IGNORE INTO appeal_types (label) SELECT DISTINCT type FROM appeals WHERE type IS NOT NULL")
+        cursor.execute("INSERT IGNORE INTO districts (label) SELECT DISTINCT district FROM appeals WHERE district IS NOT NULL")
+    cursor.execute("INSERT IGNORE INTO districts (label) SELECT DISTINCT district FROM settlements WHERE district IS NOT NULL")
+
+    if not column_exists(cursor, 'appeals', 'status_code'):
+        cursor.execute("""
+            ALTER TABLE appeals
+            ADD COLUMN status_code TINYINT UNSIGNED NULL DEFAULT 1,
+            ADD COLUMN type_code SMALLINT UNSIGNED NULL,
+            ADD COLUMN district_code SMALLINT UNSIGNED NULL
+        """)
+
+    if column_exists(cursor, 'appeals', 'status'):
+        cursor.execute("""
+            UPDATE appeals a
+            LEFT JOIN appeal_statuses s ON s.label = a.status
+            LEFT JOIN appeal_types t ON t.label = a.type
+            LEFT JOIN districts d ON d.label = a.district
+            SET a.status_code = s.code, a.type_code = t.code, a.district_code = d.code
+        """)
+
+    # Индексы по текстовым колонкам заменяются индексами по кодам
+    for index_name in ('idx_type', 'idx_status', 'idx_district', 'idx_created_dims', 'idx_district_created'):
+        drop_index_if_exists(cursor, 'appeals', index_name)
+    for column in ('district_label', 'status', 'type', 'district'):
+        drop_column_if_exists(cursor, 'appeals', column)
+
+    add_index_if_missing(cursor, 'appeals', 'idx_type', '(type_code)')
+    add_index_if_missing(cursor, 'appeals', 'idx_status', '(status_code)')
+    add_index_if_missing(cursor, 'appeals', 'idx_created_dims', '(created_at, district_code, type_code, status_code)')
+    add_index_if_missing(cursor, 'appeals', 'idx_district_created', '(district_code, created_at)')
+
+    # Агрегаты по кодам; 0 - значение не указано
+    cursor.execute("DROP TABLE IF EXISTS appeals_daily_rollup")
+    cursor.execute("""
+        CREATE TABLE appeals_daily_rollup (
+            day DATE NOT NULL,
+            district_code SMALLINT UNSIGNED NOT NULL DEFAULT 0,
+            type_code SMALLINT UNSIGNED NOT NULL DEFAULT 0,
+            status_code TINYINT UNSIGNED NOT NULL DEFAULT 0,
+            appeal_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, district_code, type_code, status_code)
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO appeals_daily_rollup (day, district_code, type_code, status_code, appeal_count)
+        SELECT DATE(created_at), COALESCE(district_code, 0), COALESCE(type_code, 0), COALESCE(status_code, 0), COUNT(*)
+        FROM appeals
+        GROUP BY DATE(created_at), COALESCE(district_code, 0), COALESCE(type_code, 0), COALESCE(status_code, 0)
+    """)
+
+    cursor.execute("DELETE FROM appeal_counters")
+    cursor.execute("""
+        INSERT INTO appeal_counters (counter_group, counter_key, value)
+        SELECT 'total', '', COUNT(*) FROM appeals
+        UNION ALL
+        SELECT 'status', COALESCE(CAST(status_code AS CHAR), ''), COUNT(*) FROM appeals GROUP BY status_code
+        UNION ALL
+        SELECT 'type', COALESCE(CAST(type_code AS CHAR), ''), COUNT(*) FROM appeals GROUP BY type_code
+    """)
+
+    # Представление с читаемыми названиями для отчетов и ручных запросов
+    cursor.execute("""
+        CREATE OR REPLACE VIEW appeals_labeled AS
+        SELECT
+            a.id, a.user_id, a.text,
+            t.label AS type, a.platform, s.label AS status,
+            a.response, a.created_at, a.responded_at, a.tags,
+            a.settlement, a.street, a.house, a.full_address,
+            d.label AS district,
+            a.status_code, a.type_code, a.district_code
+        FROM appeals a
+        LEFT JOIN appeal_statuses s ON s.code = a.status_code
+        LEFT JOIN appeal_types t ON t.code = a.type_code
+        LEFT JOIN districts d ON d.code = a.district_code
+    """)
+
+
+def _m011_settlements_version(cursor):
+    """Версия таблицы населенных пунктов: парсер увеличивает ее при перезагрузке,
+    процессы по ней перестраивают индекс районов"""
+    cursor.execute("INSERT IGNORE INTO data_version (name, version) VALUES ('settlements', 0)")
+
+
+def _m012_write_behind(cursor):
+    """Контрольные точки журналов отложенной записи и временные ID записанных обращений"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS write_behind_checkpoints (
+            journal VARCHAR(100) NOT NULL PRIMARY KEY,
+            seq BIGINT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS write_behind_refs (
+            journal VARCHAR(100) NOT NULL,
+            ref BIGINT NOT NULL,
+            appeal_id INT NOT NULL,
+            PRIMARY KEY (journal, ref)
+        )
+    """)
+
+
+def _m013_response_time_index(cursor):
+    """Индекс для статистики времени до ответа: выборка за период по created_at
+    без чтения строк обращений"""
+    add_index_if_missing(
+        cursor, 'appeals', 'idx_created_responded',
+        '(created_at, district_code, type_code, responded_at)'
+    )
+
+
+def _m014_change_log(cursor):
+    """Журнал изменений обращений для инкрементального обновления дашборда.
+    seq - версия данных 'appeals' транзакции: версии выдаются в порядке фиксации"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS appeal_changes (
+            change_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            seq BIGINT NOT NULL,
+            appeal_id INT NOT NULL,
+            change_type VARCHAR(10) NOT NULL,
+            day DATE NOT NULL,
+            district_code SMALLINT,
+            type_code SMALLINT,
+            status_code TINYINT,
+            prev_day DATE NULL,
+            prev_district_code SMALLINT NULL,
+            prev_type_code SMALLINT NULL,
+            prev_status_code TINYINT NULL,
+            changed_at DATETIME NOT NULL,
+            INDEX idx_seq (seq),
+            INDEX idx_changed_at (changed_at)
+        )
+    """)
+    cursor.execute("INSERT IGNORE INTO data_version (name, version) VALUES ('changes_pruned', 0)")
+
+
+def _m015_classification_cache(cursor):
+    """Кэш классификации обращений: хэш нормализованного текста -> тип обращения.
+    types_version - хэш списка категорий, при смене категорий записи не используются"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS classification_cache (
+            text_hash CHAR(64) NOT NULL,
+            types_version CHAR(16) NOT NULL,
+            appeal_type VARCHAR(100) NOT NULL,
+            created_at DATETIME NOT NULL,
+            PRIMARY KEY (text_hash, types_version)
+        )
+    """)
+
+
+# Упорядоченный список миграций: (версия, описание, шаг).
+# DDL в MySQL фиксируется неявно, поэтому каждый шаг идемпотентен и может быть повторен
+# после частичного выполнения. Новые миграции добавляются только в конец списка.
+MIGRATIONS = [
+    (1, 'Базовые таблицы обращений, трендов и населенных пунктов', _m001_base_tables),
+    (2, 'Русские статусы обращений', _m002_statuses_to_russian),
+    (3, 'Индекс для курсорной пагинации', _m003_keyset_index),
+    (4, 'Дневной агрегат обращений', _m004_daily_rollup),
+    (5, 'Составные индексы и колонка district_label', _m005_composite_indexes),
+    (6, 'Счетчики реального времени', _m006_realtime_counters),
+    (7, 'Секционирование обращений по месяцам', _m007_monthly_partitions),
+    (8, 'Полнотекстовый поиск по обращениям', _m008_fulltext_search),
+    (9, 'Версия данных для кэша результатов', _m009_data_version),
+    (10, 'Справочники статусов, типов и районов', _m010_lookup_codes),
+    (11, 'Версия таблицы населенных пунктов', _m011_settlements_version),
+    (12, 'Служебные таблицы отложенной записи', _m012_write_behind),
+    (13, 'Индекс для статистики времени до ответа', _m013_response_time_index),
+    (14, 'Журнал изменений обращений', _m014_change_log),
+    (15, 'Кэш классификации обращений', _m015_classification_cache),
+]
+
+
+class MigrationRunner:
+    """Применение версионированных миграций схемы с учетом таблицы schema_version"""
+
+    def __init__(self, connection, migrations=None):
+        self.connection = connection
+        self.migrations = sorted(migrations or MIGRATIONS, key=lambda m: m[0])
+
+    def _ensure_version_table(self, cursor):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INT PRIMARY KEY,
+                description VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+    def current_version(self, cursor):
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        return cursor.fetchone()[0]
+
+    def run(self):
+        """Применение всех еще не примененных миграций по порядку. Возвращает список версий."""
+        cursor = self.connection.cursor()
+        applied = []
+        try:
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (MIGRATIONS_LOCK_NAME, MIGRATIONS_LOCK_TIMEOUT))
+            if cursor.fetchone()[0] != 1:
+                raise Error(msg="Не удалось получить блокировку для применения миграций")
+
+            try:
+                self._ensure_version_table(cursor)
+                current = self.current_version(cursor)
+
+                for version, description, step in self.migrations:
+                    if version <= current:
+                        continue
+
+                    logger.info(f"🗄️ Применение миграции {version}: {description}")
+                    self.connection.start_transaction()
+                    step(cursor)
+                    cursor.execute(
+                        "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                        (version, description)
+                    )
+                    self.connection.commit()
+                    applied.append(version)
+
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATIONS_LOCK_NAME,))
+                cursor.fetchone()
+
+            if applied:
+                logger.info(f"✅ Применены миграции: {', '.join(map(str, applied))}")
+            else:
+                logger.info("✅ Схема базы данных актуальна")
+            return applied
+
+        except Error as e:
+            if self.connection.in_transaction:
+                self.connection.rollback()
+            logger.error(f"❌ Ошибка применения миграций: {e}")
+            raise
+        finally:
+            cursor.close()
@@ -0,0 +1,167 @@
+import logging
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+# Секция-заглушка для строк позже последнего созданного месяца: вставка не падает,
+# даже если обслуживание давно не запускалось
+FUTURE_PARTITION = 'p_future'
+ARCHIVE_TABLE_PREFIX = 'appeals_archive_'
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    """Имя месячной секции: p202610 - обращения за октябрь 2026"""
+    return f"p{month:%Y%m}"
+
+
+def archive_table_name(month):
+    return f"{ARCHIVE_TABLE_PREFIX}{month:%Y%m}"
+
+
+def partition_definition(month):
+    """Описание секции месяца: created_at < начала следующего месяца"""
+    bound = add_months(month, 1)
+    return (f"PARTITION {partition_name(month)} "
+            f"VALUES LESS THAN (UNIX_TIMESTAMP('{bound:%Y-%m-%d} 00:00:00'))")
+
+
+def future_partition_definition():
+    return f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE"
+
+
+def list_partitions(cursor, table='appeals'):
+    """Секции таблицы по порядку: [(имя, оценка числа строк)]"""
+    cursor.execute("""
+        SELECT partition_name, table_rows FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL
+        ORDER BY partition_ordinal_position
+    """, (table,))
+    return [(name, rows) for name, rows in cursor.fetchall()]
+
+
+def is_partitioned(cursor, table='appeals'):
+    return bool(list_partitions(cursor, table))
+
+
+def partition_months(cursor, table='appeals'):
+    """Месяцы, для которых у таблицы есть секции (без секции-заглушки)"""
+    months = []
+    for name, _ in list_partitions(cursor, table):
+        if name == FUTURE_PARTITION:
+            continue
+        months.append(date(int(name[1:5]), int(name[5:7]), 1))
+    return months
+
+
+class AppealsPartitioner:
+    """Секционирование таблицы appeals по месяцам created_at (RANGE по UNIX_TIMESTAMP).
+
+    Запросы с условием на created_at затрагивают только секции нужных месяцев,
+    а удаление старых данных сводится к переносу секции в архивную таблицу
+    (EXCHANGE PARTITION) и удалению пустой секции вместо массового DELETE.
+    """
+
+    def __init__(self, future_months=3, retention_months=None):
+        self.future_months = future_months
+        self.retention_months = retention_months
+
+    def partition_table(self, cursor, today=None):
+        """Первичное секционирование appeals: от месяца самого старого обращения
+        до future_months месяцев вперед. Перестраивает таблицу целиком."""
+        today = month_start(today or date.today())
+        cursor.execute("SELECT MIN(created_at) FROM appeals")
+        oldest = cursor.fetchone()[0]
+        first = month_start(oldest) if oldest else today
+        last = add_months(today, self.future_months)
+
+        definitions = []
+        month = first
+        while month <= last:
+            definitions.append(partition_definition(month))
+            month = add_months(month, 1)
+        definitions.append(future_partition_definition())
+
+        cursor.execute(
+            "ALTER TABLE appeals PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (\n    "
+            + ",\n    ".join(definitions)
+            + "\n)"
+        )
+        logger.info(f"🗂️ Таблица appeals секционирована по месяцам: {len(definitions) - 1} секций")
+
+    def ensure_future_partitions(self, cursor, today=None):
+        """Создание секций на future_months месяцев вперед выделением из секции-заглушки.
+        Возвращает имена созданных секций."""
+        today = month_start(today or date.today())
+        months = partition_months(cursor)
+        last_existing = months[-1] if months else add_months(today, -1)
+        target = add_months(today, self.future_months)
+
+        new_months = []
+        month = add_months(last_existing, 1)
+        while month <= target:
+            new_months.append(month)
+            month = add_months(month, 1)
+
+        if not new_months:
+            return []
+
+        definitions = [partition_definition(month) for month in new_months]
+        definitions.append(future_partition_definition())
+        cursor.execute(
+            f"ALTER TABLE appeals REORGANIZE PARTITION {FUTURE_PARTITION} INTO (\n    "
+            + ",\n    ".join(definitions)
+            + "\n)"
+        )
+        created = [partition_name(month) for month in new_months]
+        logger.info(f"🗂️ Созданы секции appeals: {', '.join(created)}")
+        return created
+
+    def expired_months(self, cursor, today=None):
+        """Месяцы, целиком вышедшие за окно хранения retention_months"""
+        if not self.retention_months:
+            return []
+        boundary = add_months(month_start(today or date.today()), -self.retention_months)
+        return [month for month in partition_months(cursor) if month < boundary]
+
+    def detach_partition(self, cursor, month):
+        """Перенос секции месяца в пустую архивную таблицу той же структуры (EXCHANGE PARTITION).
+        Возвращает имя архивной таблицы."""
+        archive_table = archive_table_name(month)
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {archive_table} LIKE appeals")
+        cursor.execute(
+            "SELECT create_options FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = %s",
+            (archive_table,)
+        )
+        if 'partitioned' in (cursor.fetchone()[0] or ''):
+            cursor.execute(f"ALTER TABLE {archive_table} REMOVE PARTITIONING")
+
+        # Непустая архивная таблица означает, что обмен уже выполнен прошлым запуском:
+        # повторный EXCHANGE вернул бы архив обратно в секцию
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {archive_table})")
+        if cursor.fetchone()[0]:
+            logger.info(f"🗂️ Секция {partition_name(month)} уже перенесена в {archive_table}")
+            return archive_table
+
+        cursor.execute(f"ALTER TABLE appeals EXCHANGE PARTITION {partition_name(month)} WITH TABLE {archive_table}")
+        return archive_table
+
+    def drop_partition(self, cursor, month):
+        """Удаление секции месяца, если она пуста. Возвращает True, если секция удалена."""
+        name = partition_name(month)
+        cursor.execute(f"SELECT COUNT(*) FROM appeals PARTITION ({name})")
+        remaining = cursor.fetchone()[0]
+        if remaining:
+            logger.warning(f"⚠️ Секция {name} не удалена: в ней осталось {remaining} обращений")
+            return False
+        cursor.execute(f"ALTER TABLE appeals DROP PARTITION {name}")
+        return True
@@ -0,0 +1,165 @@
+from mysql.connector import Error
+from mysql.connector import errors as mysql_errors
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from database.connection_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaRouter:
+    """Распределение читающих запросов по репликам MySQL.
+
+    Реплики выбираются по кругу (round-robin). Реплика, на которой не удалось
+    получить соединение или у которой отставание превышает ``max_lag_seconds``,
+    исключается на ``retry_interval`` секунд. Если здоровых реплик нет, запрос
+    выполняется на основном сервере.
+    """
+
+    def __init__(self, pools, retry_interval=30.0, health_check_interval=10.0, max_lag_seconds=None):
+        self.pools = pools
+        self.retry_interval = retry_interval
+        self.health_check_interval = health_check_interval
+        self.max_lag_seconds = max_lag_seconds
+
+        self._lock = threading.Lock()
+        self._next = 0
+        self._down_until = {pool.name: 0.0 for pool in pools}
+        self._checked_at = {pool.name: 0.0 for pool in pools}
+
+    @classmethod
+    def from_config(cls, replica_config):
+        """Создание маршрутизатора из блока mysql_replica_config.
+
+        Блок может описывать одну реплику (параметры подключения) или содержать
+        список "replicas" и общие настройки проверки здоровья. Пустой список -
+        реплик нет (None), все запросы выполняются на основном сервере.
+        """
+        settings = dict(replica_config)
+        replicas = settings.pop('replicas', None)
+        if replicas is None:
+            replicas = [settings]
+            settings = {}
+        if not replicas:
+            logger.info("ℹ️ Реплики для чтения не настроены, запросы идут на основной сервер")
+            return None
+
+        pools = []
+        for index, replica in enumerate(replicas, 1):
+            db_config = dict(replica)
+            pool_config = db_config.pop('pool', None) or {}
+            pools.append(ConnectionPool(
+                db_config,
+                pool_size=pool_config.get('size', 5),
+                checkout_timeout=pool_config.get('checkout_timeout', 10),
+                validation_interval=pool_config.get('validation_interval', 30),
+                name=f"replica-{index}"
+            ))
+
+        logger.info(f"✅ Настроено реплик для чтения: {len(pools)}")
+        return cls(
+            pools,
+            retry_interval=settings.get('retry_interval', 30),
+            health_check_interval=settings.get('health_check_interval', 10),
+            max_lag_seconds=settings.get('max_lag_seconds')
+        )
+
+    def _candidates(self):
+        """Здоровые реплики в порядке round-robin"""
+        now = time.monotonic()
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.pools)
+        ordered = self.pools[start:] + self.pools[:start]
+        return [pool for pool in ordered if self._down_until[pool.name] <= now]
+
+    def mark_down(self, pool, reason):
+        self._down_until[pool.name] = time.monotonic() + self.retry_interval
+        logger.warning(f"⚠️ Реплика {pool.name} исключена на {self.retry_interval} с: {reason}")
+
+    def _replication_lag(self, conn):
+        """Отставание реплики в секундах (None, если репликация не работает)"""
+        cursor = conn.cursor(dictionary=True)
+        try:
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except mysql_errors.ProgrammingError:
+                cursor.execute("SHOW SLAVE STATUS")
+            status = cursor.fetchone()
+        finally:
+            cursor.close()
+
+        if not status:
+            return None
+        lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+        return None if lag is None else int(lag)
+
+    def _is_healthy(self, pool, conn):
+        """Проверка отставания реплики не чаще раза в health_check_interval секунд"""
+        if self.max_lag_seconds is None:
+            return True
+
+        now = time.monotonic()
+        if now - self._checked_at[pool.name] < self.health_check_interval:
+            return True
+        self._checked_at[pool.name] = now
+
+        lag = self._replication_lag(conn)
+        if lag is None or lag > self.max_lag_seconds:
+            self.mark_down(pool, f"отставание репликации {lag} с")
+            return False
+        return True
+
+    def _acquire(self):
+        for pool in self._candidates():
+            try:
+                conn = pool.acquire()
+            except Error as e:
+                self.mark_down(pool, e)
+                continue
+
+            try:
+                healthy = self._is_healthy(pool, conn)
+            except Error as e:
+                self.mark_down(pool, e)
+                pool.release(conn, discard=True)
+                continue
+
+            if healthy:
+                return pool, conn
+            pool.release(conn)
+        return None, None
+
+    @contextmanager
+    def connection(self, fallback_pool):
+        """Соединение с репликой, а при отсутствии здоровых реплик - с основным сервером"""
+        pool, conn = self._acquire()
+        if conn is None:
+            with fallback_pool.connection() as conn:
+                yield conn
+            return
+
+        discard = False
+        try:
+            yield conn
+        except (mysql_errors.OperationalError, mysql_errors.InterfaceError) as e:
+            discard = True
+            self.mark_down(pool, e)
+            raise
+        finally:
+            pool.release(conn, discard=discard)
+
+    def get_stats(self):
+        now = time.monotonic()
+        stats = []
+        for pool in self.pools:
+            pool_stats = pool.get_stats()
+            pool_stats['healthy'] = self._down_until[pool.name] <= now
+            stats.append(pool_stats)
+        return stats
+
+    def close(self):
+        for pool in self.pools:
+            pool.close()
@@ -0,0 +1,137 @@
+import copy
+import functools
+import inspect
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """Вычисление значения, которого ждут остальные вызывающие с тем же ключом"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    """Потокобезопасный кэш результатов чтения с TTL, LRU-вытеснением и версией данных.
+
+    Запись действительна, пока не истек ``ttl`` и версия данных, с которой она
+    вычислена, совпадает с текущей: любая запись в базу увеличивает версию и тем
+    самым делает недействительными все записи сразу. Промах по ключу вычисляется
+    только одним потоком, остальные ждут его результата (single-flight).
+    """
+
+    def __init__(self, max_entries=256, ttl=30.0):
+        if max_entries < 1:
+            raise ValueError("Размер кэша должен быть не меньше 1")
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+    def get_or_compute(self, key, version, compute):
+        """Значение из кэша или результат compute(); пустые результаты не сохраняются,
+        так как методы чтения возвращают их и при ошибке базы"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, expires_at, value = entry
+                if entry_version == version and expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return copy.deepcopy(value)
+
+                del self._entries[key]
+                if entry_version != version:
+                    self._stats['invalidations'] += 1
+                else:
+                    self._stats['expirations'] += 1
+
+            flight = self._inflight.get((key, version))
+            owner = flight is None
+            if owner:
+                flight = _Flight()
+                self._inflight[(key, version)] = flight
+                self._stats['misses'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not owner:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.value)
+
+        try:
+            value = compute()
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._inflight.pop((key, version), None)
+            flight.event.set()
+            raise
+
+        with self._lock:
+            self._inflight.pop((key, version), None)
+            if value:
+                self._entries[key] = (version, time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+
+        flight.value = value
+        flight.event.set()
+        return copy.deepcopy(value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_rate'] = round((stats['hits'] + stats['coalesced']) * 100.0 / lookups, 2) if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['ttl'] = self.ttl
+        return stats
+
+
+def cached_read(method):
+    """Кэширование метода чтения DatabaseManager по имени метода и аргументам
+    (с подстановкой значений по умолчанию, чтобы f() и f(30) давали один ключ)"""
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        key = (method.__name__,) + tuple(
+            (name, value) for name, value in bound.arguments.items() if name != 'self'
+        )
+
+        version = self.get_data_version()
+        if version is None:
+            return method(self, *args, **kwargs)
+        return self.cache.get_or_compute(key, version, lambda: method(self, *args, **kwargs))
+
+    return wrapper
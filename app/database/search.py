@@ -0,0 +1,79 @@
+import base64
+import html
+import json
+import re
+
+# Минимальная длина слова для ngram-парсера MySQL (ngram_token_size по умолчанию)
+MIN_TERM_LENGTH = 2
+MAX_TERMS = 10
+
+_TERM_PATTERN = re.compile(r"[\w-]+", re.UNICODE)
+
+
+def extract_terms(query):
+    """Слова поискового запроса без операторов булевого режима MySQL"""
+    terms = []
+    for term in _TERM_PATTERN.findall(query or ''):
+        term = term.strip('-').lower()
+        if len(term) >= MIN_TERM_LENGTH and term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def build_boolean_query(terms):
+    """Запрос IN BOOLEAN MODE: каждое слово обязательно.
+    ngram-парсер превращает слово во фразу из его n-грамм, поэтому работает и для русского."""
+    return ' '.join(f'+"{term}"' for term in terms)
+
+
+def build_fts5_query(terms):
+    """Запрос FTS5 для SQLite: каждое слово обязательно и ищется как префикс,
+    что для русского языка заменяет ngram-поиск по части слова"""
+    return ' AND '.join(f'"{term}"*' for term in terms)
+
+
+def encode_search_cursor(relevance, appeal_id):
+    """Непрозрачный курсор поиска по паре (релевантность, id)"""
+    raw = json.dumps([relevance, appeal_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_search_cursor(cursor):
+    """Разбор курсора поиска, ValueError для некорректного значения"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii'))
+        relevance, appeal_id = json.loads(raw)
+        return float(relevance), int(appeal_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Некорректный курсор поиска: {cursor}") from e
+
+
+def build_snippet(text, terms, width=160):
+    """Фрагмент текста вокруг первого найденного слова с подсветкой совпадений в <mark>.
+    Текст экранируется, поэтому фрагмент можно вставлять в HTML как есть."""
+    if not text:
+        return ''
+
+    lowered = text.lower()
+    positions = [lowered.find(term) for term in terms]
+    positions = [position for position in positions if position >= 0]
+    first = min(positions) if positions else 0
+
+    start = max(0, first - width // 3)
+    end = min(len(text), start + width)
+    fragment = text[start:end]
+
+    highlighted = html.escape(fragment)
+    if terms:
+        # Один проход по всем словам: более длинные слова в приоритете, вложенных <mark> нет.
+        # Совпадения ищутся в исходном тексте, иначе слово вроде "lt" попало бы внутрь &lt;
+        pattern = '|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+        parts = re.split(f"({pattern})", fragment, flags=re.IGNORECASE)
+        highlighted = ''.join(
+            f"<mark>{html.escape(part)}</mark>" if index % 2 else html.escape(part)
+            for index, part in enumerate(parts)
+        )
+
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if end < len(text) else ''
+    return f"{prefix}{highlighted}{suffix}"
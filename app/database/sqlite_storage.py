@@ -0,0 +1,514 @@
+from mysql.connector import Error
+import logging
+import os
+import re
+import sqlite3
+from datetime import date, datetime
+from database.connection_pool import ConnectionPool
+from database.database_manager import DatabaseManager
+from database.instrumentation import tracked
+from database.lookups import DEFAULT_STATUSES, LOOKUP_FIELDS
+from database.search import build_fts5_query
+
+logger = logging.getLogger(__name__)
+
+# Даты хранятся строками ISO 8601: сравнение строк совпадает со сравнением дат
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('DATETIME', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()[:10]))
+
+_INSERT_IGNORE_PATTERN = re.compile(r"^(\s*)INSERT\s+IGNORE\b", re.IGNORECASE)
+
+
+def translate_query(operation, params=None):
+    """Запрос в стиле mysql.connector для SQLite: %s -> ?, INSERT IGNORE -> INSERT OR IGNORE.
+    Как и в mysql.connector, %% превращается в % только в запросах с параметрами."""
+    operation = _INSERT_IGNORE_PATTERN.sub(r"\1INSERT OR IGNORE", operation)
+    if params is not None:
+        operation = operation.replace('%%', '\0').replace('%s', '?').replace('\0', '%')
+    return operation
+
+
+class SQLiteCursor:
+    """Курсор SQLite с интерфейсом курсора mysql.connector (dictionary=True, ошибки Error)"""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, operation, params=None):
+        try:
+            self._cursor.execute(translate_query(operation, params), params or ())
+        except sqlite3.Error as e:
+            raise Error(msg=f"SQLite: {e}") from e
+
+    def executemany(self, operation, seq_params):
+        try:
+            self._cursor.executemany(translate_query(operation, ()), seq_params)
+        except sqlite3.Error as e:
+            raise Error(msg=f"SQLite: {e}") from e
+
+    def _convert(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._convert(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._convert(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._convert(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """Соединение SQLite в режиме WAL с интерфейсом соединения mysql.connector,
+    которым пользуются пул и DatabaseManager (start_transaction, in_transaction, ping)"""
+
+    unread_result = False
+
+    def __init__(self, path, busy_timeout=10.0):
+        self.path = path
+        try:
+            self._connection = sqlite3.connect(
+                path,
+                timeout=busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+                detect_types=sqlite3.PARSE_DECLTYPES
+            )
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute("PRAGMA synchronous = NORMAL")
+        except sqlite3.Error as e:
+            raise Error(msg=f"SQLite: {e}") from e
+
+    def cursor(self, dictionary=False, buffered=None):
+        # Курсор SQLite и так читает строки по мере выборки, buffered не нужен
+        return SQLiteCursor(self._connection.cursor(), dictionary=dictionary)
+
+    @property
+    def in_transaction(self):
+        return self._connection.in_transaction
+
+    def _execute(self, statement):
+        try:
+            self._connection.execute(statement)
+        except sqlite3.Error as e:
+            raise Error(msg=f"SQLite: {e}") from e
+
+    def start_transaction(self):
+        # Блокировка записи берется сразу: транзакция не упрется в занятую базу на середине
+        self._execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        if self._connection.in_transaction:
+            self._execute("COMMIT")
+
+    def rollback(self):
+        if self._connection.in_transaction:
+            self._execute("ROLLBACK")
+
+    def ping(self, reconnect=False):
+        self._execute("SELECT 1")
+
+    def close(self):
+        self._connection.close()
+
+
+class SQLiteConnectionPool(ConnectionPool):
+    """Пул соединений с файлом SQLite: те же ограничения, ожидание и метрики, что у пула MySQL"""
+
+    def __init__(self, path, pool_size=5, checkout_timeout=10.0, busy_timeout=10.0, name='sqlite'):
+        super().__init__({}, pool_size=pool_size, checkout_timeout=checkout_timeout,
+                         validation_interval=float('inf'), name=name)
+        self.path = path
+        self.busy_timeout = busy_timeout
+
+    def _open(self):
+        conn = SQLiteConnection(self.path, busy_timeout=self.busy_timeout)
+        logger.info(f"✅ Открыто соединение с SQLite {self.path} (всего {self._created})")
+        return conn
+
+
+def _sqlite_base_schema(cursor):
+    """Схема, соответствующая миграциям MySQL 1-12: те же таблицы, колонки и индексы.
+    Секционирования нет, поиск - таблица FTS5 с rowid = ID обращения."""
+    for table in ('appeal_statuses', 'appeal_types', 'districts'):
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                code INTEGER PRIMARY KEY AUTOINCREMENT,
+                label VARCHAR(255) NOT NULL UNIQUE
+            )
+        """)
+    cursor.executemany("INSERT OR IGNORE INTO appeal_statuses (code, label) VALUES (?, ?)", DEFAULT_STATUSES)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS appeals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id VARCHAR(255) NOT NULL,
+            text TEXT NOT NULL,
+            type_code SMALLINT,
+            platform VARCHAR(50),
+            status_code TINYINT DEFAULT 1,
+            response TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            responded_at TIMESTAMP NULL,
+            tags JSON,
+            settlement VARCHAR(255),
+            street VARCHAR(255),
+            house VARCHAR(50),
+            full_address TEXT,
+            district_code SMALLINT
+        )
+    """)
+    for index_name, columns in (
+        ('idx_created_id', '(created_at, id)'),
+        ('idx_user_created', '(user_id, created_at)'),
+        ('idx_settlement', '(settlement)'),
+        ('idx_type', '(type_code)'),
+        ('idx_status', '(status_code)'),
+        ('idx_created_dims', '(created_at, district_code, type_code, status_code)'),
+        ('idx_district_created', '(district_code, created_at)'),
+    ):
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON appeals {columns}")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS trends (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            keyword VARCHAR(255) NOT NULL,
+            frequency INT DEFAULT 0,
+            period DATE NOT NULL,
+            appeal_type VARCHAR(100),
+            UNIQUE (keyword, period, appeal_type)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS settlements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(255) NOT NULL,
+            type VARCHAR(100) NOT NULL,
+            district VARCHAR(255),
+            population INT,
+            latitude DECIMAL(10, 8),
+            longitude DECIMAL(11, 8),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_name ON settlements (name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_district ON settlements (district)")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS appeals_daily_rollup (
+            day DATE NOT NULL,
+            district_code SMALLINT NOT NULL DEFAULT 0,
+            type_code SMALLINT NOT NULL DEFAULT 0,
+            status_code TINYINT NOT NULL DEFAULT 0,
+            appeal_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, district_code, type_code, status_code)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS appeal_counters (
+            counter_group VARCHAR(20) NOT NULL,
+            counter_key VARCHAR(150) NOT NULL DEFAULT '',
+            value BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (counter_group, counter_key)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS appeal_minute_buckets (
+            bucket_minute DATETIME NOT NULL PRIMARY KEY,
+            appeal_count INT NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS appeal_search
+        USING fts5(text, response, tokenize = 'unicode61')
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            name VARCHAR(50) NOT NULL PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.executemany(
+        "INSERT OR IGNORE INTO data_version (name, version) VALUES (?, 0)",
+        [('appeals',), ('lookups',), ('settlements',)]
+    )
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS write_behind_checkpoints (
+            journal VARCHAR(100) NOT NULL PRIMARY KEY,
+            seq BIGINT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS write_behind_refs (
+            journal VARCHAR(100) NOT NULL,
+            ref BIGINT NOT NULL,
+            appeal_id INT NOT NULL,
+            PRIMARY KEY (journal, ref)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS appeals_labeled AS
+        SELECT
+            a.id, a.user_id, a.text,
+            t.label AS type, a.platform, s.label AS status,
+            a.response, a.created_at, a.responded_at, a.tags,
+            a.settlement, a.street, a.house, a.full_address,
+            d.label AS district,
+            a.status_code, a.type_code, a.district_code
+        FROM appeals a
+        LEFT JOIN appeal_statuses s ON s.code = a.status_code
+        LEFT JOIN appeal_types t ON t.code = a.type_code
+        LEFT JOIN districts d ON d.code = a.district_code
+    """)
+
+
+def _sqlite_response_time_index(cursor):
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_created_responded ON appeals (created_at, district_code, type_code, responded_at)"
+    )
+
+
+def _sqlite_change_log(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS appeal_changes (
+            change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            seq BIGINT NOT NULL,
+            appeal_id INT NOT NULL,
+            change_type VARCHAR(10) NOT NULL,
+            day DATE NOT NULL,
+            district_code SMALLINT,
+            type_code SMALLINT,
+            status_code TINYINT,
+            prev_day DATE NULL,
+            prev_district_code SMALLINT NULL,
+            prev_type_code SMALLINT NULL,
+            prev_status_code TINYINT NULL,
+            changed_at DATETIME NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_changes_seq ON appeal_changes (seq)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_changes_changed_at ON appeal_changes (changed_at)")
+    cursor.execute("INSERT OR IGNORE INTO data_version (name, version) VALUES ('changes_pruned', 0)")
+
+
+def _sqlite_classification_cache(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS classification_cache (
+            text_hash CHAR(64) NOT NULL,
+            types_version CHAR(16) NOT NULL,
+            appeal_type VARCHAR(100) NOT NULL,
+            created_at DATETIME NOT NULL,
+            PRIMARY KEY (text_hash, types_version)
+        )
+    """)
+
+
+# Миграции схемы SQLite: (версия, описание, шаг). Номер версии хранится в PRAGMA user_version,
+# версии совпадают с версиями MIGRATIONS для MySQL, которым соответствует схема.
+SQLITE_MIGRATIONS = [
+    (12, 'Схема обращений, агрегатов, поиска и служебных таблиц', _sqlite_base_schema),
+    (13, 'Индекс для статистики времени до ответа', _sqlite_response_time_index),
+    (14, 'Журнал изменений обращений', _sqlite_change_log),
+    (15, 'Кэш классификации обращений', _sqlite_classification_cache),
+]
+
+
+class SQLiteDatabaseManager(DatabaseManager):
+    """Хранилище обращений во встроенной базе SQLite (один файл, режим WAL).
+
+    Для установки на одной машине и для замеров без внешних сервисов: та же схема,
+    те же агрегаты, кэш, метрики и отложенная запись, что и у DatabaseManager для
+    MySQL. Переопределены только места, зависящие от диалекта: UPSERT агрегатов,
+    полнотекстовый поиск (FTS5) и миграции. Секционирования и реплик нет.
+    Блок настроек sqlite_config: path, pool, cache, instrumentation, write_behind.
+    """
+    _instance = None
+
+    # Запись в SQLite идет под блокировкой всей базы (BEGIN IMMEDIATE)
+    ROW_LOCK = ''
+    # Файл базы, если в sqlite_config не указан path
+    DEFAULT_PATH = 'citizen_appeals.db'
+
+    def _create_pool(self, pool_config, name='sqlite'):
+        path = self.config.get('path', self.DEFAULT_PATH)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        return SQLiteConnectionPool(
+            path,
+            pool_size=pool_config.get('size', 5),
+            checkout_timeout=pool_config.get('checkout_timeout', 10),
+            busy_timeout=self.config.get('busy_timeout', 10),
+            name=name
+        )
+
+    @tracked
+    def _run_migrations(self):
+        """Приведение схемы SQLite к актуальной версии (PRAGMA user_version)"""
+        applied = []
+        with self.get_connection() as conn:
+            conn.start_transaction()
+            cursor = conn.cursor()
+            try:
+                cursor.execute("PRAGMA user_version")
+                current = cursor.fetchone()[0]
+                for version, description, step in SQLITE_MIGRATIONS:
+                    if version <= current:
+                        continue
+                    logger.info(f"🗄️ Применение миграции SQLite {version}: {description}")
+                    step(cursor)
+                    cursor.execute(f"PRAGMA user_version = {int(version)}")
+                    applied.append(version)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+        if applied:
+            logger.info(f"✅ Применены миграции SQLite: {', '.join(map(str, applied))}")
+        else:
+            logger.info("✅ Схема базы SQLite актуальна")
+        return applied
+
+    def _check_insert_id_mode(self):
+        # Запись в SQLite сериализована, и ROWID строк одного INSERT идут подряд
+        return True
+
+    def _first_insert_id(self, cursor, row_count):
+        # SQLite возвращает ID последней строки многострочного INSERT
+        return cursor.lastrowid - row_count + 1
+
+    def _minute_bucket_sql(self, column):
+        return f"strftime('%%Y-%%m-%%d %%H:%%M:00', {column})"
+
+    def _seconds_between_sql(self, start_column, end_column):
+        return f"CAST(ROUND((julianday({end_column}) - julianday({start_column})) * 86400) AS INTEGER)"
+
+    def _apply_rollup_delta(self, cursor, appeal_id, delta, last_id=None):
+        cursor.execute("""
+            INSERT INTO appeals_daily_rollup (day, district_code, type_code, status_code, appeal_count)
+            SELECT DATE(created_at), COALESCE(district_code, 0), COALESCE(type_code, 0), COALESCE(status_code, 0), COUNT(*) * %s
+            FROM appeals
+            WHERE id BETWEEN %s AND %s
+            GROUP BY DATE(created_at), COALESCE(district_code, 0), COALESCE(type_code, 0), COALESCE(status_code, 0)
+            ON CONFLICT (day, district_code, type_code, status_code)
+            DO UPDATE SET appeal_count = appeal_count + excluded.appeal_count
+        """, (delta, appeal_id, appeal_id if last_id is None else last_id))
+
+    def _apply_counter_delta(self, cursor, appeal_id, delta, last_id=None):
+        last_id = appeal_id if last_id is None else last_id
+        cursor.execute("""
+            INSERT INTO appeal_counters (counter_group, counter_key, value)
+            SELECT grp, k, n FROM (
+                SELECT 'total' AS grp, '' AS k, COUNT(*) * %s AS n
+                FROM appeals WHERE id BETWEEN %s AND %s
+                UNION ALL
+                SELECT 'status', COALESCE(CAST(status_code AS TEXT), ''), COUNT(*) * %s
+                FROM appeals WHERE id BETWEEN %s AND %s GROUP BY status_code
+                UNION ALL
+                SELECT 'type', COALESCE(CAST(type_code AS TEXT), ''), COUNT(*) * %s
+                FROM appeals WHERE id BETWEEN %s AND %s GROUP BY type_code
+            ) WHERE true
+            ON CONFLICT (counter_group, counter_key) DO UPDATE SET value = value + excluded.value
+        """, (delta, appeal_id, last_id) * 3)
+
+    def _record_arrivals(self, cursor, appeal_id, last_id=None):
+        minute = self._minute_bucket_sql('created_at')
+        cursor.execute(f"""
+            INSERT INTO appeal_minute_buckets (bucket_minute, appeal_count)
+            SELECT {minute}, COUNT(*)
+            FROM appeals
+            WHERE id BETWEEN %s AND %s
+            GROUP BY {minute}
+            ON CONFLICT (bucket_minute) DO UPDATE SET appeal_count = appeal_count + excluded.appeal_count
+        """, (appeal_id, appeal_id if last_id is None else last_id))
+
+    def _flush_write_batch(self, operations, journal_name=None, resolved=None):
+        """Новые названия справочников добавляются до транзакции пакета: пока она
+        держит блокировку базы, другое соединение не может в нее писать"""
+        for operation in operations:
+            data = operation.get('data') or {}
+            for field in LOOKUP_FIELDS:
+                if data.get(field):
+                    self._ensure_code(field, data[field])
+            if operation['op'] == 'insert':
+                self._ensure_code('status', data.get('status') or 'новое')
+        return super()._flush_write_batch(operations, journal_name, resolved)
+
+    def _index_for_search(self, cursor, appeal_id, last_id=None):
+        last_id = appeal_id if last_id is None else last_id
+        cursor.execute("DELETE FROM appeal_search WHERE rowid BETWEEN %s AND %s", (appeal_id, last_id))
+        cursor.execute("""
+            INSERT INTO appeal_search (rowid, text, response)
+            SELECT id, text, response FROM appeals
+            WHERE id BETWEEN %s AND %s
+        """, (appeal_id, last_id))
+
+    def _find_search_matches(self, terms, filters, after, limit):
+        """Поиск по таблице FTS5 appeal_search; релевантность - bm25 с обратным знаком"""
+        where_clause, params = self._build_appeals_filters(filters)
+        params.append(build_fts5_query(terms))
+
+        page_clause = ""
+        if after:
+            relevance, last_id = after
+            page_clause = "WHERE relevance < %s OR (relevance = %s AND id < %s)"
+            params.extend([relevance, relevance, last_id])
+
+        sql = f"""
+        SELECT * FROM (
+            SELECT a.*, -bm25(appeal_search) AS relevance
+            FROM appeal_search
+            JOIN appeals a ON a.id = appeal_search.rowid
+            {where_clause} AND appeal_search MATCH %s
+        ) AS found
+        {page_clause}
+        ORDER BY relevance DESC, id DESC
+        LIMIT %s
+        """
+        params.append(limit)
+        with self._read_connection() as conn:
+            db_cursor = conn.cursor(dictionary=True)
+            db_cursor.execute(sql, params)
+            appeals = db_cursor.fetchall()
+            db_cursor.close()
+        return appeals
+
+    @tracked
+    def maintain_partitions(self):
+        """В SQLite секций нет: обслуживать нечего"""
+        logger.info("🗂️ Секционирование в SQLite не используется, обслуживание секций пропущено")
+        return {'created': [], 'archived': []}
@@ -0,0 +1,25 @@
+import logging
+from database.database_manager import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Поддерживаемые хранилища обращений (ключ "storage" в config.json)
+STORAGE_BACKENDS = ('mysql', 'sqlite')
+
+
+def create_storage(config):
+    """Хранилище обращений по ключу "storage" в config.json (по умолчанию - MySQL).
+
+    "mysql" - DatabaseManager с блоками mysql_config и mysql_replica_config;
+    "sqlite" - встроенная база SQLite с блоком sqlite_config. Оба хранилища
+    предоставляют одинаковый набор методов ботам, дашборду, анализатору и парсеру.
+    """
+    backend = config.get('storage', 'mysql')
+    if backend == 'mysql':
+        return DatabaseManager(config['mysql_config'], config.get('mysql_replica_config'))
+    if backend == 'sqlite':
+        # Импорт по требованию: установке с MySQL модуль SQLite не нужен
+        from database.sqlite_storage import SQLiteDatabaseManager
+        logger.info("🗄️ Используется встроенное хранилище SQLite")
+        return SQLiteDatabaseManager(config.get('sqlite_config') or {'path': SQLiteDatabaseManager.DEFAULT_PATH})
+    raise ValueError(f"Неизвестное хранилище: {backend}. Доступные хранилища: {', '.join(STORAGE_BACKENDS)}")
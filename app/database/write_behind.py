@@ -0,0 +1,360 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: журналы не блокируются, каталог должен принадлежать одному процессу
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Поля данных обращения, которые в журнале хранятся строкой ISO 8601
+DATETIME_FIELDS = ('created_at', 'responded_at')
+JOURNAL_SUFFIX = '.journal'
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _decode_operation(line):
+    operation = json.loads(line)
+    data = operation.get('data') or {}
+    for field in DATETIME_FIELDS:
+        if isinstance(data.get(field), str):
+            data[field] = datetime.fromisoformat(data[field])
+    return operation
+
+
+def _try_lock(file):
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class WriteJournal:
+    """Журнал отложенных операций процесса: JSON Lines с fsync перед подтверждением.
+
+    У каждого процесса свой файл, заблокированный на время работы (flock). Журнал
+    очищается, когда все его операции записаны в базу; незаблокированные файлы в
+    каталоге остались от аварийно завершившихся процессов и дописываются в базу при
+    следующем запуске.
+    """
+
+    def __init__(self, directory, fsync=True):
+        self.directory = directory
+        self.fsync = fsync
+        self.name = f"appeals-{os.getpid()}-{int(time.time() * 1000)}"
+        self.path = os.path.join(directory, self.name + JOURNAL_SUFFIX)
+        self._file = None
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if not _try_lock(self._file):
+            raise OSError(f"Журнал {self.path} уже используется другим процессом")
+
+    def orphans(self):
+        """Журналы завершившихся процессов: [(имя, файл, операции)]; файлы остаются
+        заблокированными до discard() или release()"""
+        if not os.path.isdir(self.directory):
+            return []
+
+        found = []
+        for filename in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, filename)
+            if not filename.endswith(JOURNAL_SUFFIX) or path == self.path:
+                continue
+            file = open(path, 'r+', encoding='utf-8')
+            if not _try_lock(file):
+                file.close()
+                continue
+
+            operations = []
+            for number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    operations.append(_decode_operation(line))
+                except ValueError:
+                    # Оборванная запись в конце файла: процесс упал до fsync, операция не подтверждалась
+                    logger.warning(f"⚠️ Пропущена поврежденная строка {number} журнала {filename}")
+            found.append((filename[:-len(JOURNAL_SUFFIX)], file, operations))
+        return found
+
+    @staticmethod
+    def discard(file):
+        """Удаление полностью записанного в базу журнала другого процесса"""
+        os.remove(file.name)
+        file.close()
+
+    @staticmethod
+    def release(file):
+        file.close()
+
+    def append(self, operation):
+        """Запись операции; после возврата она переживет падение процесса"""
+        self._file.write(json.dumps(operation, ensure_ascii=False, default=_json_default) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def reset(self):
+        """Очистка журнала, когда все операции записаны в базу"""
+        self._file.truncate(0)
+        self._file.seek(0)
+
+    def close(self, remove=False):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        if remove:
+            os.remove(self.path)
+
+
+class WriteBehindBuffer:
+    """Отложенная запись обращений (write-behind) с групповой фиксацией.
+
+    Новые обращения и изменения их статуса копятся в очереди процесса и пишутся в
+    базу одной транзакцией каждые ``max_rows`` операций или ``max_delay_ms``
+    миллисекунд. До записи в базу обращение получает временный отрицательный ID;
+    изменения по нему из того же пакета сливаются с INSERT. Операция подтверждается
+    вызывающему после записи в журнал, а транзакция пакета сохраняет в базе номер
+    последней записанной операции журнала, поэтому после падения процесса журнал
+    дописывается в базу без потерь и без повторов.
+
+    ``flush_batch(operations, journal_name, resolved)`` записывает пакет и
+    возвращает соответствие временных ID настоящим.
+    """
+
+    def __init__(self, flush_batch, journal=None, max_rows=100, max_delay_ms=200,
+                 retry_interval=5.0, forget_journal=None, resolved_size=10000):
+        if max_rows < 1:
+            raise ValueError("Размер пакета должен быть не меньше 1")
+
+        self.flush_batch = flush_batch
+        self.journal = journal
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000.0
+        self.retry_interval = retry_interval
+        self.forget_journal = forget_journal
+        self.resolved_size = resolved_size
+
+        self._pid = os.getpid()
+        self._pid_lock = threading.Lock()
+        self._reset_state()
+        self._start()
+        logger.info(
+            f"✅ Отложенная запись обращений включена: пакет {max_rows} операций / {max_delay_ms} мс"
+            + ("" if self.journal else ", без журнала")
+        )
+
+    def _reset_state(self):
+        self._condition = threading.Condition()
+        self._pending = []
+        self._first_pending_at = None
+        self._in_flight = 0
+        self._seq = 0
+        self._retry_at = 0.0
+        self._stopping = False
+        self._flush_requested = False
+        self._resolved = OrderedDict()
+        self._stats = {
+            'submitted': 0,
+            'flushed': 0,
+            'batches': 0,
+            'failures': 0,
+            'recovered': 0,
+            'last_batch_ms': 0.0
+        }
+
+    def _start(self):
+        if self.journal:
+            self.journal.open()
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def _check_pid(self):
+        """Своя очередь, журнал и поток записи в дочернем процессе после fork:
+        очередь и журнал родителя остаются ему"""
+        if self._pid == os.getpid():
+            return
+        with self._pid_lock:
+            if self._pid == os.getpid():
+                return
+            if self.journal:
+                self.journal.close()
+                self.journal = WriteJournal(self.journal.directory, fsync=self.journal.fsync)
+            self._reset_state()
+            self._start()
+            self._pid = os.getpid()
+
+    def _submit(self, operation):
+        self._check_pid()
+        with self._condition:
+            if self._stopping:
+                raise RuntimeError("Буфер отложенной записи закрыт")
+            self._seq += 1
+            operation['seq'] = self._seq
+            if operation['op'] == 'insert':
+                # Временный ID выводится из номера операции: уникален в пределах журнала
+                operation['ref'] = -self._seq
+            if self.journal:
+                self.journal.append(operation)
+            self._pending.append(operation)
+            self._stats['submitted'] += 1
+            if self._first_pending_at is None:
+                self._first_pending_at = time.monotonic()
+            self._condition.notify_all()
+            return operation
+
+    def submit_insert(self, appeal_data):
+        """Постановка нового обращения в очередь; возвращает временный (отрицательный) ID"""
+        return self._submit({'op': 'insert', 'data': dict(appeal_data)})['ref']
+
+    def submit_update(self, appeal_id, update_data):
+        """Постановка изменения обращения (по временному ID) в очередь"""
+        self._submit({'op': 'update', 'appeal_id': appeal_id, 'data': dict(update_data)})
+
+    def _remember(self, resolved):
+        with self._condition:
+            self._resolved.update(resolved)
+            while len(self._resolved) > self.resolved_size:
+                self._resolved.popitem(last=False)
+
+    def _recover(self):
+        """Запись в базу журналов аварийно завершившихся процессов"""
+        if not self.journal:
+            return
+        try:
+            orphans = self.journal.orphans()
+        except OSError as e:
+            logger.error(f"❌ Не удалось прочитать каталог журналов {self.journal.directory}: {e}")
+            return
+        for name, file, operations in orphans:
+            try:
+                resolved = {}
+                for start in range(0, len(operations), self.max_rows):
+                    resolved.update(self.flush_batch(operations[start:start + self.max_rows], name, resolved))
+                self.journal.discard(file)
+                if self.forget_journal:
+                    self.forget_journal(name)
+                self._stats['recovered'] += len(operations)
+                logger.info(f"♻️ Восстановлено из журнала {name}: {len(operations)} операций")
+            except Exception as e:
+                self.journal.release(file)
+                logger.error(f"❌ Не удалось восстановить журнал {name}, повтор при следующем запуске: {e}")
+
+    def _take_batch(self):
+        """Ожидание пакета: max_rows операций, истечение max_delay, flush() или остановка"""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if self._pending and now >= self._retry_at:
+                    due = self._first_pending_at + self.max_delay
+                    if len(self._pending) >= self.max_rows or now >= due or self._flush_requested or self._stopping:
+                        batch = self._pending[:self.max_rows]
+                        del self._pending[:len(batch)]
+                        self._first_pending_at = now if self._pending else None
+                        self._in_flight = len(batch)
+                        return batch
+                    timeout = due - now
+                elif self._pending:
+                    if self._stopping:
+                        return None
+                    timeout = self._retry_at - now
+                elif self._stopping:
+                    return None
+                else:
+                    timeout = None
+                self._condition.wait(timeout)
+
+    def _run(self):
+        self._recover()
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+
+            with self._condition:
+                known = dict(self._resolved)
+            started = time.perf_counter()
+            try:
+                resolved = self.flush_batch(batch, self.journal.name if self.journal else None, known)
+            except Exception as e:
+                with self._condition:
+                    # Пакет возвращается в начало очереди, журнал хранит его до успешной записи
+                    self._pending[:0] = batch
+                    self._first_pending_at = time.monotonic()
+                    self._in_flight = 0
+                    self._retry_at = time.monotonic() + self.retry_interval
+                    self._stats['failures'] += 1
+                    self._condition.notify_all()
+                logger.error(f"❌ Ошибка записи пакета из {len(batch)} операций, повтор через {self.retry_interval} с: {e}")
+                continue
+
+            self._remember(resolved)
+            with self._condition:
+                self._in_flight = 0
+                self._stats['flushed'] += len(batch)
+                self._stats['batches'] += 1
+                self._stats['last_batch_ms'] = round((time.perf_counter() - started) * 1000, 2)
+                if not self._pending:
+                    self._flush_requested = False
+                    if self.journal:
+                        self.journal.reset()
+                self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Немедленная запись всех операций очереди; False, если не успели за timeout"""
+        self._check_pid()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify_all()
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def close(self, timeout=30.0):
+        """Запись очереди и остановка; незаписанные операции остаются в журнале до следующего запуска"""
+        flushed = self.flush(timeout)
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+        if self.journal:
+            self.journal.close(remove=flushed)
+            if flushed and self.forget_journal:
+                self.forget_journal(self.journal.name)
+        if flushed:
+            logger.info("✅ Очередь отложенной записи записана в базу")
+        else:
+            logger.warning(f"⚠️ Не все обращения записаны в базу, они сохранены в журнале {self.journal.path if self.journal else '-'}")
+        return flushed
+
+    def get_stats(self):
+        self._check_pid()
+        with self._condition:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending) + self._in_flight
+        stats['max_rows'] = self.max_rows
+        stats['max_delay_ms'] = int(self.max_delay * 1000)
+        stats['journal'] = self.journal.path if self.journal else None
+        return stats
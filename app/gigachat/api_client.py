@@ -1,11 +1,17 @@
 import requests
 import json
+import contextlib
 import logging
 from datetime import datetime, timedelta
 import uuid
 import urllib3
+import threading
 import time
 from typing import List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from gigachat.scheduler import SchedulerTimeout
+from gigachat.circuit_breaker import OPEN, GigaChatRequestError, GigaChatUnavailable, response_outcome
 
 # Отключаем предупреждения SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -13,7 +19,7 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 logger = logging.getLogger(__name__)
 
 class GigaChatClient:
-    def __init__(self, api_key):
+    def __init__(self, api_key, http_config=None, scheduler=None, circuit_breaker=None):
         if not api_key:
             raise ValueError("API ключ не может быть пустым")
         
@@ -23,89 +29,269 @@ class GigaChatClient:
         self.access_token = None
         self.token_expires = None
         
+        # Постоянная сессия с пулом keep-alive соединений: TCP и TLS рукопожатие
+        # выполняется один раз на соединение, а не на каждый запрос
+        http_config = http_config or {}
+        self.connect_timeout = http_config.get('connect_timeout', 5)
+        self.read_timeout = http_config.get('read_timeout', 60)
+        self.auth_read_timeout = http_config.get('auth_read_timeout', 30)
+        self.session = self._create_session(
+            pool_size=http_config.get('pool_size', 10),
+            connect_retries=http_config.get('connect_retries', 2),
+            backoff_factor=http_config.get('backoff_factor', 0.5)
+        )
+        self._stats_lock = threading.Lock()
+        self._http_stats = {}
+        # Общий для процессов планировщик запросов к модели (частота, одновременность, приоритеты)
+        self.scheduler = scheduler
+        # Автоматический выключатель: при недоступности GigaChat запросы сразу получают отказ
+        self.circuit_breaker = circuit_breaker
+        
+        # Токен обновляется в фоне заранее, запросы не ждут OAuth
+        self.refresh_at = None
+        self.refresh_ahead = http_config.get('token_refresh_ahead', 300)
+        self.refresh_max_backoff = http_config.get('token_refresh_max_backoff', 60)
+        self._auth_lock = threading.Lock()
+        self._stop_refresh = threading.Event()
+        self._start_token_refresh()
+        
         logger.info("✅ GigaChatClient инициализирован")
 
-    def _authenticate(self, max_retries=3) -> bool:
-        """Аутентификация в GigaChat API с повторными попытками"""
-        if self.access_token and self.token_expires and datetime.now() < self.token_expires:
-            logger.debug("✅ Используется существующий токен")
-            return True
+    @staticmethod
+    def _create_session(pool_size, connect_retries, backoff_factor):
+        """Сессия requests с пулом соединений размера pool_size на каждый хост.
+        Адаптер повторяет только неудавшиеся подключения: запрос до сервера еще не дошел,
+        поэтому повтор безопасен и для POST. Остальные ошибки повторяют методы клиента."""
+        retry = Retry(
+            total=connect_retries,
+            connect=connect_retries,
+            read=0,
+            status=0,
+            other=0,
+            backoff_factor=backoff_factor,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, pool_block=False, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.verify = False
+        return session
 
-        for attempt in range(max_retries):
-            try:
-                # Генерируем уникальный RqUID
-                rq_uid = str(uuid.uuid4())
-                
-                headers = {
-                    'Content-Type': 'application/x-www-form-urlencoded',
-                    'Accept': 'application/json',
-                    'RqUID': rq_uid,
-                    'Authorization': f'Basic {self.api_key}'
-                }
+    def _opened_connections(self, url):
+        """Число соединений, открытых пулами адаптера за все время работы сессии"""
+        pools = self.session.get_adapter(url).poolmanager.pools
+        opened = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+        return opened
+
+    def _request(self, call, method, url, read_timeout, **kwargs):
+        """HTTP-запрос через сессию с учетом переиспользования соединений по типу вызова.
+        Соединение считается новым, если за время запроса пул открыл новое подключение."""
+        opened_before = self._opened_connections(url)
+        started = time.perf_counter()
+        try:
+            return self.session.request(method, url, timeout=(self.connect_timeout, read_timeout), **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            new_connections = max(self._opened_connections(url) - opened_before, 0)
+            self._record_call(call, new_connections, elapsed_ms)
+            logger.debug(
+                f"🔗 {call}: {'новое соединение' if new_connections else 'соединение переиспользовано'}, "
+                f"{elapsed_ms:.0f} мс"
+            )
+
+    def _record_call(self, call, new_connections, elapsed_ms):
+        with self._stats_lock:
+            stats = self._http_stats.setdefault(call, {
+                'calls': 0,
+                'reused': 0,
+                'new_connections': 0,
+                'total_ms': 0.0
+            })
+            stats['calls'] += 1
+            stats['new_connections'] += new_connections
+            if not new_connections:
+                stats['reused'] += 1
+            stats['total_ms'] += elapsed_ms
 
-                payload = {
-                    'scope': 'GIGACHAT_API_PERS'
+    def get_http_stats(self):
+        """Переиспользование соединений по типам вызовов (auth, chat, models)"""
+        with self._stats_lock:
+            result = {}
+            for call, stats in self._http_stats.items():
+                result[call] = {
+                    'calls': stats['calls'],
+                    'reused': stats['reused'],
+                    'new_connections': stats['new_connections'],
+                    'reuse_rate': round(stats['reused'] * 100.0 / stats['calls'], 1) if stats['calls'] else 0.0,
+                    'avg_ms': round(stats['total_ms'] / stats['calls'], 1) if stats['calls'] else 0.0
                 }
+            return result
 
-                logger.info(f"🔐 Попытка аутентификации {attempt + 1}/{max_retries}...")
-                
-                response = requests.post(
-                    self.auth_url,
-                    headers=headers,
-                    data=payload,
-                    verify=False,
-                    timeout=30
-                )
+    def close(self):
+        """Остановка фонового обновления токена и закрытие соединений сессии"""
+        self._stop_refresh.set()
+        self.session.close()
 
-                logger.info(f"📊 Статус ответа аутентификации: {response.status_code}")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    self.access_token = data.get('access_token')
-                    
-                    if not self.access_token:
-                        logger.error("❌ В ответе нет access_token")
-                        continue
-                    
-                    expires_in = data.get('expires_in', 1800)
-                    self.token_expires = datetime.now() + timedelta(seconds=expires_in - 300)
+    def _check_circuit(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.check()
+
+    def _record_outcome(self, success):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(success)
+
+    def _backoff(self, seconds):
+        """Пауза перед повторной попыткой; если неудача разомкнула цепь, повтора не будет"""
+        if self.circuit_breaker is not None and self.circuit_breaker.state == OPEN:
+            raise GigaChatUnavailable("GigaChat недоступен, цепь разомкнута")
+        time.sleep(seconds)
+
+    def _slot(self, priority):
+        if self.scheduler is None:
+            return contextlib.nullcontext()
+        return self.scheduler.slot(priority)
+
+    def _start_token_refresh(self):
+        self._refresh_thread = threading.Thread(target=self._refresh_loop, name='gigachat-token-refresh', daemon=True)
+        self._refresh_thread.start()
+
+    def _token_valid(self):
+        return self.access_token and self.token_expires and datetime.now() < self.token_expires
+
+    def _fetch_token(self) -> bool:
+        """Один запрос токена OAuth; при успехе назначается время фонового обновления"""
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Accept': 'application/json',
+            # Уникальный RqUID для каждого запроса
+            'RqUID': str(uuid.uuid4()),
+            'Authorization': f'Basic {self.api_key}'
+        }
+
+        payload = {
+            'scope': 'GIGACHAT_API_PERS'
+        }
+
+        response = self._request(
+            'auth', 'POST', self.auth_url, self.auth_read_timeout,
+            headers=headers,
+            data=payload
+        )
+
+        logger.info(f"📊 Статус ответа аутентификации: {response.status_code}")
+        
+        if response.status_code != 200:
+            logger.warning(f"⚠️ Ошибка аутентификации: {response.status_code} - {response.text}")
+            return False
+
+        data = response.json()
+        access_token = data.get('access_token')
+        if not access_token:
+            logger.error("❌ В ответе нет access_token")
+            return False
+
+        expires_in = data.get('expires_in', 1800)
+        self.access_token = access_token
+        self.token_expires = datetime.now() + timedelta(seconds=expires_in - 300)
+        self.refresh_at = self.token_expires - timedelta(seconds=self.refresh_ahead)
+        
+        logger.info("✅ Успешная аутентификация в GigaChat")
+        return True
+
+    def _refresh_loop(self):
+        """Фоновое обновление токена за refresh_ahead секунд до token_expires.
+        Неудачное обновление повторяется с экспоненциальной задержкой, пока запросы
+        продолжают работать со старым, еще действующим токеном."""
+        backoff = 1
+        while True:
+            wait = (self.refresh_at - datetime.now()).total_seconds() if self.refresh_at else 0
+            if self._stop_refresh.wait(max(wait, 0)):
+                return
+
+            with self._auth_lock:
+                refreshed = True
+                # Токен мог обновить вызов, не дождавшийся фонового обновления
+                if self.refresh_at is None or datetime.now() >= self.refresh_at:
+                    try:
+                        logger.info("🔄 Фоновое обновление токена GigaChat...")
+                        refreshed = self._fetch_token()
+                    except Exception as e:
+                        logger.error(f"❌ Ошибка фонового обновления токена: {e}")
+                        refreshed = False
+
+            if refreshed:
+                backoff = 1
+                continue
+
+            logger.warning(
+                f"⚠️ Токен не обновлен, повтор через {backoff} с"
+                + (", текущий токен действует" if self._token_valid() else "")
+            )
+            if self._stop_refresh.wait(backoff):
+                return
+            backoff = min(backoff * 2, self.refresh_max_backoff)
+
+    def _authenticate(self, max_retries=3) -> bool:
+        """Действующий токен для запроса. Обычно его заранее получает фоновое обновление;
+        без токена (при запуске или после долгой недоступности OAuth) токен запрашивает
+        один вызов, остальные ждут его результата"""
+        if self._token_valid():
+            logger.debug("✅ Используется существующий токен")
+            return True
+
+        with self._auth_lock:
+            if self._token_valid():
+                return True
+
+            for attempt in range(max_retries):
+                try:
+                    logger.info(f"🔐 Попытка аутентификации {attempt + 1}/{max_retries}...")
                     
-                    logger.info("✅ Успешная аутентификация в GigaChat")
-                    return True
-                else:
-                    logger.warning(f"⚠️ Ошибка аутентификации: {response.status_code} - {response.text}")
+                    if self._fetch_token():
+                        return True
                     if attempt < max_retries - 1:
                         wait_time = 2 ** attempt  # Экспоненциальная задержка
                         logger.info(f"⏳ Ожидание {wait_time} секунд перед повторной попыткой...")
                         time.sleep(wait_time)
 
-            except requests.exceptions.Timeout:
-                logger.error(f"⏰ Таймаут при аутентификации (попытка {attempt + 1})")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                continue
-                    
-            except requests.exceptions.ConnectionError as e:
-                logger.error(f"🔌 Ошибка соединения при аутентификации (попытка {attempt + 1}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                continue
-                    
-            except Exception as e:
-                logger.error(f"❌ Неожиданная ошибка при аутентификации (попытка {attempt + 1}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                continue
+                except requests.exceptions.Timeout:
+                    logger.error(f"⏰ Таймаут при аутентификации (попытка {attempt + 1})")
+                    if attempt < max_retries - 1:
+                        time.sleep(2 ** attempt)
+                    continue
+                        
+                except requests.exceptions.ConnectionError as e:
+                    logger.error(f"🔌 Ошибка соединения при аутентификации (попытка {attempt + 1}): {e}")
+                    if attempt < max_retries - 1:
+                        time.sleep(2 ** attempt)
+                    continue
+                        
+                except Exception as e:
+                    logger.error(f"❌ Неожиданная ошибка при аутентификации (попытка {attempt + 1}): {e}")
+                    if attempt < max_retries - 1:
+                        time.sleep(2 ** attempt)
+                    continue
 
-        logger.error("❌ Все попытки аутентификации завершились неудачей")
-        return False
+            logger.error("❌ Все попытки аутентификации завершились неудачей")
+            return False
 
-    def chat_completion(self, messages, temperature=0.7, max_tokens=1024, max_retries=3) -> Optional[str]:
-        """Отправка запроса к чат-модели GigaChat с повторными попытками"""
+    def chat_completion(self, messages, temperature=0.7, max_tokens=1024, max_retries=3, priority='citizen') -> Optional[str]:
+        """Отправка запроса к чат-модели GigaChat с повторными попытками.
+        priority - класс запроса в планировщике: 'citizen' или 'analytics'.
+        GigaChatUnavailable, если цепь разомкнута, очередь не подошла или все попытки неудачны;
+        GigaChatRequestError, если GigaChat отклонил запрос."""
         for attempt in range(max_retries):
+            self._check_circuit()
+            outcome_pending = True
             try:
                 if not self._authenticate():
-                    return "Извините, произошла ошибка при подключении к AI-сервису."
+                    self._record_outcome(False)
+                    raise GigaChatUnavailable("Не удалось аутентифицироваться в GigaChat")
 
                 headers = {
                     'Authorization': f'Bearer {self.access_token}',
@@ -123,15 +309,16 @@ class GigaChatClient:
 
                 logger.info(f"💬 Попытка чат-запроса {attempt + 1}/{max_retries}")
                 
-                response = requests.post(
-                    f'{self.api_base_url}chat/completions',
-                    headers=headers,
-                    json=data,
-                    verify=False,
-                    timeout=60
-                )
+                with self._slot(priority):
+                    response = self._request(
+                        'chat', 'POST', f'{self.api_base_url}chat/completions', self.read_timeout,
+                        headers=headers,
+                        json=data
+                    )
 
                 logger.info(f"📊 Статус ответа чата: {response.status_code}")
+                outcome_pending = False
+                self._record_outcome(response_outcome(response.status_code))
                 
                 if response.status_code == 200:
                     result = response.json()
@@ -143,30 +330,43 @@ class GigaChatClient:
                     if attempt < max_retries - 1:
                         wait_time = 2 ** attempt
                         logger.info(f"⏳ Ожидание {wait_time} секунд перед повторной попыткой...")
-                        time.sleep(wait_time)
+                        self._backoff(wait_time)
                         continue
-                    else:
-                        return "Извините, произошла ошибка при обработке запроса."
+                    elif response_outcome(response.status_code) is None:
+                        raise GigaChatRequestError(f"GigaChat отклонил запрос: {response.status_code}")
+
+            except SchedulerTimeout as e:
+                # Очередь не подошла: вызывающий переходит в резервный режим, как при недоступности GigaChat
+                self._record_outcome(None)
+                logger.warning(f"⚠️ {e}")
+                raise
+            
+            except (GigaChatUnavailable, GigaChatRequestError):
+                raise
 
             except requests.exceptions.Timeout:
+                self._record_outcome(False)
                 logger.error(f"⏰ Таймаут при запросе к GigaChat (попытка {attempt + 1})")
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
+                    self._backoff(2 ** attempt)
                 continue
                 
             except requests.exceptions.ConnectionError as e:
+                self._record_outcome(False)
                 logger.error(f"🔌 Ошибка соединения с GigaChat (попытка {attempt + 1}): {e}")
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
+                    self._backoff(2 ** attempt)
                 continue
                 
             except Exception as e:
+                if outcome_pending:
+                    self._record_outcome(False)
                 logger.error(f"❌ Неожиданная ошибка при запросе к GigaChat (попытка {attempt + 1}): {e}")
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
+                    self._backoff(2 ** attempt)
                 continue
 
-        return "Извините, в настоящее время сервис недоступен. Пожалуйста, попробуйте позже."
+        raise GigaChatUnavailable(f"GigaChat не ответил за {max_retries} попыток")
 
     def test_connection(self):
         """Тестирование подключения к GigaChat"""
@@ -180,11 +380,9 @@ class GigaChatClient:
                     'Accept': 'application/json'
                 }
 
-                response = requests.get(
-                    f'{self.api_base_url}models',
-                    headers=headers,
-                    verify=False,
-                    timeout=30
+                response = self._request(
+                    'models', 'GET', f'{self.api_base_url}models', self.auth_read_timeout,
+                    headers=headers
                 )
 
                 if response.status_code == 200:
@@ -0,0 +1,334 @@
+import asyncio
+import contextlib
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+import httpx
+
+from gigachat.scheduler import SchedulerTimeout
+from gigachat.circuit_breaker import OPEN, GigaChatRequestError, GigaChatUnavailable, response_outcome
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncGigaChatClient:
+    """Асинхронный клиент GigaChat для обработчиков ботов.
+
+    Повторяет аутентификацию и повторные попытки GigaChatClient, но ожидает ответа
+    и паузы между попытками без блокировки event loop: пока один гражданин ждет
+    ответа модели, бот обслуживает остальных. Отмена задачи (asyncio.CancelledError)
+    прерывает запрос и ожидание и передается вызывающему.
+
+    HTTP-клиент создается при первом запросе или в start() в работающем event loop
+    и закрывается методом aclose() в том же loop.
+    """
+
+    def __init__(self, api_key, http_config=None, scheduler=None, circuit_breaker=None):
+        if not api_key:
+            raise ValueError("API ключ не может быть пустым")
+
+        self.api_key = api_key
+        self.auth_url = "https://ngw.devices.sberbank.ru:9443/api/v2/oauth"
+        self.api_base_url = "https://gigachat.devices.sberbank.ru/api/v1/"
+        self.access_token = None
+        self.token_expires = None
+
+        http_config = http_config or {}
+        self.pool_size = http_config.get('pool_size', 10)
+        self.connect_timeout = http_config.get('connect_timeout', 5)
+        self.read_timeout = http_config.get('read_timeout', 60)
+        self.auth_read_timeout = http_config.get('auth_read_timeout', 30)
+        self.connect_retries = http_config.get('connect_retries', 2)
+        self.keepalive_expiry = http_config.get('keepalive_expiry', 30)
+
+        # Токен обновляется фоновой задачей заранее (start()), запросы не ждут OAuth
+        self.refresh_at = None
+        self.refresh_ahead = http_config.get('token_refresh_ahead', 300)
+        self.refresh_max_backoff = http_config.get('token_refresh_max_backoff', 60)
+
+        # Общий для процессов планировщик запросов к модели (частота, одновременность, приоритеты)
+        self.scheduler = scheduler
+        # Автоматический выключатель: при недоступности GigaChat запросы сразу получают отказ
+        self.circuit_breaker = circuit_breaker
+
+        self._client = None
+        self._auth_lock = None
+        self._refresh_task = None
+
+        logger.info("✅ AsyncGigaChatClient инициализирован")
+
+    def _get_client(self):
+        if self._client is None:
+            limits = httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size,
+                keepalive_expiry=self.keepalive_expiry
+            )
+            # Транспорт повторяет только неудавшиеся подключения, остальные ошибки повторяют методы клиента
+            transport = httpx.AsyncHTTPTransport(verify=False, limits=limits, retries=self.connect_retries)
+            self._client = httpx.AsyncClient(transport=transport, verify=False)
+            self._auth_lock = asyncio.Lock()
+        return self._client
+
+    def _check_circuit(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.check()
+
+    def _record_outcome(self, success):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(success)
+
+    async def _backoff(self, seconds):
+        """Пауза перед повторной попыткой; если неудача разомкнула цепь, повтора не будет"""
+        if self.circuit_breaker is not None and self.circuit_breaker.state == OPEN:
+            raise GigaChatUnavailable("GigaChat недоступен, цепь разомкнута")
+        await asyncio.sleep(seconds)
+
+    def _slot(self, priority):
+        if self.scheduler is None:
+            return contextlib.nullcontext()
+        return self.scheduler.async_slot(priority)
+
+    def _timeout(self, read_timeout):
+        return httpx.Timeout(read_timeout, connect=self.connect_timeout)
+
+    async def aclose(self):
+        """Остановка фонового обновления токена и закрытие соединений HTTP-клиента"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._auth_lock = None
+
+    def _token_valid(self):
+        return self.access_token and self.token_expires and datetime.now() < self.token_expires
+
+    async def _fetch_token(self) -> bool:
+        """Один запрос токена OAuth; при успехе назначается время фонового обновления"""
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Accept': 'application/json',
+            'RqUID': str(uuid.uuid4()),
+            'Authorization': f'Basic {self.api_key}'
+        }
+
+        payload = {
+            'scope': 'GIGACHAT_API_PERS'
+        }
+
+        response = await self._get_client().post(
+            self.auth_url,
+            headers=headers,
+            data=payload,
+            timeout=self._timeout(self.auth_read_timeout)
+        )
+
+        logger.info(f"📊 Статус ответа аутентификации: {response.status_code}")
+
+        if response.status_code != 200:
+            logger.warning(f"⚠️ Ошибка аутентификации: {response.status_code} - {response.text}")
+            return False
+
+        data = response.json()
+        access_token = data.get('access_token')
+        if not access_token:
+            logger.error("❌ В ответе нет access_token")
+            return False
+
+        expires_in = data.get('expires_in', 1800)
+        self.access_token = access_token
+        self.token_expires = datetime.now() + timedelta(seconds=expires_in - 300)
+        self.refresh_at = self.token_expires - timedelta(seconds=self.refresh_ahead)
+
+        logger.info("✅ Успешная аутентификация в GigaChat")
+        return True
+
+    async def _refresh_loop(self):
+        """Фоновое обновление токена за refresh_ahead секунд до token_expires.
+        Неудачное обновление повторяется с экспоненциальной задержкой, пока запросы
+        продолжают работать со старым, еще действующим токеном."""
+        backoff = 1
+        while True:
+            if self.refresh_at:
+                await asyncio.sleep(max((self.refresh_at - datetime.now()).total_seconds(), 0))
+
+            async with self._auth_lock:
+                refreshed = True
+                # Токен мог обновить вызов, не дождавшийся фонового обновления
+                if self.refresh_at is None or datetime.now() >= self.refresh_at:
+                    try:
+                        logger.info("🔄 Фоновое обновление токена GigaChat...")
+                        refreshed = await self._fetch_token()
+                    except Exception as e:
+                        logger.error(f"❌ Ошибка фонового обновления токена: {e}")
+                        refreshed = False
+
+            if refreshed:
+                backoff = 1
+                continue
+
+            logger.warning(
+                f"⚠️ Токен не обновлен, повтор через {backoff} с"
+                + (", текущий токен действует" if self._token_valid() else "")
+            )
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.refresh_max_backoff)
+
+    async def start(self):
+        """Запуск фонового обновления токена в event loop бота: первый токен
+        запрашивается сразу, до обращений граждан"""
+        self._get_client()
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def _authenticate(self, max_retries=3) -> bool:
+        """Действующий токен для запроса. Обычно его заранее получает фоновое обновление;
+        без токена одновременные запросы ждут одну аутентификацию"""
+        if self._token_valid():
+            logger.debug("✅ Используется существующий токен")
+            return True
+
+        self._get_client()
+        async with self._auth_lock:
+            if self._token_valid():
+                return True
+
+            for attempt in range(max_retries):
+                try:
+                    logger.info(f"🔐 Попытка аутентификации {attempt + 1}/{max_retries}...")
+
+                    if await self._fetch_token():
+                        return True
+                    if attempt < max_retries - 1:
+                        wait_time = 2 ** attempt  # Экспоненциальная задержка
+                        logger.info(f"⏳ Ожидание {wait_time} секунд перед повторной попыткой...")
+                        await asyncio.sleep(wait_time)
+
+                except httpx.TimeoutException:
+                    logger.error(f"⏰ Таймаут при аутентификации (попытка {attempt + 1})")
+                    if attempt < max_retries - 1:
+                        await asyncio.sleep(2 ** attempt)
+                    continue
+
+                except httpx.TransportError as e:
+                    logger.error(f"🔌 Ошибка соединения при аутентификации (попытка {attempt + 1}): {e}")
+                    if attempt < max_retries - 1:
+                        await asyncio.sleep(2 ** attempt)
+                    continue
+
+                except Exception as e:
+                    # asyncio.CancelledError не наследует Exception и прерывает аутентификацию
+                    logger.error(f"❌ Неожиданная ошибка при аутентификации (попытка {attempt + 1}): {e}")
+                    if attempt < max_retries - 1:
+                        await asyncio.sleep(2 ** attempt)
+                    continue
+
+            logger.error("❌ Все попытки аутентификации завершились неудачей")
+            return False
+
+    async def chat_completion(self, messages, temperature=0.7, max_tokens=1024, max_retries=3, priority='citizen') -> Optional[str]:
+        """Отправка запроса к чат-модели GigaChat с повторными попытками.
+        priority - класс запроса в планировщике: 'citizen' или 'analytics'.
+        GigaChatUnavailable, если цепь разомкнута, очередь не подошла или все попытки неудачны;
+        GigaChatRequestError, если GigaChat отклонил запрос."""
+        for attempt in range(max_retries):
+            self._check_circuit()
+            outcome_pending = True
+            try:
+                if not await self._authenticate():
+                    self._record_outcome(False)
+                    raise GigaChatUnavailable("Не удалось аутентифицироваться в GigaChat")
+
+                headers = {
+                    'Authorization': f'Bearer {self.access_token}',
+                    'Content-Type': 'application/json',
+                    'Accept': 'application/json'
+                }
+
+                data = {
+                    "model": "GigaChat",
+                    "messages": messages,
+                    "temperature": temperature,
+                    "max_tokens": max_tokens,
+                    "stream": False
+                }
+
+                logger.info(f"💬 Попытка чат-запроса {attempt + 1}/{max_retries}")
+
+                async with self._slot(priority):
+                    started = time.perf_counter()
+                    response = await self._get_client().post(
+                        f'{self.api_base_url}chat/completions',
+                        headers=headers,
+                        json=data,
+                        timeout=self._timeout(self.read_timeout)
+                    )
+
+                logger.info(
+                    f"📊 Статус ответа чата: {response.status_code} "
+                    f"({(time.perf_counter() - started) * 1000:.0f} мс)"
+                )
+                outcome_pending = False
+                self._record_outcome(response_outcome(response.status_code))
+
+                if response.status_code == 200:
+                    result = response.json()
+                    response_text = result['choices'][0]['message']['content']
+                    logger.info("✅ Успешно получен ответ от GigaChat")
+                    return response_text
+                else:
+                    logger.warning(f"⚠️ Ошибка чат-запроса: {response.status_code} - {response.text}")
+                    if attempt < max_retries - 1:
+                        wait_time = 2 ** attempt
+                        logger.info(f"⏳ Ожидание {wait_time} секунд перед повторной попыткой...")
+                        await self._backoff(wait_time)
+                        continue
+                    elif response_outcome(response.status_code) is None:
+                        raise GigaChatRequestError(f"GigaChat отклонил запрос: {response.status_code}")
+
+            except asyncio.CancelledError:
+                if outcome_pending:
+                    self._record_outcome(None)
+                raise
+
+            except SchedulerTimeout as e:
+                # Очередь не подошла: вызывающий переходит в резервный режим, как при недоступности GigaChat
+                self._record_outcome(None)
+                logger.warning(f"⚠️ {e}")
+                raise
+            
+            except (GigaChatUnavailable, GigaChatRequestError):
+                raise
+
+            except httpx.TimeoutException:
+                self._record_outcome(False)
+                logger.error(f"⏰ Таймаут при запросе к GigaChat (попытка {attempt + 1})")
+                if attempt < max_retries - 1:
+                    await self._backoff(2 ** attempt)
+                continue
+
+            except httpx.TransportError as e:
+                self._record_outcome(False)
+                logger.error(f"🔌 Ошибка соединения с GigaChat (попытка {attempt + 1}): {e}")
+                if attempt < max_retries - 1:
+                    await self._backoff(2 ** attempt)
+                continue
+
+            except Exception as e:
+                if outcome_pending:
+                    self._record_outcome(False)
+                logger.error(f"❌ Неожиданная ошибка при запросе к GigaChat (попытка {attempt + 1}): {e}")
+                if attempt < max_retries - 1:
+                    await self._backoff(2 ** attempt)
+                continue
+
+        raise GigaChatUnavailable(f"GigaChat не ответил за {max_retries} попыток")
@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class GigaChatUnavailable(Exception):
+    """GigaChat недоступен (цепь разомкнута или попытки исчерпаны): вызывающий переходит в резервный режим"""
+
+
+class GigaChatRequestError(Exception):
+    """GigaChat отклонил запрос (ошибка 4xx): повтор не поможет, вызывающий использует запасной ответ"""
+
+
+def response_outcome(status_code):
+    """Исход ответа GigaChat для выключателя: перегрузка и ошибки сервера - неудача,
+    ошибки запроса (4xx) о недоступности сервиса не говорят (None)"""
+    if status_code == 429 or status_code >= 500:
+        return False
+    return True if status_code == 200 else None
+
+
+class CircuitBreaker:
+    """Автоматический выключатель запросов к GigaChat.
+
+    Цепь размыкается, когда за последние ``window_seconds`` было не меньше
+    ``min_calls`` попыток и доля неудачных достигла ``failure_rate``. Пока цепь
+    разомкнута, allow() сразу отказывает. Через ``open_seconds`` цепь
+    полуоткрывается и пропускает ``half_open_calls`` пробных запросов: успех
+    замыкает цепь, неудача снова размыкает ее.
+    """
+
+    def __init__(self, window_seconds=60, min_calls=5, failure_rate=0.5, open_seconds=30, half_open_calls=1):
+        if not 0 < failure_rate <= 1:
+            raise ValueError("Доля неудачных запросов должна быть в интервале (0, 1]")
+
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trials = 0
+        self._outcomes = deque()
+        self._stats = {
+            'rejected': 0,
+            'opened': 0,
+            'closed': 0
+        }
+
+    @property
+    def state(self):
+        with self._lock:
+            self._check_timeout(time.monotonic())
+            return self._state
+
+    def _check_timeout(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._trials = 0
+            logger.info("🔌 Цепь GigaChat полуоткрыта: пробный запрос")
+
+    def _trim(self, now):
+        while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+            self._outcomes.popleft()
+
+    def _open(self, now, reason):
+        self._state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self._stats['opened'] += 1
+        logger.warning(f"⛔ Цепь GigaChat разомкнута на {self.open_seconds} с: {reason}")
+
+    def allow(self):
+        """Можно ли выполнять запрос; в полуоткрытом состоянии - только пробные"""
+        with self._lock:
+            self._check_timeout(time.monotonic())
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return True
+            self._stats['rejected'] += 1
+            return False
+
+    def check(self):
+        """GigaChatUnavailable, если запрос выполнять нельзя"""
+        if not self.allow():
+            raise GigaChatUnavailable("GigaChat недоступен, цепь разомкнута")
+
+    def record_success(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._outcomes.clear()
+                self._stats['closed'] += 1
+                logger.info("✅ Цепь GigaChat замкнута: сервис снова отвечает")
+                return
+            self._outcomes.append((now, True))
+            self._trim(now)
+
+    def record_skipped(self):
+        """Попытка, разрешенная allow(), не дошла до GigaChat (отмена, очередь планировщика)"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                self._open(now, "пробный запрос не удался")
+                return
+            if self._state == OPEN:
+                return
+            self._outcomes.append((now, False))
+            self._trim(now)
+            failures = sum(1 for _, success in self._outcomes if not success)
+            if len(self._outcomes) >= self.min_calls and failures >= self.failure_rate * len(self._outcomes):
+                self._open(now, f"{failures} из {len(self._outcomes)} запросов за {self.window_seconds} с неудачны")
+
+    def record(self, success):
+        """Исход попытки: True/False, None - попытка не дошла до модели или ничего не говорит о ее доступности"""
+        if success is None:
+            self.record_skipped()
+        elif success:
+            self.record_success()
+        else:
+            self.record_failure()
+
+    def get_stats(self):
+        with self._lock:
+            now = time.monotonic()
+            self._check_timeout(now)
+            self._trim(now)
+            stats = dict(self._stats)
+            stats['state'] = self._state
+            stats['window_calls'] = len(self._outcomes)
+            stats['window_failures'] = sum(1 for _, success in self._outcomes if not success)
+        return stats
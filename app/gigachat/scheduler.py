@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+
+from gigachat.circuit_breaker import GigaChatUnavailable
+
+logger = logging.getLogger(__name__)
+
+# Классы приоритета запросов к GigaChat, от высшего к низшему
+PRIORITIES = ('citizen', 'analytics')
+
+# Ячейки общего состояния планировщика
+_TOKENS, _REFILLED_AT, _IN_FLIGHT = 0, 1, 2
+# Для каждого класса: очередь, допущено, суммарное и максимальное ожидание (секунды), отказы по таймауту
+_CLASS_FIELDS = 5
+_QUEUED, _ADMITTED, _WAIT_TOTAL, _WAIT_MAX, _TIMED_OUT = range(_CLASS_FIELDS)
+
+# Как часто ожидающий запрос проверяет, живы ли процессы, занявшие места (секунды)
+_RECLAIM_INTERVAL = 5.0
+
+
+class SchedulerTimeout(GigaChatUnavailable):
+    """Запрос не дождался очереди к GigaChat за отведенное время.
+    Для вызывающего это та же недоступность GigaChat: обращение принимается в резервном режиме."""
+
+
+class GigaChatScheduler:
+    """Планировщик запросов к GigaChat, общий для всех процессов системы.
+
+    Ограничивает частоту запросов (token bucket: ``rate_per_minute`` с запасом
+    ``burst``) и число одновременных запросов (``max_in_flight``). Запрос низшего
+    приоритета не допускается, пока в очереди есть запросы высшего, а аналитика
+    занимает не больше ``analytics_max_in_flight`` мест, поэтому ответ гражданину
+    не ждет завершения запросов аналитики.
+
+    Состояние хранится в разделяемой памяти multiprocessing: планировщик создается
+    в главном процессе и передается процессам ботов и веб-интерфейса. Время берется
+    из time.monotonic(), общего для процессов одной машины. Каждое занятое место
+    помечено pid процесса-владельца: места процесса, завершившегося без release(),
+    освобождаются ожидающими запросами.
+    """
+
+    def __init__(self, rate_per_minute=60, burst=5, max_in_flight=4, analytics_max_in_flight=None,
+                 analytics_max_wait=30.0, citizen_max_wait=60.0, async_waiters=8):
+        if rate_per_minute <= 0 or burst < 1 or max_in_flight < 1 or async_waiters < 1:
+            raise ValueError("Частота, запас и число одновременных запросов должны быть положительными")
+
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        # По умолчанию одно место всегда остается гражданам
+        if analytics_max_in_flight is None:
+            analytics_max_in_flight = max(max_in_flight - 1, 1)
+        self.limits = {'citizen': max_in_flight, 'analytics': min(analytics_max_in_flight, max_in_flight)}
+        self.max_waits = {'citizen': citizen_max_wait, 'analytics': analytics_max_wait}
+        # Потоки, в которых async_slot ждет места; отдельные от пула event loop, которым пользуется база данных
+        self.async_waiters = async_waiters
+
+        self._condition = multiprocessing.Condition()
+        self._state = multiprocessing.RawArray('d', 3 + _CLASS_FIELDS * len(PRIORITIES))
+        self._state[_TOKENS] = burst
+        self._state[_REFILLED_AT] = time.monotonic()
+        # pid владельца каждого места (0 - место свободно)
+        self._owners = multiprocessing.RawArray('i', max_in_flight)
+        self._executor = None
+        self._executor_pid = None
+
+        logger.info(
+            f"✅ Планировщик GigaChat: {rate_per_minute} запросов/мин, запас {burst}, "
+            f"одновременно {max_in_flight} (аналитика {self.limits['analytics']})"
+        )
+
+    @staticmethod
+    def _cell(priority, field):
+        return 3 + PRIORITIES.index(priority) * _CLASS_FIELDS + field
+
+    def _refill(self, now):
+        elapsed = now - self._state[_REFILLED_AT]
+        if elapsed > 0:
+            self._state[_TOKENS] = min(self.burst, self._state[_TOKENS] + elapsed * self.rate)
+            self._state[_REFILLED_AT] = now
+
+    def _higher_waiting(self, priority):
+        return any(self._state[self._cell(higher, _QUEUED)] for higher in PRIORITIES[:PRIORITIES.index(priority)])
+
+    @staticmethod
+    def _process_alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _reclaim(self):
+        """Освобождение мест процессов, завершившихся без release()"""
+        reclaimed = 0
+        for index, pid in enumerate(self._owners):
+            if pid and pid != os.getpid() and not self._process_alive(pid):
+                self._owners[index] = 0
+                self._state[_IN_FLIGHT] -= 1
+                reclaimed += 1
+        if reclaimed:
+            logger.warning(f"⚠️ Освобождено мест завершившихся процессов: {reclaimed}")
+            self._condition.notify_all()
+        return reclaimed
+
+    def acquire(self, priority='citizen', timeout=None):
+        """Ожидание места для запроса; SchedulerTimeout, если место не получено за timeout
+        (по умолчанию - ограничение ожидания класса, None в настройках - без ограничения)"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Неизвестный приоритет: {priority}")
+        if timeout is None:
+            timeout = self.max_waits[priority]
+
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        with self._condition:
+            self._state[self._cell(priority, _QUEUED)] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._state[_IN_FLIGHT] >= self.limits[priority]:
+                        self._reclaim()
+                    can_run = (
+                        not self._higher_waiting(priority)
+                        and self._state[_IN_FLIGHT] < self.limits[priority]
+                    )
+                    if can_run and self._state[_TOKENS] >= 1:
+                        self._state[_TOKENS] -= 1
+                        self._state[_IN_FLIGHT] += 1
+                        self._owners[list(self._owners).index(0)] = os.getpid()
+                        break
+
+                    if deadline is not None and now >= deadline:
+                        self._state[self._cell(priority, _TIMED_OUT)] += 1
+                        raise SchedulerTimeout(f"Очередь к GigaChat ({priority}) не подошла за {timeout} с")
+
+                    # Без свободного места ждем release() или проверки владельцев мест, без токена - его пополнения
+                    wait = (1 - self._state[_TOKENS]) / self.rate if can_run else _RECLAIM_INTERVAL
+                    if deadline is not None:
+                        wait = deadline - now if wait is None else min(wait, deadline - now)
+                    self._condition.wait(wait)
+            finally:
+                self._state[self._cell(priority, _QUEUED)] -= 1
+                # Уход из очереди может открыть дорогу запросам низшего приоритета
+                self._condition.notify_all()
+
+            waited = time.monotonic() - started
+            self._state[self._cell(priority, _ADMITTED)] += 1
+            self._state[self._cell(priority, _WAIT_TOTAL)] += waited
+            self._state[self._cell(priority, _WAIT_MAX)] = max(self._state[self._cell(priority, _WAIT_MAX)], waited)
+
+        if waited >= 1:
+            logger.info(f"⏳ Запрос к GigaChat ({priority}) ждал в очереди {waited:.1f} с")
+        return waited
+
+    def release(self):
+        with self._condition:
+            owners = list(self._owners)
+            if os.getpid() in owners:
+                self._owners[owners.index(os.getpid())] = 0
+                self._state[_IN_FLIGHT] -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, priority='citizen'):
+        """Место для одного запроса к GigaChat"""
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _get_executor(self):
+        # Пул создается в процессе, который ждет мест: потоки не переживают fork
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.async_waiters, thread_name_prefix='gigachat-scheduler'
+            )
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_executor'] = None
+        state['_executor_pid'] = None
+        return state
+
+    @asynccontextmanager
+    async def async_slot(self, priority='citizen'):
+        """Место для запроса из event loop: ожидание идет в собственном ограниченном пуле
+        потоков планировщика. Ограничение ожидания класса отсчитывается с вызова, включая
+        очередь к потокам пула. Если задачу отменили во время ожидания, полученное позже
+        место сразу освобождается."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Неизвестный приоритет: {priority}")
+        max_wait = self.max_waits[priority]
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        # Место, полученное после отмены задачи, освобождает поток ожидания: event loop к этому времени может быть закрыт
+        lock = threading.Lock()
+        waiter = {'abandoned': False, 'acquired': False}
+        
+        def acquire():
+            if deadline is None:
+                self.acquire(priority)
+            else:
+                self.acquire(priority, timeout=max(deadline - time.monotonic(), 0))
+            with lock:
+                if waiter['abandoned']:
+                    self.release()
+                else:
+                    waiter['acquired'] = True
+        
+        future = asyncio.get_running_loop().run_in_executor(self._get_executor(), acquire)
+        try:
+            await asyncio.shield(future)
+        except asyncio.CancelledError:
+            with lock:
+                waiter['abandoned'] = True
+                if waiter['acquired']:
+                    self.release()
+            raise
+        try:
+            yield
+        finally:
+            self.release()
+
+    def get_stats(self):
+        """Глубина очередей, ожидание по классам приоритета и загрузка лимитов"""
+        with self._condition:
+            self._refill(time.monotonic())
+            stats = {
+                'rate_per_minute': round(self.rate * 60, 2),
+                'burst': self.burst,
+                'tokens': round(self._state[_TOKENS], 2),
+                'in_flight': int(self._state[_IN_FLIGHT]),
+                'max_in_flight': self.max_in_flight,
+                'priorities': {}
+            }
+            for priority in PRIORITIES:
+                admitted = int(self._state[self._cell(priority, _ADMITTED)])
+                wait_total = self._state[self._cell(priority, _WAIT_TOTAL)]
+                stats['priorities'][priority] = {
+                    'queued': int(self._state[self._cell(priority, _QUEUED)]),
+                    'admitted': admitted,
+                    'timed_out': int(self._state[self._cell(priority, _TIMED_OUT)]),
+                    'max_in_flight': self.limits[priority],
+                    'avg_wait_ms': round(wait_total * 1000 / admitted, 1) if admitted else 0.0,
+                    'max_wait_ms': round(self._state[self._cell(priority, _WAIT_MAX)] * 1000, 1)
+                }
+        return stats
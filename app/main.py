@@ -1,10 +1,15 @@
 import logging
+import signal
 import sys
 import json
 import multiprocessing
 from datetime import datetime
-from database.database_manager import DatabaseManager
+from database.storage import create_storage
+from database.async_database import AsyncDatabaseManager
 from gigachat.api_client import GigaChatClient
+from gigachat.async_client import AsyncGigaChatClient
+from gigachat.scheduler import GigaChatScheduler
+from gigachat.circuit_breaker import CircuitBreaker, GigaChatUnavailable
 from processing.analyzer import AppealsAnalyzer
 from bot.citizen_bot import CitizenBot
 from bot.analyst_bot import AnalystBot
@@ -23,18 +28,40 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class AppealsProcessingSystem:
-    def __init__(self, config):
+    # Статус обращения, принятого без GigaChat: ответ по существу генерируется после восстановления сервиса
+    PENDING_STATUS = 'ожидает обработки'
+
+    def __init__(self, config, scheduler=None):
         self.config = config
-        self.gigachat = GigaChatClient(config['gigachat_api_key'])
-        # Используем единый менеджер базы данных
-        self.database = DatabaseManager(config['mysql_config'])
-        self.analyzer = AppealsAnalyzer(self.gigachat, self.database)
+        # Планировщик запросов к GigaChat, общий для процессов (None - без ограничений)
+        self.scheduler = scheduler
+        # Автоматический выключатель GigaChat, общий для синхронного и асинхронного клиентов процесса
+        breaker_config = dict(config.get('gigachat_circuit_breaker', {}))
+        self.reprocess_interval = breaker_config.pop('reprocess_interval', 30)
+        self.circuit_breaker = CircuitBreaker(**breaker_config)
+        self.gigachat = GigaChatClient(
+            config['gigachat_api_key'], config.get('gigachat_http'), scheduler, self.circuit_breaker
+        )
+        # Неблокирующий клиент GigaChat для асинхронных обработчиков ботов
+        self.async_gigachat = AsyncGigaChatClient(
+            config['gigachat_api_key'], config.get('gigachat_http'), scheduler, self.circuit_breaker
+        )
+        # Используем единое хранилище обращений (MySQL или SQLite по ключу "storage")
+        self.database = create_storage(config)
+        # Неблокирующий доступ к базе для асинхронных обработчиков ботов
+        self.async_database = AsyncDatabaseManager(self.database)
+        self.analyzer = AppealsAnalyzer(self.gigachat, self.database, self.async_gigachat, self.async_database)
         
     def process_citizen_appeal(self, user_id, appeal_text, platform="telegram", address_info=None):
         """Обработка обращения гражданина с адресом"""
         try:
-            # Классификация обращения
-            appeal_type = self.analyzer.classify_appeal(appeal_text)
+            # Классификация обращения (по ключевым словам, если GigaChat недоступен)
+            degraded = False
+            try:
+                appeal_type = self.analyzer.classify_appeal(appeal_text)
+            except GigaChatUnavailable:
+                degraded = True
+                appeal_type = self.analyzer.classify_by_keywords(appeal_text)
             
             # Формируем данные для сохранения
             appeal_data = {
@@ -59,33 +86,133 @@ class AppealsProcessingSystem:
             # Сохранение в базу
             appeal_id = self.database.store_appeal(appeal_data)
             
-            # Генерация ответа для типовых обращений с передачей адресной информации
-            if appeal_type in self.analyzer.get_common_types():
-                response = self.analyzer.generate_response(appeal_id, appeal_text, appeal_type, address_info)
-                # ИЗМЕНЕНО: статус 'отвечено' вместо 'answered'
-                self.database.update_appeal(appeal_id, {'response': response, 'status': 'отвечено'})
-                return response
-            else:
-                # Для нетиповых обращений также генерируем ответ с контактами муниципалитета
-                response = self.analyzer.generate_response(appeal_id, appeal_text, appeal_type, address_info)
-                # ИЗМЕНЕНО: статус 'требует проверки' вместо 'requires_manual_review'
-                self.database.update_appeal(appeal_id, {'response': response, 'status': 'требует проверки'})
+            # Генерация ответа с передачей адресной информации
+            if not degraded:
+                try:
+                    response = self.analyzer.generate_response(appeal_id, appeal_text, appeal_type, address_info)
+                except GigaChatUnavailable:
+                    degraded = True
+            if degraded:
+                return self._acknowledge_pending(appeal_id, address_info)
+            
+            # Ответ и итоговый статус записываются одним изменением
+            self.database.update_appeal(appeal_id, {'response': response, 'status': self._final_status(appeal_type)})
+            return response
+                
+        except Exception as e:
+            logger.error(f"Ошибка обработки обращения: {e}")
+            return "Произошла ошибка при обработке обращения. Пожалуйста, попробуйте позже."
+
+    async def process_citizen_appeal_async(self, user_id, appeal_text, platform="telegram", address_info=None):
+        """Обработка обращения гражданина без блокировки event loop бота:
+        запросы к GigaChat и базе данных ожидаются асинхронно"""
+        try:
+            degraded = False
+            try:
+                appeal_type = await self.analyzer.classify_appeal_async(appeal_text)
+            except GigaChatUnavailable:
+                degraded = True
+                appeal_type = self.analyzer.classify_by_keywords(appeal_text)
+            
+            appeal_data = {
+                'user_id': user_id,
+                'text': appeal_text,
+                'type': appeal_type,
+                'platform': platform,
+                'status': 'новое',
+                'created_at': datetime.now()
+            }
+            
+            if address_info:
+                appeal_data.update({
+                    'settlement': address_info.get('settlement'),
+                    'street': address_info.get('street'),
+                    'house': address_info.get('house'),
+                    'full_address': address_info.get('full_address'),
+                    'district': address_info.get('district')
+                })
+            
+            appeal_id = await self.async_database.store_appeal(appeal_data)
+            
+            if not degraded:
+                try:
+                    response = await self.analyzer.generate_response_async(appeal_id, appeal_text, appeal_type, address_info)
+                except GigaChatUnavailable:
+                    degraded = True
+            if degraded:
+                response = self.analyzer.acknowledgement(appeal_id, address_info)
+                await self.async_database.update_appeal(appeal_id, {'response': response, 'status': self.PENDING_STATUS})
                 return response
+            
+            await self.async_database.update_appeal(
+                appeal_id, {'response': response, 'status': self._final_status(appeal_type)}
+            )
+            return response
                 
         except Exception as e:
             logger.error(f"Ошибка обработки обращения: {e}")
             return "Произошла ошибка при обработке обращения. Пожалуйста, попробуйте позже."
 
+    def _final_status(self, appeal_type):
+        """Итоговый статус обращения с ответом: нетиповые обращения ждут ручной проверки
+        и не считаются отвеченными (время ответа для них не фиксируется)"""
+        common_types = [common_type.lower() for common_type in self.analyzer.get_common_types()]
+        return 'отвечено' if appeal_type.lower() in common_types else 'требует проверки'
+
+    def _acknowledge_pending(self, appeal_id, address_info):
+        """Шаблонный ответ на обращение, принятое без GigaChat; обращение ждет повторной обработки"""
+        response = self.analyzer.acknowledgement(appeal_id, address_info)
+        self.database.update_appeal(appeal_id, {'response': response, 'status': self.PENDING_STATUS})
+        return response
+
+    async def reprocess_pending_appeals(self, limit=20):
+        """Повторная обработка с GigaChat обращений, принятых в резервном режиме (от старых к новым).
+        Возвращает [(обращение, ответ)]; останавливается, как только цепь снова разомкнута."""
+        appeals = await self.async_database.get_pending_appeals(self.PENDING_STATUS, limit)
+        reprocessed = []
+        for appeal in appeals:
+            address_info = {
+                field: appeal.get(field)
+                for field in ('settlement', 'street', 'house', 'full_address', 'district')
+                if appeal.get(field)
+            }
+            try:
+                appeal_type = await self.analyzer.classify_appeal_async(appeal['text'])
+                response = await self.analyzer.generate_response_async(
+                    appeal['id'], appeal['text'], appeal_type, address_info
+                )
+            except GigaChatUnavailable:
+                break
+            
+            await self.async_database.update_appeal(
+                appeal['id'], {'type': appeal_type, 'response': response, 'status': self._final_status(appeal_type)}
+            )
+            reprocessed.append((appeal, response))
+        
+        if reprocessed:
+            logger.info(f"♻️ Повторно обработано обращений после восстановления GigaChat: {len(reprocessed)}")
+        return reprocessed
+
     def get_analytics(self, period_days=30):
         """Получение аналитики за период"""
         return self.analyzer.analyze_trends(period_days)
 
-def init_settlements_database(config):
+    def shutdown(self):
+        """Завершение работы процесса: запись очереди отложенной записи и закрытие соединений"""
+        self.gigachat.close()
+        self.database.close()
+
+def install_shutdown_handler():
+    """SIGTERM завершает процесс через SystemExit, чтобы выполнились блоки finally
+    (в том числе запись очереди отложенной записи в базу)"""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+def init_settlements_database(config, storage):
     """Инициализация базы данных населенных пунктов"""
     try:
         from processing.data_parser import SettlementParser
         
-        parser = SettlementParser(config['mysql_config'])
+        parser = SettlementParser(storage)
         success = parser.run()
         
         if success:
@@ -98,59 +225,104 @@ def init_settlements_database(config):
         logger.error(f"❌ Ошибка инициализации базы населенных пунктов: {e}")
         return False
 
-def run_citizen_bot(config):
+def create_gigachat_scheduler(config):
+    """Планировщик запросов к GigaChat по блоку gigachat_scheduler config.json.
+    Создается в главном процессе до запуска процессов ботов и веб-интерфейса."""
+    scheduler_config = dict(config.get('gigachat_scheduler', {}))
+    if not scheduler_config.pop('enabled', True):
+        logger.info("ℹ️ Планировщик запросов к GigaChat отключен")
+        return None
+    return GigaChatScheduler(**scheduler_config)
+
+def run_maintenance_command(db_manager, command):
+    """Выполнение служебной команды обслуживания базы данных: python main.py <команда>"""
+    commands = {
+        'rebuild_rollup': db_manager.rebuild_daily_rollup,
+        'reconcile_counters': db_manager.reconcile_counters,
+        'maintain_partitions': db_manager.maintain_partitions,
+        'prune_changes': db_manager.prune_changes
+    }
+    
+    if command not in commands:
+        logger.error(f"❌ Неизвестная команда: {command}. Доступные команды: {', '.join(commands)}")
+        return False
+    
+    logger.info(f"🛠️ Выполнение команды обслуживания: {command}")
+    commands[command]()
+    logger.info(f"✅ Команда {command} выполнена")
+    return True
+
+def run_citizen_bot(config, scheduler=None):
     """Запуск бота для граждан в отдельном процессе"""
-    system = AppealsProcessingSystem(config)
-    citizen_bot = CitizenBot(config['telegram_bot_token'], system, config['mysql_config'])  # Передаем db_config
-    logger.info("🚀 Запуск бота для граждан...")
-    citizen_bot.run()
+    install_shutdown_handler()
+    system = AppealsProcessingSystem(config, scheduler)
+    try:
+        citizen_bot = CitizenBot(config['telegram_bot_token'], system, config.get('mysql_config'))  # Передаем db_config
+        logger.info("🚀 Запуск бота для граждан...")
+        citizen_bot.run()
+    finally:
+        system.shutdown()
 
-def run_analyst_bot(config):
+def run_analyst_bot(config, scheduler=None):
     """Запуск бота для аналитиков в отдельном процессе"""
-    system = AppealsProcessingSystem(config)
-    analyst_bot = AnalystBot(config['analyst_bot_token'], system)
-    logger.info("🚀 Запуск бота для аналитиков...")
-    analyst_bot.run()
+    install_shutdown_handler()
+    system = AppealsProcessingSystem(config, scheduler)
+    try:
+        analyst_bot = AnalystBot(config['analyst_bot_token'], system)
+        logger.info("🚀 Запуск бота для аналитиков...")
+        analyst_bot.run()
+    finally:
+        system.shutdown()
 
-def run_dashboard(config):
+def run_dashboard(config, scheduler=None):
     """Запуск веб-интерфейса в отдельном процессе"""
-    system = AppealsProcessingSystem(config)
-    web_app = create_dashboard_app(system)
-    web_port = config.get('web_port', 5000)
-    logger.info(f"🚀 Запуск веб-интерфейса на порту {web_port}...")
-    web_app.run(host='0.0.0.0', port=web_port, debug=False, use_reloader=False)
+    install_shutdown_handler()
+    system = AppealsProcessingSystem(config, scheduler)
+    try:
+        web_app = create_dashboard_app(system)
+        web_port = config.get('web_port', 5000)
+        logger.info(f"🚀 Запуск веб-интерфейса на порту {web_port}...")
+        web_app.run(host='0.0.0.0', port=web_port, debug=False, use_reloader=False)
+    finally:
+        system.shutdown()
 
 def main():
+    db_manager = None
     try:
         # Загрузка конфигурации
         with open("config.json", "r") as f:
             config = json.load(f)
         
-        db_manager = DatabaseManager(config['mysql_config'])
+        db_manager = create_storage(config)
         
-        # Выполняем миграцию статусов на русские
-        db_manager.migrate_statuses_to_russian()
+        # Служебные команды выполняются вместо запуска системы
+        if len(sys.argv) > 1:
+            run_maintenance_command(db_manager, sys.argv[1])
+            return
         
         # Инициализируем базу данных населенных пунктов
-        init_settlements_database(config)
+        init_settlements_database(config, db_manager)
         
         logger.info("✅ Система обработки обращений инициализирована")
         
+        # Один планировщик на все процессы: лимиты GigaChat общие для ботов и веб-интерфейса
+        scheduler = create_gigachat_scheduler(config)
+        
         # Создание процессов для каждого компонента
         processes = []
         
         # Процесс для бота граждан
-        citizen_process = multiprocessing.Process(target=run_citizen_bot, args=(config,))
+        citizen_process = multiprocessing.Process(target=run_citizen_bot, args=(config, scheduler))
         processes.append(citizen_process)
         
         # Процесс для бота аналитиков
-        analyst_process = multiprocessing.Process(target=run_analyst_bot, args=(config,))
+        analyst_process = multiprocessing.Process(target=run_analyst_bot, args=(config, scheduler))
         processes.append(analyst_process)
         
         logger.info("✅ База знаний загружена и готова к использованию")
         
         # Процесс для веб-интерфейса
-        dashboard_process = multiprocessing.Process(target=run_dashboard, args=(config,))
+        dashboard_process = multiprocessing.Process(target=run_dashboard, args=(config, scheduler))
         processes.append(dashboard_process)
         
         # Запуск всех процессов
@@ -166,9 +338,9 @@ def main():
     except Exception as e:
         logger.error(f"❌ Ошибка запуска системы: {e}")
     finally:
-        # Закрываем соединение с базой данных при завершении
-        db_manager = DatabaseManager()
-        db_manager.close()
+        # Записываем очередь отложенной записи и закрываем соединения с базой данных
+        if db_manager:
+            db_manager.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -3,13 +3,18 @@ from datetime import datetime, timedelta
 import json
 import re
 import os
+from processing.classification_cache import ClassificationCache, normalize_appeal_text
+from gigachat.circuit_breaker import GigaChatUnavailable
 
 logger = logging.getLogger(__name__)
 
 class AppealsAnalyzer:
-    def __init__(self, gigachat_client, database):
+    def __init__(self, gigachat_client, database, async_gigachat=None, async_database=None):
         self.gigachat = gigachat_client
         self.db = database
+        # Асинхронные клиенты для обработчиков ботов (classify_appeal_async, generate_response_async)
+        self.async_gigachat = async_gigachat
+        self.async_db = async_database
         self.common_types = [
             "жалоба на ЖКХ",
             "предложение по благоустройству", 
@@ -20,6 +25,8 @@ class AppealsAnalyzer:
             "жалоба на шум",
             "предложение по культуре"
         ]
+        # Повторные обращения с тем же текстом классифицируются без запроса к GigaChat
+        self.classification_cache = ClassificationCache(database, self.common_types)
         self.settlements_data = self._load_settlements_data()
 
     def _find_municipality_by_settlement(self, settlement_name, district_name=None):
@@ -236,10 +243,9 @@ class AppealsAnalyzer:
         
         return text
 
-    def classify_appeal(self, appeal_text):
-        """Классификация типа обращения с помощью GigaChat"""
-        try:
-            prompt = f"""
+    def _classification_messages(self, appeal_text):
+        """Сообщения для классификации обращения моделью"""
+        prompt = f"""
             Классифицируй обращение гражданина по следующим категориям: 
             {', '.join(self.common_types)}
             
@@ -249,39 +255,86 @@ class AppealsAnalyzer:
             
             Верни ТОЛЬКО название категории без дополнительных объяснений.
             """
-            
-            response = self.gigachat.chat_completion([
-                {"role": "system", "content": "Ты классификатор обращений граждан"},
-                {"role": "user", "content": prompt}
-            ])
-            
-            appeal_type = response.strip().lower()
-            if appeal_type not in [t.lower() for t in self.common_types]:
-                appeal_type = "другое"
-                
-            logger.info(f"🎯 Классифицировано как: {appeal_type}")
+        return [
+            {"role": "system", "content": "Ты классификатор обращений граждан"},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _is_category_answer(self, response):
+        """Ответ модели - категория или "другое", а не сообщение об ошибке сервиса:
+        только такие классификации сохраняются в кэш"""
+        answer = response.strip().lower()
+        return answer == "другое" or answer in [t.lower() for t in self.common_types]
+
+    def _parse_classification(self, response):
+        """Тип обращения из ответа модели; "другое", если ответ не совпал с категорией"""
+        appeal_type = response.strip().lower()
+        if appeal_type not in [t.lower() for t in self.common_types]:
+            appeal_type = "другое"
+            
+        logger.info(f"🎯 Классифицировано как: {appeal_type}")
+        return appeal_type
+
+    def classify_appeal(self, appeal_text):
+        """Классификация типа обращения с помощью GigaChat"""
+        try:
+            key = self.classification_cache.key(appeal_text)
+            cached = self.classification_cache.get(key)
+            if cached:
+                logger.info(f"🎯 Классифицировано по кэшу как: {cached}")
+                return cached
+            
+            response = self.gigachat.chat_completion(self._classification_messages(appeal_text))
+            appeal_type = self._parse_classification(response)
+            if self._is_category_answer(response):
+                self.classification_cache.put(key, appeal_type)
             return appeal_type
             
+        except GigaChatUnavailable:
+            raise
         except Exception as e:
             logger.error(f"❌ Ошибка классификации: {e}")
             return "другое"
 
-    def generate_response(self, appeal_id, appeal_text, appeal_type, address_info=None):
-        """Генерация ответа на обращение с ГАРАНТИРОВАННОЙ подстановкой телефона"""
+    async def classify_appeal_async(self, appeal_text):
+        """Классификация типа обращения без блокировки event loop"""
         try:
-            # Получаем контакты муниципального образования
-            municipality = None
-            if address_info:
-                settlement = address_info.get('settlement', '')
-                district = address_info.get('district', '')
-                municipality = self._find_municipality_by_settlement(settlement, district)
-                if municipality:
-                    logger.info(f"📍 Найдены контакты муниципалитета для {settlement}")
-                else:
-                    logger.warning(f"📍 Муниципалитет для {settlement} не найден")
+            key = self.classification_cache.key(appeal_text)
+            cached = await self.async_db.run(self.classification_cache.get, key)
+            if cached:
+                logger.info(f"🎯 Классифицировано по кэшу как: {cached}")
+                return cached
+            
+            response = await self.async_gigachat.chat_completion(self._classification_messages(appeal_text))
+            appeal_type = self._parse_classification(response)
+            if self._is_category_answer(response):
+                await self.async_db.run(self.classification_cache.put, key, appeal_type)
+            return appeal_type
+            
+        except GigaChatUnavailable:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Ошибка классификации: {e}")
+            return "другое"
 
-            # Упрощенный промпт - генерируем только основную часть ответа
-            prompt = f"""
+    def _find_municipality_for_address(self, address_info):
+        """Муниципалитет по адресу обращения"""
+        if not address_info:
+            return None
+        
+        settlement = address_info.get('settlement', '')
+        district = address_info.get('district', '')
+        municipality = self._find_municipality_by_settlement(settlement, district)
+        if municipality:
+            logger.info(f"📍 Найдены контакты муниципалитета для {settlement}")
+        else:
+            logger.warning(f"📍 Муниципалитет для {settlement} не найден")
+        return municipality
+
+    def _response_messages(self, appeal_text):
+        """Сообщения для генерации основной части ответа"""
+        # Упрощенный промпт - генерируем только основную часть ответа
+        prompt = f"""
             Сгенерируй официальный ответ на обращение гражданина. Текст обращения: "{appeal_text}"
             
             Требования:
@@ -293,49 +346,125 @@ class AppealsAnalyzer:
             
             Ответ:
             """
+        return [
+            {"role": "system", "content": "Ты помощник для генерации ответов гражданам. Генерируй только основную часть ответа без контактов."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _finalize_response(self, response, municipality):
+        """Ответ с ГАРАНТИРОВАННОЙ подстановкой телефона. Статус обращения
+        выбирает вызывающий и записывает вместе с ответом одним изменением."""
+        final_response = response.strip()
+        
+        if municipality:
+            phone = municipality['telephone']
             
-            response = self.gigachat.chat_completion([
-                {"role": "system", "content": "Ты помощник для генерации ответов гражданам. Генерируй только основную часть ответа без контактов."},
-                {"role": "user", "content": prompt}
-            ])
+            # 1. Заменяем ВСЕ возможные плейсхолдеры
+            final_response = self._replace_all_contact_placeholders(final_response, phone)
             
-            # ОСНОВНАЯ ЛОГИКА: ГАРАНТИРОВАННАЯ ПОДСТАНОВКА ТЕЛЕФОНА
-            final_response = response.strip()
+            # 2. Гарантированно добавляем телефон, если его еще нет
+            final_response = self._ensure_phone_in_text(final_response, phone)
             
-            if municipality:
-                phone = municipality['telephone']
-                
-                # 1. Заменяем ВСЕ возможные плейсхолдеры
-                final_response = self._replace_all_contact_placeholders(final_response, phone)
-                
-                # 2. Гарантированно добавляем телефон, если его еще нет
-                final_response = self._ensure_phone_in_text(final_response, phone)
-                
-                # 3. Добавляем блок контактов
-                contacts_block = self._generate_municipality_contacts(municipality)
-                final_response += contacts_block
-                
-                logger.info(f"✅ Телефон {phone} гарантированно добавлен в ответ")
-                
-                # ИЗМЕНЕНО: статус 'отвечено' вместо 'answered'
-                self.db.update_appeal(appeal_id, {'status': 'отвечено'})
-            else:
-                final_response += "\n\nПо вопросам уточнения обращайтесь в соответствующий муниципальный орган вашего района."
-                # ИЗМЕНЕНО: статус 'требует проверки' вместо 'requires_manual_review'
-                self.db.update_appeal(appeal_id, {'status': 'требует проверки'})
+            # 3. Добавляем блок контактов
+            contacts_block = self._generate_municipality_contacts(municipality)
+            final_response += contacts_block
+            
+            logger.info(f"✅ Телефон {phone} гарантированно добавлен в ответ")
+            return final_response
+        
+        final_response += "\n\nПо вопросам уточнения обращайтесь в соответствующий муниципальный орган вашего района."
+        return final_response
+
+    def _fallback_response(self, address_info, municipality):
+        """Ответ при ошибке генерации"""
+        base_response = "Благодарим за обращение! Ваше сообщение принято к рассмотрению."
+        
+        if address_info and municipality:
+            base_response += f" По вопросам уточнения обращайтесь по телефону {municipality['telephone']}."
+            base_response += self._generate_municipality_contacts(municipality)
+        
+        return base_response
+
+    def generate_response(self, appeal_id, appeal_text, appeal_type, address_info=None):
+        """Генерация ответа на обращение с ГАРАНТИРОВАННОЙ подстановкой телефона"""
+        municipality = None
+        try:
+            # Получаем контакты муниципального образования
+            municipality = self._find_municipality_for_address(address_info)
+            
+            response = self.gigachat.chat_completion(self._response_messages(appeal_text))
+            
+            final_response = self._finalize_response(response, municipality)
             
             logger.info(f"📝 Сгенерирован ответ для обращения {appeal_id}")
             return final_response
             
+        except GigaChatUnavailable:
+            raise
         except Exception as e:
             logger.error(f"❌ Ошибка генерации ответа: {e}")
-            base_response = "Благодарим за обращение! Ваше сообщение принято к рассмотрению."
+            return self._fallback_response(address_info, municipality)
+
+    async def generate_response_async(self, appeal_id, appeal_text, appeal_type, address_info=None):
+        """Генерация ответа на обращение без блокировки event loop"""
+        municipality = None
+        try:
+            municipality = self._find_municipality_for_address(address_info)
             
-            if address_info and municipality:
-                base_response += f" По вопросам уточнения обращайтесь по телефону {municipality['telephone']}."
-                base_response += self._generate_municipality_contacts(municipality)
+            response = await self.async_gigachat.chat_completion(self._response_messages(appeal_text))
             
-            return base_response
+            final_response = self._finalize_response(response, municipality)
+            
+            logger.info(f"📝 Сгенерирован ответ для обращения {appeal_id}")
+            return final_response
+            
+        except GigaChatUnavailable:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Ошибка генерации ответа: {e}")
+            return self._fallback_response(address_info, municipality)
+
+    def classify_by_keywords(self, appeal_text):
+        """Резервная классификация по ключевым словам, пока GigaChat недоступен"""
+        text = normalize_appeal_text(appeal_text)
+        
+        keywords = {
+            'жалоба на ЖКХ': ['жкх', 'управляющ', 'отоплен', 'батаре', 'водоснабжен', 'горячей вод', 'канализац', 'коммунал', 'подъезд', 'лифт'],
+            'жалоба на дороги': ['дорог', 'асфальт', 'яма', 'ямы', 'выбоин', 'тротуар'],
+            'жалоба на шум': ['шум', 'громк', 'тишин'],
+            'предложение по транспорту': ['автобус', 'маршрут', 'остановк', 'транспорт', 'расписани'],
+            'предложение по благоустройству': ['благоустр', 'парк', 'сквер', 'площадк', 'озеленен', 'лавочк', 'скамейк', 'освещен', 'фонар'],
+            'запрос документов': ['справк', 'документ', 'выписк', 'копи'],
+            'предложение по культуре': ['культур', 'библиотек', 'музе', 'концерт', 'праздник'],
+            'запрос информации': ['подскажите', 'информаци', 'как узнать', 'где можно', 'когда будет']
+        }
+        
+        best_type, best_count = "другое", 0
+        for appeal_type, words in keywords.items():
+            count = sum(1 for word in words if word in text)
+            if count > best_count:
+                best_type, best_count = appeal_type.lower(), count
+        
+        logger.info(f"🛟 Классифицировано по ключевым словам как: {best_type}")
+        return best_type
+
+    def acknowledgement(self, appeal_id, address_info=None):
+        """Шаблонное подтверждение приема обращения с контактами муниципалитета,
+        пока GigaChat недоступен; ответ по существу придет после повторной обработки.
+        Временный (отрицательный) ID отложенной записи гражданину не сообщается."""
+        municipality = self._find_municipality_for_address(address_info)
+        
+        number = f" №{appeal_id}" if appeal_id and appeal_id > 0 else ""
+        response = (
+            f"Благодарим за обращение! Ваше обращение{number} зарегистрировано и принято к рассмотрению. "
+            "Подробный ответ поступит дополнительно."
+        )
+        if municipality:
+            response += f" По вопросам уточнения обращайтесь по телефону {municipality['telephone']}."
+            response += self._generate_municipality_contacts(municipality)
+        else:
+            response += "\n\nПо вопросам уточнения обращайтесь в соответствующий муниципальный орган вашего района."
+        return response
 
     def analyze_trends(self, period_days=30):
         """Анализ трендов и повторяющихся проблем с актуальными данными и русскими статусами"""
@@ -413,10 +542,11 @@ class AppealsAnalyzer:
             Важно: верни только валидный JSON без дополнительного текста.
             """
             
+            # Аналитика уступает очередь к GigaChat обращениям граждан
             response = self.gigachat.chat_completion([
                 {"role": "system", "content": "Ты аналитик, выделяющий основные темы из обращений. Ты возвращаешь только валидный JSON."},
                 {"role": "user", "content": prompt}
-            ])
+            ], priority='analytics')
             
             response = response.strip()
             json_match = re.search(r'\[.*\]', response, re.DOTALL)
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r'[\W_]+')
+
+
+def normalize_appeal_text(text):
+    """Текст обращения без различий в регистре, пробелах, ё/е и пунктуации"""
+    text = (text or '').lower().replace('ё', 'е')
+    return ' '.join(_PUNCTUATION.sub(' ', text).split())
+
+
+def appeal_text_hash(text):
+    return hashlib.sha256(normalize_appeal_text(text).encode('utf-8')).hexdigest()
+
+
+def types_version(common_types):
+    """Версия списка категорий: при изменении списка прежние записи кэша не используются"""
+    return hashlib.sha256(json.dumps(list(common_types), ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+
+class ClassificationCache:
+    """Кэш классификации обращений: LRU в памяти процесса и таблица
+    classification_cache в хранилище, общая для всех процессов системы.
+
+    Ключ - хэш нормализованного текста, поэтому повторно присланные жалобы с
+    другим регистром, пробелами или знаками препинания не уходят в GigaChat.
+    Ошибки хранилища не мешают классификации: кэш работает только в памяти.
+    """
+
+    def __init__(self, storage, common_types, max_entries=2048):
+        if max_entries < 1:
+            raise ValueError("Размер кэша должен быть не меньше 1")
+
+        self.storage = storage
+        self.version = types_version(common_types)
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {
+            'memory_hits': 0,
+            'storage_hits': 0,
+            'misses': 0,
+            'stored': 0,
+            'storage_errors': 0
+        }
+
+        try:
+            self.storage.purge_classifications(self.version)
+        except Exception as e:
+            self._stats['storage_errors'] += 1
+            logger.warning(f"⚠️ Не удалось очистить устаревшие записи кэша классификации: {e}")
+
+    @staticmethod
+    def key(text):
+        return appeal_text_hash(text)
+
+    def _remember(self, key, appeal_type):
+        with self._lock:
+            self._entries[key] = appeal_type
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Тип обращения по ключу или None"""
+        with self._lock:
+            appeal_type = self._entries.get(key)
+            if appeal_type is not None:
+                self._entries.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return appeal_type
+
+        try:
+            appeal_type = self.storage.get_classification(key, self.version)
+        except Exception as e:
+            appeal_type = None
+            with self._lock:
+                self._stats['storage_errors'] += 1
+            logger.warning(f"⚠️ Кэш классификации в хранилище недоступен: {e}")
+
+        if appeal_type is None:
+            with self._lock:
+                self._stats['misses'] += 1
+            return None
+
+        self._remember(key, appeal_type)
+        with self._lock:
+            self._stats['storage_hits'] += 1
+        return appeal_type
+
+    def put(self, key, appeal_type):
+        self._remember(key, appeal_type)
+        try:
+            self.storage.store_classification(key, self.version, appeal_type)
+            with self._lock:
+                self._stats['stored'] += 1
+        except Exception as e:
+            with self._lock:
+                self._stats['storage_errors'] += 1
+            logger.warning(f"⚠️ Не удалось сохранить классификацию в хранилище: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        stats['max_entries'] = self.max_entries
+        stats['types_version'] = self.version
+        return stats
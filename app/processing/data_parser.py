@@ -1,6 +1,5 @@
 import requests
 from bs4 import BeautifulSoup
-import mysql.connector
 import logging
 import re
 import urllib3
@@ -11,8 +10,9 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 logger = logging.getLogger(__name__)
 
 class SettlementParser:
-    def __init__(self, db_config):
-        self.db_config = db_config
+    def __init__(self, storage):
+        # Хранилище системы (MySQL или SQLite), таблица settlements создается его миграциями
+        self.storage = storage
         self.target_url = "https://ru.ruwiki.ru/wiki/Населённые_пункты_Тамбовской_области"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -375,69 +375,12 @@ class SettlementParser:
         except:
             return None
 
-    def create_database(self):
-        """Создание таблицы для населенных пунктов"""
-        try:
-            conn = mysql.connector.connect(**self.db_config)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS settlements (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL,
-                    type VARCHAR(100) NOT NULL,
-                    population INT,
-                    district VARCHAR(255),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    INDEX idx_name (name),
-                    INDEX idx_district (district)
-                )
-            """)
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            logger.info("✅ Таблица settlements создана успешно")
-            
-        except Exception as e:
-            logger.error(f"❌ Ошибка создания таблицы settlements: {e}")
-            raise
-
     def save_to_database(self, settlements):
-        """Сохранение населенных пунктов в базу данных"""
+        """Сохранение населенных пунктов в хранилище (полная замена таблицы)"""
         try:
-            conn = mysql.connector.connect(**self.db_config)
-            cursor = conn.cursor()
-            
-            # Очищаем таблицу перед добавлением новых данных
-            cursor.execute("DELETE FROM settlements")
-            
-            insert_query = """
-                INSERT INTO settlements (name, type, population, district)
-                VALUES (%s, %s, %s, %s)
-            """
-            
-            success_count = 0
-            for settlement in settlements:
-                try:
-                    cursor.execute(insert_query, (
-                        settlement['name'],
-                        settlement['type'],
-                        settlement['population'],
-                        settlement['district']
-                    ))
-                    success_count += 1
-                    logger.info(f"💾 Сохранено: {settlement['type']} {settlement['name']} -> {settlement['district']}")
-                except Exception as e:
-                    logger.warning(f"⚠️ Ошибка сохранения '{settlement['name']}': {e}")
-                    continue
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            logger.info(f"💾 Успешно сохранено {success_count} населенных пунктов")
-            return success_count
+            saved_count = self.storage.replace_settlements(settlements)
+            logger.info(f"💾 Успешно сохранено {saved_count} населенных пунктов")
+            return saved_count
             
         except Exception as e:
             logger.error(f"❌ Ошибка сохранения в базу данных: {e}")
@@ -446,7 +389,6 @@ class SettlementParser:
     def run(self):
         """Запуск парсера"""
         logger.info("🚀 Запуск парсера населенных пунктов Тамбовской области...")
-        self.create_database()
         
         settlements = self.parse_ruwiki_tables()
         
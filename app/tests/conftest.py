@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Модули приложения импортируются от каталога app (как при запуске python main.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def wait_until(predicate, timeout=5.0, interval=0.01):
+    """Ожидание условия, которое выполняет фоновый поток"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+    return True
+
+
+@pytest.fixture
+def make_sqlite_storage(tmp_path):
+    """Хранилище SQLite во временном каталоге; экземпляр-одиночка сбрасывается после теста"""
+    from database.sqlite_storage import SQLiteDatabaseManager
+
+    created = []
+
+    def make(**sqlite_config):
+        SQLiteDatabaseManager._instance = None
+        sqlite_config.setdefault('path', str(tmp_path / 'appeals.db'))
+        storage = SQLiteDatabaseManager(sqlite_config)
+        created.append(storage)
+        return storage
+
+    yield make
+    for storage in created:
+        storage.close()
+    SQLiteDatabaseManager._instance = None
@@ -0,0 +1,99 @@
+import asyncio
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+from database.sqlite_storage import SQLiteDatabaseManager
+from gigachat.api_client import GigaChatClient
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+
+class FakeGigaChat:
+    """Модель, которая классифицирует все обращения одним типом"""
+
+    def __init__(self, appeal_type):
+        self.appeal_type = appeal_type
+
+    def chat_completion(self, messages, **options):
+        if 'классифи' in messages[0]['content'].lower():
+            return self.appeal_type
+        return "Обращение передано в профильную службу."
+
+
+class AsyncFakeGigaChat(FakeGigaChat):
+    async def chat_completion(self, messages, **options):
+        return FakeGigaChat.chat_completion(self, messages, **options)
+
+
+@pytest.fixture
+def make_system(tmp_path, monkeypatch):
+    # main пишет журнал в текущий каталог, анализатор читает оттуда контакты муниципалитетов
+    monkeypatch.chdir(tmp_path)
+    shutil.copy(APP_DIR / 'settlements.data.json', tmp_path)
+    monkeypatch.setattr(GigaChatClient, '_start_token_refresh', lambda self: None)
+    if 'main' not in sys.modules:
+        pytest.importorskip('matplotlib')
+    from main import AppealsProcessingSystem
+
+    systems = []
+
+    def make(appeal_type):
+        SQLiteDatabaseManager._instance = None
+        system = AppealsProcessingSystem({
+            'gigachat_api_key': 'key',
+            'storage': 'sqlite',
+            'sqlite_config': {'path': str(tmp_path / 'appeals.db')}
+        })
+        system.analyzer.gigachat = FakeGigaChat(appeal_type)
+        system.analyzer.async_gigachat = AsyncFakeGigaChat(appeal_type)
+        systems.append(system)
+        return system
+
+    yield make
+    for system in systems:
+        system.async_database.shutdown()
+        system.shutdown()
+    SQLiteDatabaseManager._instance = None
+
+
+ADDRESS = {'settlement': 'Тамбов', 'district': 'Городской округ город Тамбов'}
+
+
+def stored_appeal(system):
+    appeals = system.database.get_appeals()
+    assert len(appeals) == 1
+    return appeals[0]
+
+
+def test_common_appeal_is_answered(make_system):
+    system = make_system('жалоба на ЖКХ')
+    response = system.process_citizen_appeal('u1', 'Нет отопления', address_info=ADDRESS)
+
+    appeal = stored_appeal(system)
+    assert appeal['status'] == 'отвечено'
+    assert appeal['response'] == response
+    assert appeal['responded_at'] is not None
+
+
+def test_non_common_appeal_with_municipality_is_not_answered(make_system):
+    system = make_system('другое')
+    response = system.process_citizen_appeal('u1', 'Прошу рассмотреть вопрос', address_info=ADDRESS)
+
+    # Ответ содержит контакты найденного муниципалитета, но обращение ждет ручной проверки
+    assert 'телефон' in response.lower()
+    appeal = stored_appeal(system)
+    assert appeal['status'] == 'требует проверки'
+    assert appeal['responded_at'] is None
+    assert system.database.get_response_time_stats(30)['overall']['responded_count'] == 0
+
+
+def test_non_common_appeal_async_is_not_answered(make_system):
+    system = make_system('другое')
+    asyncio.run(system.process_citizen_appeal_async('u1', 'Прошу рассмотреть вопрос', address_info=ADDRESS))
+
+    appeal = stored_appeal(system)
+    assert appeal['status'] == 'требует проверки'
+    assert appeal['responded_at'] is None
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from database.async_database import AsyncDatabaseManager
+
+
+@pytest.fixture
+def storage(make_sqlite_storage):
+    return make_sqlite_storage(pool={'size': 2, 'async_size': 3, 'checkout_timeout': 1})
+
+
+def test_facade_uses_its_own_pool(storage):
+    facade = AsyncDatabaseManager(storage)
+    try:
+        assert facade.pool is storage.async_pool
+        assert facade.pool.name == 'async'
+        assert facade.max_workers == 3
+
+        primary_checkouts = storage.pool.get_stats()['checkouts']
+
+        async def run():
+            appeal_id = await facade.store_appeal({'user_id': 'u', 'text': 'Нет воды', 'type': 'другое'})
+            return await facade.get_appeals({'user_id': 'u'}), appeal_id
+
+        appeals, appeal_id = asyncio.run(run())
+        assert [appeal['id'] for appeal in appeals] == [appeal_id]
+        assert storage.pool.get_stats()['checkouts'] == primary_checkouts
+        assert storage.get_pool_stats()['async']['checkouts'] >= 2
+    finally:
+        facade.shutdown()
+
+
+def test_facade_is_not_blocked_by_busy_primary_pool(storage):
+    facade = AsyncDatabaseManager(storage)
+    held = [storage.pool.acquire() for _ in range(storage.pool.pool_size)]
+    try:
+        # Все соединения синхронных вызовов заняты, фасад продолжает работать
+        assert asyncio.run(facade.get_appeals()) == []
+    finally:
+        for conn in held:
+            storage.pool.release(conn)
+        facade.shutdown()
+
+
+def test_async_pool_size_defaults_to_primary(make_sqlite_storage):
+    storage = make_sqlite_storage(pool={'size': 4})
+    assert storage.create_async_pool().pool_size == 4
+    assert storage.create_async_pool() is storage.async_pool
@@ -0,0 +1,282 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+import requests
+
+from database.async_database import AsyncDatabaseManager
+from gigachat import circuit_breaker as breaker_module
+from gigachat.api_client import GigaChatClient
+from gigachat.async_client import AsyncGigaChatClient
+from gigachat.circuit_breaker import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, GigaChatRequestError, GigaChatUnavailable, response_outcome
+)
+from gigachat.scheduler import GigaChatScheduler, SchedulerTimeout
+from processing.analyzer import AppealsAnalyzer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(breaker_module, 'time', clock)
+    return clock
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.min_calls):
+        breaker.record(False)
+
+
+def test_breaker_opens_on_failure_rate(clock):
+    breaker = CircuitBreaker(min_calls=4, failure_rate=0.5)
+    for success in (True, True, False):
+        breaker.record(success)
+    assert breaker.state == CLOSED
+
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    with pytest.raises(GigaChatUnavailable):
+        breaker.check()
+    assert breaker.get_stats()['rejected'] == 2
+
+
+def test_old_outcomes_leave_the_window(clock):
+    breaker = CircuitBreaker(window_seconds=60, min_calls=2)
+    breaker.record(False)
+    clock.now += 61
+    breaker.record(False)
+
+    assert breaker.state == CLOSED
+    assert breaker.get_stats()['window_calls'] == 1
+
+
+def test_open_half_open_closed(clock):
+    breaker = CircuitBreaker(min_calls=2, open_seconds=30)
+    open_breaker(breaker)
+    clock.now += 29
+    assert breaker.state == OPEN
+
+    clock.now += 1
+    assert breaker.state == HALF_OPEN
+    # В полуоткрытом состоянии проходит только пробный запрос
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+    assert breaker.get_stats()['opened'] == 1
+    assert breaker.get_stats()['closed'] == 1
+
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker(min_calls=2, open_seconds=30)
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow()
+
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.get_stats()['opened'] == 2
+
+
+def test_skipped_trial_frees_the_trial_slot(clock):
+    breaker = CircuitBreaker(min_calls=2, open_seconds=30)
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow()
+
+    # Попытка не дошла до GigaChat: пробный запрос можно повторить
+    breaker.record(None)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_skipped_outcome_is_not_counted(clock):
+    breaker = CircuitBreaker(min_calls=2)
+    breaker.record(None)
+    breaker.record(None)
+    breaker.record(False)
+
+    assert breaker.state == CLOSED
+    assert breaker.get_stats()['window_calls'] == 1
+
+
+def test_invalid_failure_rate_is_rejected():
+    with pytest.raises(ValueError):
+        CircuitBreaker(failure_rate=0)
+
+
+@pytest.mark.parametrize('status_code, outcome', [(200, True), (429, False), (500, False), (503, False), (400, None), (404, None)])
+def test_response_outcome(status_code, outcome):
+    assert response_outcome(status_code) is outcome
+
+
+def make_client(status_code, breaker=None, content='жалоба на дороги'):
+    client = AsyncGigaChatClient('key', circuit_breaker=breaker or CircuitBreaker(min_calls=100))
+    calls = []
+
+    def handle(request):
+        if 'oauth' in str(request.url):
+            return httpx.Response(200, json={'access_token': 'token', 'expires_in': 1800})
+        calls.append(request)
+        return httpx.Response(status_code, json={'choices': [{'message': {'content': content}}]})
+
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    client._auth_lock = asyncio.Lock()
+
+    async def no_backoff(seconds):
+        pass
+
+    client._backoff = no_backoff
+    return client, calls
+
+
+def complete(client, **options):
+    async def run():
+        try:
+            return await client.chat_completion([{'role': 'user', 'content': 'текст'}], **options)
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def test_chat_completion_returns_answer():
+    client, calls = make_client(200)
+    assert complete(client) == 'жалоба на дороги'
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize('status_code', [500, 503, 429])
+def test_exhausted_retries_raise_unavailable(status_code):
+    client, calls = make_client(status_code)
+    with pytest.raises(GigaChatUnavailable):
+        complete(client, max_retries=3)
+    assert len(calls) == 3
+
+
+def test_rejected_request_raises_request_error():
+    client, calls = make_client(400)
+    with pytest.raises(GigaChatRequestError):
+        complete(client, max_retries=2)
+    assert len(calls) == 2
+
+
+def test_failure_on_last_attempt_opening_circuit_raises_unavailable():
+    breaker = CircuitBreaker(min_calls=2)
+    client, calls = make_client(503, breaker)
+    with pytest.raises(GigaChatUnavailable):
+        complete(client, max_retries=2)
+    assert breaker.state == OPEN
+
+    client, calls = make_client(200, breaker)
+    with pytest.raises(GigaChatUnavailable):
+        complete(client)
+    assert calls == []
+
+
+def make_sync_client(monkeypatch, status_code, **options):
+    # Без фонового обновления токена: тест не обращается к сети
+    monkeypatch.setattr(GigaChatClient, '_start_token_refresh', lambda self: None)
+    client = GigaChatClient('key', circuit_breaker=CircuitBreaker(min_calls=100), **options)
+    calls = []
+
+    def request(call, method, url, read_timeout, **kwargs):
+        calls.append(url)
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = b'{"choices": [{"message": {"content": "ok"}}]}'
+        return response
+
+    monkeypatch.setattr(client, '_authenticate', lambda max_retries=3: True)
+    monkeypatch.setattr(client, '_request', request)
+    monkeypatch.setattr(client, '_backoff', lambda seconds: None)
+    return client, calls
+
+
+def test_sync_client_raises_instead_of_answering(monkeypatch):
+    client, calls = make_sync_client(monkeypatch, 200)
+    assert client.chat_completion([]) == 'ok'
+
+    client, calls = make_sync_client(monkeypatch, 502)
+    with pytest.raises(GigaChatUnavailable):
+        client.chat_completion([], max_retries=2)
+    assert len(calls) == 2
+
+    client, calls = make_sync_client(monkeypatch, 400)
+    with pytest.raises(GigaChatRequestError):
+        client.chat_completion([], max_retries=1)
+
+
+def test_sync_client_failed_authentication_raises_unavailable(monkeypatch):
+    client, calls = make_sync_client(monkeypatch, 200)
+    monkeypatch.setattr(client, '_authenticate', lambda max_retries=3: False)
+    with pytest.raises(GigaChatUnavailable):
+        client.chat_completion([])
+    assert calls == []
+
+
+def test_scheduler_timeout_is_not_returned_as_answer(monkeypatch):
+    scheduler = GigaChatScheduler(rate_per_minute=60000, burst=100, max_in_flight=1, citizen_max_wait=0.01)
+    scheduler.acquire('citizen')
+    client, calls = make_sync_client(monkeypatch, 200, scheduler=scheduler)
+    with pytest.raises(SchedulerTimeout):
+        client.chat_completion([])
+    assert calls == []
+    assert client.circuit_breaker.state == CLOSED
+
+
+@pytest.fixture
+def analyzer(make_sqlite_storage):
+    storage = make_sqlite_storage()
+    async_database = AsyncDatabaseManager(storage)
+    client, _ = make_client(503)
+    yield AppealsAnalyzer(None, storage, client, async_database)
+    asyncio.run(client.aclose())
+    async_database.shutdown()
+
+
+def test_analyzer_propagates_unavailable(analyzer):
+    async def run():
+        with pytest.raises(GigaChatUnavailable):
+            await analyzer.classify_appeal_async('Яма на дороге')
+        with pytest.raises(GigaChatUnavailable):
+            await analyzer.generate_response_async(1, 'Яма на дороге', 'жалоба на дороги')
+
+    asyncio.run(run())
+
+
+def test_keyword_classification(analyzer):
+    assert analyzer.classify_by_keywords('Большая яма на дороге у дома') == 'жалоба на дороги'
+    assert analyzer.classify_by_keywords('Спасибо за работу') == 'другое'
+
+
+def test_acknowledgement_hides_temporary_id(analyzer):
+    assert 'обращение №12 зарегистрировано' in analyzer.acknowledgement(12)
+    temporary = analyzer.acknowledgement(-3)
+    assert '№' not in temporary
+    assert 'Ваше обращение зарегистрировано' in temporary
+
+
+def test_pending_appeals_oldest_first(make_sqlite_storage):
+    storage = make_sqlite_storage()
+    now = datetime.now().replace(microsecond=0)
+    ids = storage.store_appeals([
+        {'user_id': 'u', 'text': f'Обращение {number}', 'type': 'другое', 'status': 'ожидает обработки',
+         'created_at': now - timedelta(hours=number)}
+        for number in range(5)
+    ])
+    storage.update_appeal(ids[3], {'status': 'отвечено'})
+
+    pending = storage.get_pending_appeals('ожидает обработки', limit=3)
+    assert [row['id'] for row in pending] == [ids[4], ids[2], ids[1]]
@@ -0,0 +1,124 @@
+import pytest
+
+from processing.classification_cache import (
+    ClassificationCache, appeal_text_hash, normalize_appeal_text, types_version
+)
+
+COMMON_TYPES = ['жалоба на жкх', 'жалоба на дороги', 'другое']
+
+
+class MemoryStorage:
+    """Таблица classification_cache хранилища в памяти"""
+
+    def __init__(self, fail=False):
+        self.rows = {}
+        self.fail = fail
+        self.purged = []
+
+    def _check(self):
+        if self.fail:
+            raise ConnectionError("хранилище недоступно")
+
+    def purge_classifications(self, version):
+        self._check()
+        self.purged.append(version)
+        self.rows = {key: value for key, value in self.rows.items() if key[1] == version}
+
+    def get_classification(self, text_hash, version):
+        self._check()
+        return self.rows.get((text_hash, version))
+
+    def store_classification(self, text_hash, version, appeal_type):
+        self._check()
+        self.rows.setdefault((text_hash, version), appeal_type)
+
+
+@pytest.mark.parametrize('variant', [
+    'Нет горячей воды в доме',
+    '  нет   ГОРЯЧЕЙ воды в доме!!! ',
+    'Нет горячей воды, в доме.',
+    'нет\tгорячей\nводы в доме?',
+    'Нет горячей воды в доме :)',
+])
+def test_normalization_ignores_case_spacing_and_punctuation(variant):
+    assert normalize_appeal_text(variant) == 'нет горячей воды в доме'
+    assert appeal_text_hash(variant) == appeal_text_hash('Нет горячей воды в доме')
+
+
+def test_normalization_treats_yo_as_ye():
+    assert normalize_appeal_text('Счёт за отопление') == normalize_appeal_text('счет за отопление')
+
+
+def test_different_texts_have_different_hashes():
+    assert appeal_text_hash('Нет горячей воды') != appeal_text_hash('Нет холодной воды')
+    assert appeal_text_hash('дом 5') != appeal_text_hash('дом 6')
+
+
+def test_empty_text_is_normalized():
+    assert normalize_appeal_text(None) == normalize_appeal_text('  ...  ') == ''
+
+
+def test_types_version_depends_on_categories():
+    assert types_version(COMMON_TYPES) == types_version(list(COMMON_TYPES))
+    assert types_version(COMMON_TYPES) != types_version(COMMON_TYPES + ['запрос информации'])
+
+
+def test_cache_hit_for_normalized_variant():
+    cache = ClassificationCache(MemoryStorage(), COMMON_TYPES)
+    cache.put(cache.key('Яма на дороге!'), 'жалоба на дороги')
+
+    assert cache.get(cache.key('  яма на   дороге ')) == 'жалоба на дороги'
+    assert cache.get_stats()['memory_hits'] == 1
+
+
+def test_storage_is_shared_between_caches():
+    storage = MemoryStorage()
+    ClassificationCache(storage, COMMON_TYPES).put(ClassificationCache.key('Яма на дороге'), 'жалоба на дороги')
+
+    other = ClassificationCache(storage, COMMON_TYPES)
+    assert other.get(other.key('яма на дороге')) == 'жалоба на дороги'
+    assert other.get_stats()['storage_hits'] == 1
+
+
+def test_changed_categories_invalidate_entries():
+    storage = MemoryStorage()
+    ClassificationCache(storage, COMMON_TYPES).put(ClassificationCache.key('Яма на дороге'), 'жалоба на дороги')
+
+    changed = ClassificationCache(storage, COMMON_TYPES + ['запрос информации'])
+    assert changed.get(changed.key('Яма на дороге')) is None
+    assert storage.rows == {}
+
+
+def test_lru_evicts_oldest_entry():
+    storage = MemoryStorage()
+    cache = ClassificationCache(storage, COMMON_TYPES, max_entries=2)
+    for text in ('первое', 'второе', 'третье'):
+        cache.put(cache.key(text), 'другое')
+    storage.rows.clear()
+
+    assert cache.get(cache.key('первое')) is None
+    assert cache.get(cache.key('третье')) == 'другое'
+    assert cache.get_stats()['entries'] == 2
+
+
+def test_storage_errors_fall_back_to_memory():
+    cache = ClassificationCache(MemoryStorage(fail=True), COMMON_TYPES)
+    cache.put(cache.key('Яма на дороге'), 'жалоба на дороги')
+
+    assert cache.get(cache.key('Яма на дороге')) == 'жалоба на дороги'
+    assert cache.get(cache.key('Нет воды')) is None
+    assert cache.get_stats()['storage_errors'] == 3
+
+
+def test_invalid_size_is_rejected():
+    with pytest.raises(ValueError):
+        ClassificationCache(MemoryStorage(), COMMON_TYPES, max_entries=0)
+
+
+def test_sqlite_storage_round_trip(make_sqlite_storage):
+    storage = make_sqlite_storage()
+    ClassificationCache(storage, COMMON_TYPES).put(ClassificationCache.key('Яма на дороге'), 'жалоба на дороги')
+
+    other = ClassificationCache(storage, COMMON_TYPES)
+    assert other.get(other.key('ЯМА на дороге...')) == 'жалоба на дороги'
+    assert ClassificationCache(storage, ['другое']).get(other.key('Яма на дороге')) is None
@@ -0,0 +1,171 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+from mysql.connector import errors as mysql_errors
+
+from database.connection_pool import PoolClosedError, PoolExhaustedError
+from database.sqlite_storage import SQLiteConnectionPool
+
+
+@pytest.fixture
+def make_pool(tmp_path):
+    pools = []
+
+    def make(pool_size=2, checkout_timeout=0.1, validation_interval=None):
+        pool = SQLiteConnectionPool(str(tmp_path / 'pool.db'), pool_size=pool_size, checkout_timeout=checkout_timeout)
+        if validation_interval is not None:
+            pool.validation_interval = validation_interval
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close(timeout=0)
+
+
+def test_connections_are_reused(make_pool):
+    pool = make_pool()
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    stats = pool.get_stats()
+    assert (stats['checkouts'], stats['open'], stats['idle']) == (2, 1, 1)
+
+
+def test_checkout_times_out_when_exhausted(make_pool):
+    pool = make_pool(pool_size=1, checkout_timeout=0.05)
+    held = pool.acquire()
+
+    started = time.monotonic()
+    with pytest.raises(PoolExhaustedError):
+        pool.acquire()
+    assert time.monotonic() - started >= 0.05
+    assert pool.get_stats()['timeouts'] == 1
+
+    pool.release(held)
+    assert pool.acquire() is held
+
+
+def test_waiting_checkout_gets_released_connection(make_pool):
+    pool = make_pool(pool_size=1, checkout_timeout=5)
+    held = pool.acquire()
+    threading.Timer(0.05, pool.release, args=(held,)).start()
+
+    assert pool.acquire() is held
+    assert pool.get_stats()['waits'] == 1
+
+
+def test_connection_is_discarded_after_connection_error(make_pool):
+    pool = make_pool()
+    with pytest.raises(mysql_errors.OperationalError):
+        with pool.connection() as broken:
+            raise mysql_errors.OperationalError(msg="соединение разорвано")
+
+    with pool.connection() as conn:
+        assert conn is not broken
+    stats = pool.get_stats()
+    assert (stats['discarded'], stats['open']) == (1, 1)
+
+
+def test_connection_with_unread_result_is_discarded(make_pool):
+    pool = make_pool()
+    conn = pool.acquire()
+    conn.unread_result = True
+    pool.release(conn)
+
+    assert pool.get_stats()['discarded'] == 1
+    assert pool.acquire() is not conn
+
+
+def test_open_transaction_is_rolled_back_on_release(make_pool):
+    pool = make_pool(pool_size=1)
+    with pool.connection() as conn:
+        conn.cursor().execute("CREATE TABLE IF NOT EXISTS t (x INTEGER)")
+        conn.start_transaction()
+        conn.cursor().execute("INSERT INTO t VALUES (1)")
+
+    with pool.connection() as conn:
+        assert not conn.in_transaction
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM t")
+        assert cursor.fetchone()[0] == 0
+
+
+def test_connection_is_validated_after_interval(make_pool):
+    pool = make_pool(validation_interval=0.05)
+    with pool.connection() as conn:
+        pass
+    with pool.connection() as same:
+        pass
+    assert same is conn
+    assert pool.get_stats()['validations'] == 0
+
+    time.sleep(0.06)
+    with pool.connection() as validated:
+        pass
+    assert validated is conn
+    assert pool.get_stats()['validations'] == 1
+
+
+def test_lost_connection_is_replaced_on_validation(make_pool):
+    pool = make_pool(validation_interval=0.01)
+    with pool.connection() as conn:
+        pass
+    # Сервер закрыл соединение, пока оно простаивало в пуле
+    conn._connection.close()
+    time.sleep(0.02)
+
+    with pool.connection() as replaced:
+        cursor = replaced.cursor()
+        cursor.execute("SELECT 1")
+        assert cursor.fetchone()[0] == 1
+    assert replaced is not conn
+    assert pool.get_stats()['reconnects'] == 1
+    assert pool.get_stats()['open'] == 1
+
+
+def _use_pool_in_child(pool, results):
+    stats = pool.get_stats()
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        results.put((stats['open'], stats['checkouts'], cursor.fetchone()[0], pool.get_stats()['open']))
+
+
+def test_pool_is_reset_after_fork(make_pool):
+    pool = make_pool()
+    parent_conn = pool.acquire()
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+
+    process = context.Process(target=_use_pool_in_child, args=(pool, results))
+    process.start()
+    child = results.get(timeout=5)
+    process.join(5)
+
+    # До первого обращения в дочернем процессе видно состояние родителя, затем пул сбрасывается
+    assert child == (1, 1, 1, 1)
+    assert pool.get_stats()['open'] == 1
+    pool.release(parent_conn)
+    assert pool.get_stats()['idle'] == 1
+
+
+def test_closed_pool_rejects_checkouts(make_pool):
+    pool = make_pool()
+    with pool.connection():
+        pass
+    pool.close()
+
+    with pytest.raises(PoolClosedError):
+        pool.acquire()
+    assert pool.get_stats()['open'] == 0
+
+
+def test_pool_size_must_be_positive(tmp_path):
+    with pytest.raises(ValueError):
+        SQLiteConnectionPool(str(tmp_path / 'pool.db'), pool_size=0)
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+import pytest
+
+from database.database_manager import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 3, 1, 12, 30, 15, 250000)
+    cursor = encode_cursor(created_at, 42)
+
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+def test_cursor_accepts_iso_string():
+    assert decode_cursor(encode_cursor('2024-03-01T12:30:15', '7')) == (datetime(2024, 3, 1, 12, 30, 15), 7)
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor(datetime(2024, 3, 1), 10 ** 12)
+
+    assert all(ch.isalnum() or ch in '-_=' for ch in cursor)
+
+
+@pytest.mark.parametrize('cursor', ['', 'не курсор', 'bm90IGpzb24=', 'WzFd', 'WyJ4IiwgMV0='])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
@@ -0,0 +1,130 @@
+import logging
+
+import pytest
+
+from database.district_resolver import NO_MATCH, DistrictResolver, split_settlement_name
+
+SETTLEMENTS = [
+    ('Тамбов', 'город', 'Городской округ город Тамбов'),
+    ('Токарёвка', 'поселок городского типа', 'Токарёвский район'),
+    ('Сатинка', 'поселок', 'Сампурский район'),
+    ('Знаменка', 'поселок городского типа', 'Знаменский район'),
+    ('Знаменка', 'село', 'Мичуринский район'),
+    ('Знаменка', 'село', 'Моршанский район'),
+    ('Александровка', 'село', 'Мичуринский район'),
+    ('Александровка', 'деревня', 'Ржаксинский район'),
+]
+
+
+class FakeCursor:
+    """Курсор, отдающий строки таблицы settlements"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.query = None
+
+    def execute(self, query, params=None):
+        self.query = query
+
+    def fetchall(self):
+        return list(self.rows)
+
+
+@pytest.fixture
+def resolver():
+    resolver = DistrictResolver()
+    assert resolver.load(FakeCursor(SETTLEMENTS)) == len(SETTLEMENTS)
+    return resolver
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('Тамбов', ('тамбов', None)),
+    ('  ТАМБОВ ', ('тамбов', None)),
+    ('г. Тамбов', ('тамбов', 'город')),
+    ('г.Тамбов', ('тамбов', 'город')),
+    ('город Тамбов', ('тамбов', 'город')),
+    ('с. Знаменка', ('знаменка', 'село')),
+    ('пос. Сатинка', ('сатинка', 'поселок')),
+    ('п Сатинка', ('сатинка', 'поселок')),
+    ('пгт Токарёвка', ('токаревка', 'поселок городского типа')),
+    ('рабочий поселок Токаревка', ('токаревка', 'поселок городского типа')),
+    ('поселок "Сатинка"', ('сатинка', 'поселок')),
+    ('«Сатинка»', ('сатинка', None)),
+    # Название, начинающееся как префикс, префиксом не считается
+    ('Сосновка', ('сосновка', None)),
+    ('Гавриловка 2-я', ('гавриловка 2-я', None)),
+    # Один префикс без названия остается названием
+    ('с.', ('с.', None)),
+])
+def test_split_settlement_name(name, expected):
+    assert split_settlement_name(name) == expected
+
+
+@pytest.mark.parametrize('settlement, district', [
+    ('Тамбов', 'Городской округ город Тамбов'),
+    ('тамбов', 'Городской округ город Тамбов'),
+    ('г. Тамбов', 'Городской округ город Тамбов'),
+    # ё и е не различаются в обе стороны
+    ('Токаревка', 'Токарёвский район'),
+    ('Токарёвка', 'Токарёвский район'),
+    ('пгт Токаревка', 'Токарёвский район'),
+    ('пос. Сатинка', 'Сампурский район'),
+    ('п. Сатинка', 'Сампурский район'),
+    # Тип из префикса выбирает единственный пункт среди одноименных
+    ('пгт Знаменка', 'Знаменский район'),
+    ('д. Александровка', 'Ржаксинский район'),
+    ('с. Александровка', 'Мичуринский район'),
+])
+def test_resolve_district(resolver, settlement, district):
+    match = resolver.resolve(settlement)
+    assert match.district == district
+    assert not match.ambiguous
+
+
+@pytest.mark.parametrize('settlement, candidates', [
+    ('Знаменка', ('Знаменский район', 'Мичуринский район', 'Моршанский район')),
+    ('с. Знаменка', ('Мичуринский район', 'Моршанский район')),
+    ('Александровка', ('Мичуринский район', 'Ржаксинский район')),
+    # Пунктов указанного типа нет: тип не сужает выбор
+    ('х. Александровка', ('Мичуринский район', 'Ржаксинский район')),
+])
+def test_ambiguous_name_has_no_district(resolver, settlement, candidates):
+    match = resolver.resolve(settlement)
+    assert match.district is None
+    assert match.ambiguous
+    assert match.candidates == candidates
+
+
+@pytest.mark.parametrize('settlement', [None, '', '   ', 'Несуществующее', 'с. Несуществующее'])
+def test_unknown_settlement_has_no_match(resolver, settlement):
+    assert resolver.resolve(settlement) == NO_MATCH
+
+
+def test_district_centres_resolve_without_settlements_table():
+    resolver = DistrictResolver()
+    assert resolver.resolve('с. Бондари').district == 'Бондарский район'
+    assert resolver.resolve('р.п. Умёт').district is None
+    assert resolver.resolve('Умет').district == 'Умётский район'
+
+
+def test_storage_does_not_guess_ambiguous_district(make_sqlite_storage, caplog):
+    storage = make_sqlite_storage()
+    storage.replace_settlements([
+        {'name': name, 'type': settlement_type, 'population': 100, 'district': district}
+        for name, settlement_type, district in SETTLEMENTS
+    ])
+
+    def stored_district(settlement):
+        storage.store_appeal({'user_id': settlement, 'text': 'Нет воды', 'type': 'другое', 'settlement': settlement})
+        return storage.get_appeals({'user_id': settlement})[0]['district']
+
+    with caplog.at_level(logging.WARNING):
+        assert stored_district('Знаменка') is None
+    assert 'Знаменка' in caplog.text
+    assert stored_district('пгт Знаменка') == 'Знаменский район'
+
+    # Перезагрузка таблицы перестраивает индекс
+    storage.replace_settlements([
+        {'name': 'Знаменка', 'type': 'село', 'population': 100, 'district': 'Мичуринский район'}
+    ])
+    assert stored_district('Знаменка') == 'Мичуринский район'
@@ -0,0 +1,260 @@
+from datetime import datetime
+
+import pytest
+from mysql.connector import Error
+
+from database.instrumentation import (
+    LATENCY_BUCKETS_MS, InstrumentedCursor, LatencyHistogram, QueryMetrics,
+    describe_query, redact_params, tracked
+)
+
+
+class FakeCursor:
+    """Курсор драйвера: выборка из заданных строк, каждая операция «длится» delay секунд"""
+
+    def __init__(self, rows=(), rowcount=-1, clock=None, delay=0.0, fail=False):
+        self.rows = list(rows)
+        self.rowcount = rowcount
+        self.description = None
+        self.clock = clock
+        self.delay = delay
+        self.fail = fail
+        self.executed = []
+        self.closed = False
+
+    def _tick(self):
+        if self.clock is not None:
+            self.clock.now += self.delay
+
+    def execute(self, operation, params=None):
+        self._tick()
+        self.executed.append((operation, params))
+        if self.fail:
+            raise Error(msg="ошибка запроса")
+        if operation.lstrip().upper().startswith(('SELECT', 'EXPLAIN')):
+            self.description = [('id',)]
+
+    def executemany(self, operation, seq_params):
+        self._tick()
+        self.executed.append((operation, list(seq_params)))
+
+    def fetchone(self):
+        self._tick()
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchmany(self, size=1):
+        self._tick()
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def fetchall(self):
+        self._tick()
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, plan=None):
+        self.plan = plan
+        self.cursors = []
+
+    def cursor(self, dictionary=False):
+        cursor = FakeCursor(rows=self.plan or [])
+        self.cursors.append(cursor)
+        return cursor
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr('database.instrumentation.time.perf_counter', clock)
+    return clock
+
+
+def query_stats(metrics, query):
+    return next(q for q in metrics.get_stats()['queries'] if q['query'] == query)
+
+
+@pytest.mark.parametrize('elapsed_ms, bucket', [
+    (0.2, 'le_1'),
+    (1, 'le_1'),
+    (1.01, 'le_5'),
+    (250, 'le_250'),
+    (4999, 'le_5000'),
+    (5001, 'inf'),
+])
+def test_histogram_bucket_bounds_are_inclusive(elapsed_ms, bucket):
+    histogram = LatencyHistogram()
+    histogram.observe(elapsed_ms)
+    buckets = histogram.to_dict()['buckets']
+    assert buckets[bucket] == 1
+    assert sum(buckets.values()) == 1
+
+
+@pytest.mark.parametrize('observations, fraction, expected', [
+    ([], 0.5, 0.0),
+    ([3] * 100, 0.5, 5.0),
+    ([3] * 99 + [700], 0.99, 5.0),
+    ([3] * 98 + [700] * 2, 0.99, 1000.0),
+    ([0.5] * 50 + [20] * 50, 0.5, 1.0),
+    ([0.5] * 50 + [20] * 50, 0.51, 25.0),
+    # Выше последней корзины перцентиль оценивается максимумом
+    ([3, 7321.456], 0.99, 7321.46),
+])
+def test_histogram_percentiles(observations, fraction, expected):
+    histogram = LatencyHistogram()
+    for elapsed_ms in observations:
+        histogram.observe(elapsed_ms)
+    assert histogram.percentile(fraction) == expected
+
+
+def test_histogram_summary():
+    histogram = LatencyHistogram()
+    histogram.observe(2, rows=3)
+    histogram.observe(8, rows=1)
+    histogram.add_fetch(1.5, rows=10)
+
+    summary = histogram.to_dict()
+    assert (summary['count'], summary['total_ms'], summary['avg_ms'], summary['max_ms']) == (2, 10.0, 5.0, 8.0)
+    assert (summary['rows'], summary['fetch_ms']) == (14, 1.5)
+    assert len(summary['buckets']) == len(LATENCY_BUCKETS_MS) + 1
+
+
+@pytest.mark.parametrize('params, redacted', [
+    (None, None),
+    ((), []),
+    ((1, 2.5, True, None), [1, 2.5, True, None]),
+    (('Нет горячей воды', 'user-42'), ['<str:16>', '<str:7>']),
+    ((b'\x00\x01', bytearray(b'abc')), ['<bytes:2>', '<bytearray:3>']),
+    ((datetime(2024, 3, 1, 12, 30),), ['2024-03-01T12:30:00']),
+    (([1, 2], {'a': 1}), ['<list>', '<dict>']),
+    ({'user_id': 'user-42', 'limit': 10}, {'user_id': '<str:7>', 'limit': 10}),
+])
+def test_redact_params(params, redacted):
+    assert redact_params(params) == redacted
+
+
+@pytest.mark.parametrize('operation, name', [
+    ('SELECT * FROM appeals WHERE id = %s', 'SELECT appeals'),
+    ('  insert into `appeal_changes` (id) values (%s)', 'INSERT appeal_changes'),
+    ('UPDATE appeals SET status = %s', 'UPDATE appeals'),
+    ('SELECT 1', 'SELECT'),
+    ('', 'QUERY'),
+])
+def test_describe_query(operation, name):
+    assert describe_query(operation) == name
+
+
+def test_statement_is_recorded_when_execute_returns(clock):
+    metrics = QueryMetrics(slow_query_ms=None)
+    driver = FakeCursor(rowcount=2, clock=clock, delay=0.004)
+    cursor = InstrumentedCursor(driver, FakeConnection(), metrics)
+
+    cursor.execute("UPDATE appeals SET status = %s", ('отвечено',))
+
+    # Курсор не закрыт и следующего запроса нет - запрос уже учтен
+    stats = query_stats(metrics, 'UPDATE appeals')
+    assert (stats['count'], stats['rows'], stats['max_ms']) == (1, 2, 4.0)
+
+
+def test_fetch_time_and_rows_are_added_to_statement(clock):
+    metrics = QueryMetrics(slow_query_ms=None)
+    driver = FakeCursor(rows=[(1,), (2,), (3,)], clock=clock, delay=0.002)
+    cursor = InstrumentedCursor(driver, FakeConnection(), metrics)
+
+    cursor.execute("SELECT id FROM appeals")
+    assert cursor.fetchone() == (1,)
+    assert cursor.fetchall() == [(2,), (3,)]
+    cursor.execute("SELECT id FROM appeals")
+
+    stats = query_stats(metrics, 'SELECT appeals')
+    assert (stats['count'], stats['total_ms'], stats['rows'], stats['fetch_ms']) == (2, 4.0, 3, 4.0)
+
+
+def test_statements_are_attributed_to_tracked_method(clock):
+    metrics = QueryMetrics(slow_query_ms=None)
+    cursor = InstrumentedCursor(FakeCursor(), FakeConnection(), metrics)
+
+    @tracked
+    def store_appeal():
+        cursor.execute("INSERT INTO appeals (text) VALUES (%s)", ('текст',))
+
+    store_appeal()
+    cursor.execute("SELECT 1")
+
+    methods = {(q['method'], q['query']) for q in metrics.get_stats()['queries']}
+    assert methods == {('store_appeal', 'INSERT appeals'), ('-', 'SELECT')}
+
+
+def test_failed_statement_is_still_recorded(clock):
+    metrics = QueryMetrics(slow_query_ms=None)
+    cursor = InstrumentedCursor(FakeCursor(fail=True), FakeConnection(), metrics)
+
+    with pytest.raises(Error):
+        cursor.execute("DELETE FROM appeals")
+    assert query_stats(metrics, 'DELETE appeals')['count'] == 1
+
+
+def test_slow_statement_is_logged_with_redacted_params(clock):
+    metrics = QueryMetrics(slow_query_ms=100)
+    driver = FakeCursor(rows=[(1,)], clock=clock, delay=0.2)
+    cursor = InstrumentedCursor(driver, FakeConnection(), metrics)
+
+    cursor.execute("SELECT id FROM appeals WHERE user_id = %s", ('user-42',))
+
+    slow = metrics.get_stats()['slow_queries']
+    assert len(slow) == 1
+    assert slow[0]['query'] == 'SELECT appeals'
+    assert slow[0]['elapsed_ms'] == 200.0
+    assert slow[0]['params'] == ['<str:7>']
+    assert 'user-42' not in str(slow[0])
+
+
+def test_slow_select_plan_is_attached_after_result_is_read(clock):
+    metrics = QueryMetrics(slow_query_ms=100, explain_slow=True)
+    connection = FakeConnection(plan=[{'type': 'ALL', 'rows': 1000}])
+    driver = FakeCursor(rows=[(1,), (2,)], clock=clock, delay=0.2)
+    cursor = InstrumentedCursor(driver, connection, metrics)
+
+    cursor.execute("SELECT id FROM appeals")
+    # Пока результат не прочитан, EXPLAIN на том же соединении не выполняется
+    assert connection.cursors == []
+    assert metrics.get_stats()['slow_queries'][0]['plan'] is None
+
+    cursor.fetchall()
+    assert connection.cursors[0].executed == [("EXPLAIN SELECT id FROM appeals", None)]
+    assert metrics.get_stats()['slow_queries'][0]['plan'] == [{'type': 'ALL', 'rows': 1000}]
+
+
+def test_slow_write_is_not_explained(clock):
+    metrics = QueryMetrics(slow_query_ms=100, explain_slow=True)
+    connection = FakeConnection(plan=[{'type': 'ALL'}])
+    cursor = InstrumentedCursor(FakeCursor(rowcount=1, clock=clock, delay=0.2), connection, metrics)
+
+    cursor.execute("UPDATE appeals SET status = %s", ('отвечено',))
+    cursor.close()
+
+    assert connection.cursors == []
+    assert metrics.get_stats()['slow_queries'][0]['rows'] == 1
+
+
+def test_storage_records_queries(make_sqlite_storage):
+    storage = make_sqlite_storage(instrumentation={'slow_query_ms': 0, 'explain_slow': True})
+    storage.store_appeal({'user_id': 'u', 'text': 'Нет воды', 'type': 'другое'})
+    storage.get_appeals({'user_id': 'u'})
+
+    stats = storage.get_query_stats()
+    assert any(q['method'] == 'get_appeals' and q['query'] == 'SELECT appeals' and q['rows'] == 1
+               for q in stats['queries'])
+    assert any(entry['method'] == 'get_appeals' and entry['plan'] for entry in stats['slow_queries'])
@@ -0,0 +1,51 @@
+import json
+from pathlib import Path
+
+from mysql.connector import Error
+
+from database.replicas import ReplicaRouter
+from database.sqlite_storage import SQLiteConnectionPool
+
+CONFIG = Path(__file__).resolve().parent.parent / 'config.example.json'
+
+
+class BrokenPool(SQLiteConnectionPool):
+    def _open(self):
+        raise Error(msg="реплика недоступна")
+
+
+def make_pool(tmp_path, name, pool_class=SQLiteConnectionPool):
+    return pool_class(str(tmp_path / f'{name}.db'), pool_size=1, checkout_timeout=0.1, name=name)
+
+
+def test_example_config_does_not_route_to_replicas():
+    replica_config = json.loads(CONFIG.read_text(encoding='utf-8'))['mysql_replica_config']
+    assert ReplicaRouter.from_config(replica_config) is None
+
+
+def test_replicas_are_used_round_robin(tmp_path):
+    replicas = [make_pool(tmp_path, 'replica-1'), make_pool(tmp_path, 'replica-2')]
+    router = ReplicaRouter(replicas)
+    primary = make_pool(tmp_path, 'primary')
+
+    for _ in range(4):
+        with router.connection(primary):
+            pass
+
+    assert [pool.get_stats()['checkouts'] for pool in replicas] == [2, 2]
+    assert primary.get_stats()['checkouts'] == 0
+
+
+def test_unavailable_replica_falls_back_to_primary(tmp_path):
+    replica = make_pool(tmp_path, 'replica-1', BrokenPool)
+    router = ReplicaRouter([replica], retry_interval=60)
+    primary = make_pool(tmp_path, 'primary')
+
+    for _ in range(2):
+        with router.connection(primary):
+            pass
+
+    assert primary.get_stats()['checkouts'] == 2
+    # Недоступная реплика исключена и второй раз не опрашивается
+    assert replica.get_stats()['checkouts'] == 1
+    assert router.get_stats()[0]['healthy'] is False
@@ -0,0 +1,170 @@
+import threading
+import time
+
+import pytest
+
+from conftest import wait_until
+from database.result_cache import ResultCache
+
+
+class CountingLoader:
+    """Загрузчик, считающий вызовы; может задерживаться, пока не будет отпущен"""
+
+    def __init__(self, value=None, gate=None):
+        self.value = value if value is not None else ['строка']
+        self.gate = gate
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        return self.value
+
+
+def test_hit_returns_copy_of_cached_value():
+    cache = ResultCache()
+    loader = CountingLoader([{'district': 'Тамбовский'}])
+
+    first = cache.get_or_compute('key', 1, loader)
+    first[0]['district'] = 'изменено вызывающим'
+    second = cache.get_or_compute('key', 1, loader)
+
+    assert loader.calls == 1
+    assert second == [{'district': 'Тамбовский'}]
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+
+
+def test_concurrent_misses_run_loader_once():
+    cache = ResultCache()
+    gate = threading.Event()
+    loader = CountingLoader(gate=gate)
+    results = []
+
+    def read():
+        results.append(cache.get_or_compute('key', 1, loader))
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    assert wait_until(lambda: cache.get_stats()['coalesced'] == 7)
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert loader.calls == 1
+    assert results == [['строка']] * 8
+
+
+def test_loader_error_reaches_all_waiters_and_is_not_cached():
+    cache = ResultCache()
+    gate = threading.Event()
+    errors = []
+
+    def failing():
+        gate.wait(5)
+        raise RuntimeError("база недоступна")
+
+    def read():
+        try:
+            cache.get_or_compute('key', 1, failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    assert wait_until(lambda: cache.get_stats()['coalesced'] == 2)
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 3
+    assert cache.get_or_compute('key', 1, CountingLoader(['ok'])) == ['ok']
+
+
+def test_new_data_version_invalidates_entry():
+    cache = ResultCache()
+    cache.get_or_compute('key', 1, CountingLoader(['старое']))
+
+    assert cache.get_or_compute('key', 2, CountingLoader(['новое'])) == ['новое']
+    assert cache.get_stats()['invalidations'] == 1
+
+
+def test_entry_expires_after_ttl():
+    cache = ResultCache(ttl=0.05)
+    loader = CountingLoader()
+    cache.get_or_compute('key', 1, loader)
+    cache.get_or_compute('key', 1, loader)
+    assert loader.calls == 1
+
+    time.sleep(0.06)
+    cache.get_or_compute('key', 1, loader)
+    assert loader.calls == 2
+    assert cache.get_stats()['expirations'] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2)
+    loader = CountingLoader()
+    cache.get_or_compute('a', 1, loader)
+    cache.get_or_compute('b', 1, loader)
+    # Обращение к 'a' делает вытесняемым 'b'
+    cache.get_or_compute('a', 1, loader)
+    cache.get_or_compute('c', 1, loader)
+    assert loader.calls == 3
+
+    cache.get_or_compute('a', 1, loader)
+    assert loader.calls == 3
+    cache.get_or_compute('b', 1, loader)
+    assert loader.calls == 4
+    assert cache.get_stats()['evictions'] == 2
+
+
+def test_empty_results_are_not_cached():
+    cache = ResultCache()
+    loader = CountingLoader([])
+    cache.get_or_compute('key', 1, loader)
+    cache.get_or_compute('key', 1, loader)
+
+    assert loader.calls == 2
+    assert cache.get_stats()['size'] == 0
+
+
+def test_cache_size_must_be_positive():
+    with pytest.raises(ValueError):
+        ResultCache(max_entries=0)
+
+
+def appeal(number):
+    return {'user_id': f'u{number}', 'text': f'Нет света в доме {number}', 'type': 'жалоба на жкх'}
+
+
+def test_storage_never_serves_stale_read_after_own_write(make_sqlite_storage):
+    storage = make_sqlite_storage(cache={'version_check_interval': 60})
+    storage.store_appeal(appeal(1))
+    assert len(storage.get_recent_appeals()) == 1
+    assert len(storage.get_recent_appeals()) == 1
+    assert storage.cache.get_stats()['hits'] == 1
+
+    version = storage.get_data_version()
+    storage.store_appeal(appeal(2))
+
+    assert len(storage.get_recent_appeals()) == 2
+    assert storage.get_data_version() > version
+    assert storage.cache.get_stats()['invalidations'] == 1
+
+
+def test_storage_sees_write_from_another_process(make_sqlite_storage):
+    reader = make_sqlite_storage(cache={'version_check_interval': 0})
+    reader.store_appeal(appeal(1))
+    assert len(reader.get_recent_appeals()) == 1
+
+    # Второй экземпляр на том же файле - как бот в отдельном процессе
+    writer = make_sqlite_storage()
+    writer.store_appeal(appeal(2))
+
+    assert len(reader.get_recent_appeals()) == 2
@@ -0,0 +1,155 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from conftest import wait_until
+from gigachat.circuit_breaker import GigaChatUnavailable
+from gigachat.scheduler import GigaChatScheduler, SchedulerTimeout
+
+
+def make_scheduler(**options):
+    settings = {'rate_per_minute': 60000, 'burst': 100, 'max_in_flight': 1}
+    settings.update(options)
+    return GigaChatScheduler(**settings)
+
+
+def queued(scheduler, priority):
+    return scheduler.get_stats()['priorities'][priority]['queued']
+
+
+def start_waiter(scheduler, priority, admitted):
+    def wait():
+        scheduler.acquire(priority)
+        admitted.append(priority)
+        scheduler.release()
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    return thread
+
+
+def test_citizen_is_admitted_before_earlier_analytics():
+    scheduler = make_scheduler(analytics_max_wait=5)
+    scheduler.acquire('citizen')
+    admitted = []
+
+    analytics = start_waiter(scheduler, 'analytics', admitted)
+    assert wait_until(lambda: queued(scheduler, 'analytics') == 1)
+    citizen = start_waiter(scheduler, 'citizen', admitted)
+    assert wait_until(lambda: queued(scheduler, 'citizen') == 1)
+
+    scheduler.release()
+    citizen.join(5)
+    analytics.join(5)
+    assert admitted == ['citizen', 'analytics']
+
+
+def test_analytics_leaves_a_slot_for_citizens():
+    scheduler = make_scheduler(max_in_flight=2, analytics_max_wait=0.05)
+    assert scheduler.limits == {'citizen': 2, 'analytics': 1}
+    scheduler.acquire('analytics')
+
+    with pytest.raises(SchedulerTimeout):
+        scheduler.acquire('analytics')
+    scheduler.acquire('citizen')
+
+    stats = scheduler.get_stats()
+    assert stats['in_flight'] == 2
+    assert stats['priorities']['analytics']['timed_out'] == 1
+
+
+def test_citizen_wait_is_finite():
+    scheduler = make_scheduler(citizen_max_wait=0.05)
+    scheduler.acquire('citizen')
+
+    started = time.monotonic()
+    with pytest.raises(SchedulerTimeout):
+        scheduler.acquire('citizen')
+    assert time.monotonic() - started < 1
+    assert scheduler.get_stats()['priorities']['citizen']['timed_out'] == 1
+
+
+def test_timeout_is_a_degraded_mode_signal():
+    assert issubclass(SchedulerTimeout, GigaChatUnavailable)
+
+
+def test_rate_limit_waits_for_token():
+    scheduler = GigaChatScheduler(rate_per_minute=600, burst=1, max_in_flight=5)
+    with scheduler.slot():
+        pass
+
+    started = time.monotonic()
+    with scheduler.slot():
+        pass
+    # Один токен в 0,1 с
+    assert time.monotonic() - started >= 0.05
+
+
+def test_slot_is_released_on_error():
+    scheduler = make_scheduler()
+    with pytest.raises(RuntimeError):
+        with scheduler.slot():
+            raise RuntimeError("ошибка запроса")
+
+    assert scheduler.get_stats()['in_flight'] == 0
+
+
+def test_unknown_priority_is_rejected():
+    with pytest.raises(ValueError):
+        make_scheduler().acquire('batch')
+
+
+def test_async_slot_times_out_and_releases():
+    scheduler = make_scheduler(citizen_max_wait=0.05)
+
+    async def run():
+        async with scheduler.async_slot('citizen'):
+            with pytest.raises(SchedulerTimeout):
+                async with scheduler.async_slot('citizen'):
+                    pass
+        return scheduler.get_stats()['in_flight']
+
+    assert asyncio.run(run()) == 0
+
+
+def test_async_slot_cancelled_while_waiting_releases_later_slot():
+    scheduler = make_scheduler(citizen_max_wait=5)
+    scheduler.acquire('citizen')
+
+    async def run():
+        async def wait_for_slot():
+            async with scheduler.async_slot('citizen'):
+                pass
+
+        task = asyncio.create_task(wait_for_slot())
+        while not queued(scheduler, 'citizen'):
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        scheduler.release()
+
+    asyncio.run(run())
+    assert wait_until(lambda: scheduler.get_stats()['in_flight'] == 0)
+
+
+def _hold_slot_and_exit(scheduler):
+    scheduler.acquire('citizen')
+    os._exit(0)
+
+
+def test_slot_of_dead_process_is_reclaimed():
+    scheduler = make_scheduler(citizen_max_wait=1)
+    process = multiprocessing.get_context('fork').Process(target=_hold_slot_and_exit, args=(scheduler,))
+    process.start()
+    process.join(5)
+    assert scheduler.get_stats()['in_flight'] == 1
+
+    scheduler.acquire('citizen')
+    assert scheduler.get_stats()['in_flight'] == 1
+    scheduler.release()
+    assert scheduler.get_stats()['in_flight'] == 0
@@ -0,0 +1,95 @@
+import pytest
+
+from database.search import (
+    MAX_TERMS, build_boolean_query, build_fts5_query, build_snippet,
+    decode_search_cursor, encode_search_cursor, extract_terms
+)
+
+
+@pytest.mark.parametrize('query, terms', [
+    ('Нет горячей воды', ['нет', 'горячей', 'воды']),
+    ('ВОДЫ воды Воды', ['воды']),
+    ('', []),
+    (None, []),
+    # Операторы булевого режима MySQL и FTS5 не проходят в слова
+    ('+вода -свет', ['вода', 'свет']),
+    ('"яма" на дороге*', ['яма', 'на', 'дороге']),
+    ('(свет OR вода) AND NOT газ', ['свет', 'or', 'вода', 'and', 'not', 'газ']),
+    ('~мусор <контейнер> @5', ['мусор', 'контейнер']),
+    ("вода'); DROP TABLE appeals; --", ['вода', 'drop', 'table', 'appeals']),
+    # Дефис внутри слова сохраняется, по краям отбрасывается
+    ('wi-fi --- -свет-', ['wi-fi', 'свет']),
+    # Слова короче минимальной длины n-граммы отбрасываются
+    ('в д. 5 ул', ['ул']),
+    ('дом 12', ['дом', '12']),
+])
+def test_extract_terms(query, terms):
+    assert extract_terms(query) == terms
+
+
+def test_extract_terms_limits_term_count():
+    query = ' '.join(f'слово{number}' for number in range(MAX_TERMS + 5))
+    assert len(extract_terms(query)) == MAX_TERMS
+
+
+@pytest.mark.parametrize('terms, boolean, fts5', [
+    (['вода'], '+"вода"', '"вода"*'),
+    (['нет', 'воды'], '+"нет" +"воды"', '"нет"* AND "воды"*'),
+    (['wi-fi'], '+"wi-fi"', '"wi-fi"*'),
+    ([], '', ''),
+])
+def test_build_queries(terms, boolean, fts5):
+    assert build_boolean_query(terms) == boolean
+    assert build_fts5_query(terms) == fts5
+
+
+@pytest.mark.parametrize('text, terms, snippet', [
+    ('Нет горячей воды', ['воды'], 'Нет горячей <mark>воды</mark>'),
+    ('Вода, вода и ВОДА', ['вода'], '<mark>Вода</mark>, <mark>вода</mark> и <mark>ВОДА</mark>'),
+    # Более длинное слово в приоритете, вложенной подсветки нет
+    ('Водоснабжение', ['вод', 'водоснабжение'], '<mark>Водоснабжение</mark>'),
+    ('Нет света', [], 'Нет света'),
+    ('Нет света', ['газ'], 'Нет света'),
+    ('', ['газ'], ''),
+    (None, ['газ'], ''),
+    # Текст обращения экранируется
+    ('<script>alert(1)</script> вода', ['вода'], '&lt;script&gt;alert(1)&lt;/script&gt; <mark>вода</mark>'),
+    ('"Водоканал" & ЖКХ', ['водоканал'], '&quot;<mark>Водоканал</mark>&quot; &amp; ЖКХ'),
+    # Слова, совпадающие с частью HTML-сущности, не ломают экранирование
+    ('a < b', ['lt'], 'a &lt; b'),
+    ('Tom & Jerry', ['amp'], 'Tom &amp; Jerry'),
+    ('x > y, quote " here', ['gt', 'quot'], 'x &gt; y, <mark>quot</mark>e &quot; here'),
+])
+def test_build_snippet(text, terms, snippet):
+    assert build_snippet(text, terms) == snippet
+
+
+def test_snippet_is_centred_on_first_match():
+    text = 'а' * 200 + ' яма на дороге ' + 'б' * 200
+    snippet = build_snippet(text, ['яма'], width=60)
+
+    assert snippet.startswith('…')
+    assert snippet.endswith('…')
+    assert '<mark>яма</mark>' in snippet
+    assert len(snippet.replace('<mark>', '').replace('</mark>', '')) == 62
+
+
+@pytest.mark.parametrize('relevance, appeal_id', [(0.0, 1), (12.5, 100500)])
+def test_search_cursor_round_trip(relevance, appeal_id):
+    assert decode_search_cursor(encode_search_cursor(relevance, appeal_id)) == (relevance, appeal_id)
+
+
+@pytest.mark.parametrize('cursor', ['', 'не курсор', 'bm90IGpzb24=', 'WzFd'])
+def test_invalid_search_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_search_cursor(cursor)
+
+
+@pytest.mark.parametrize('query', ['"', '+-*', 'NEAR(', '"воды', 'воды"*)', '^воды'])
+def test_special_characters_in_search_do_not_break_query(make_sqlite_storage, query):
+    storage = make_sqlite_storage()
+    storage.store_appeal({'user_id': 'u', 'text': 'Нет горячей воды в доме', 'type': 'жалоба на жкх'})
+
+    found = storage.search_appeals(query)
+    expected = 1 if 'воды' in query else 0
+    assert len(found['appeals']) == expected
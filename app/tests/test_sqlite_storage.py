@@ -0,0 +1,222 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import wait_until
+from database.storage import create_storage
+from database.sqlite_storage import SQLiteDatabaseManager
+from database.write_behind import JOURNAL_SUFFIX, WriteJournal
+
+
+@pytest.fixture
+def storage(make_sqlite_storage):
+    return make_sqlite_storage()
+
+
+def appeal(number, hours_ago, **fields):
+    data = {
+        'user_id': f'u{number % 2}',
+        'text': f'Нет горячей воды в доме {number}',
+        'type': 'жалоба на жкх',
+        'platform': 'telegram',
+        'created_at': datetime.now().replace(microsecond=0) - timedelta(hours=hours_ago)
+    }
+    data.update(fields)
+    return data
+
+
+def test_create_storage_selects_sqlite(tmp_path):
+    SQLiteDatabaseManager._instance = None
+    storage = create_storage({'storage': 'sqlite', 'sqlite_config': {'path': str(tmp_path / 'appeals.db')}})
+    try:
+        assert isinstance(storage, SQLiteDatabaseManager)
+    finally:
+        storage.close()
+        SQLiteDatabaseManager._instance = None
+
+
+def test_unknown_storage_is_rejected():
+    with pytest.raises(ValueError):
+        create_storage({'storage': 'oracle'})
+
+
+def test_store_and_read_back(storage):
+    appeal_id = storage.store_appeal(appeal(1, 1, settlement='Тамбов', street='Советская', house='1'))
+
+    stored = storage.get_appeals({'user_id': 'u1'})
+    assert [row['id'] for row in stored] == [appeal_id]
+    assert stored[0]['type'] == 'жалоба на жкх'
+    assert stored[0]['status'] == 'новое'
+    assert stored[0]['street'] == 'Советская'
+
+
+def test_keyset_pages_cover_all_appeals_once(storage):
+    ids = storage.store_appeals([appeal(number, hours_ago=number) for number in range(7)])
+
+    seen, cursor = [], None
+    while True:
+        page = storage.get_appeals_page(limit=3, cursor=cursor)
+        seen.extend(row['id'] for row in page['appeals'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+
+    # Новые обращения первыми, без пропусков и повторов
+    assert seen == ids
+
+
+def test_keyset_page_with_filter(storage):
+    storage.store_appeals([appeal(number, hours_ago=number) for number in range(6)])
+
+    page = storage.get_appeals_page({'user_id': 'u0'}, limit=10)
+    assert {row['user_id'] for row in page['appeals']} == {'u0'}
+    assert len(page['appeals']) == 3
+    assert page['next_cursor'] is None
+
+
+def test_full_text_search(storage):
+    water = storage.store_appeal(appeal(1, 2))
+    road = storage.store_appeal(appeal(2, 1, text='Яма на дороге у школы', type='жалоба на дороги'))
+    storage.update_appeal(water, {'status': 'отвечено', 'response': 'Подачу воды восстановят завтра'})
+
+    found = storage.search_appeals('яма')
+    assert [row['id'] for row in found['appeals']] == [road]
+
+    found = storage.search_appeals('восстановят')
+    assert [row['id'] for row in found['appeals']] == [water]
+    assert 'восстановят' in found['appeals'][0]['response_snippet']
+
+
+def test_search_pages(storage):
+    storage.store_appeals([appeal(number, hours_ago=number) for number in range(5)])
+
+    first = storage.search_appeals('воды', limit=3)
+    second = storage.search_appeals('воды', cursor=first['next_cursor'], limit=3)
+    ids = [row['id'] for row in first['appeals'] + second['appeals']]
+    assert sorted(ids) == [1, 2, 3, 4, 5]
+    assert second['next_cursor'] is None
+
+
+def test_changes_since_version(storage):
+    first = storage.store_appeal(appeal(1, 2))
+    since = storage.get_changes()['seq']
+    assert storage.get_changes()['appeals'] == []
+
+    second = storage.store_appeal(appeal(2, 1))
+    storage.update_appeal(first, {'status': 'отвечено'})
+
+    changes = storage.get_changes(since)
+    assert not changes['reset']
+    assert changes['seq'] > since
+    assert {row['id']: row['status'] for row in changes['appeals']} == {first: 'отвечено', second: 'новое'}
+    assert storage.get_changes(changes['seq'])['appeals'] == []
+
+
+def test_response_time_stats(storage):
+    ids = storage.store_appeals([appeal(number, hours_ago=5) for number in range(3)])
+    created_at = storage.get_appeals(limit=1)[0]['created_at']
+    for minutes, appeal_id in zip((10, 20, 60), ids):
+        storage.update_appeal(appeal_id, {'status': 'отвечено', 'responded_at': created_at + timedelta(minutes=minutes)})
+
+    stats = storage.get_response_time_stats(30)
+    assert stats['overall']['responded_count'] == 3
+    assert stats['overall']['median_seconds'] == 20 * 60
+    assert stats['overall']['avg_seconds'] == 30 * 60
+    assert [group['appeal_type'] for group in stats['groups']] == ['жалоба на жкх']
+
+
+def test_responded_at_is_set_once(storage):
+    appeal_id = storage.store_appeal(appeal(1, 1))
+    storage.update_appeal(appeal_id, {'status': 'отвечено'})
+    responded_at = storage.get_appeals(limit=1)[0]['responded_at']
+    storage.update_appeal(appeal_id, {'status': 'закрыто'})
+
+    assert responded_at is not None
+    assert storage.get_appeals(limit=1)[0]['responded_at'] == responded_at
+
+
+def test_write_behind_resolves_temporary_ids(make_sqlite_storage, tmp_path):
+    storage = make_sqlite_storage(write_behind={'enabled': True, 'journal_dir': str(tmp_path / 'journal'),
+                                                'fsync': False, 'max_delay_ms': 10000})
+    ref = storage.store_appeal(appeal(1, 1))
+    assert ref < 0
+    assert storage.flush_writes(5)
+
+    storage.update_appeal(ref, {'status': 'отвечено', 'response': 'Ответ'})
+    assert storage.flush_writes(5)
+
+    stored = storage.get_appeals()
+    assert [(row['id'] > 0, row['status'], row['response']) for row in stored] == [(True, 'отвечено', 'Ответ')]
+
+
+def test_write_behind_recovers_crashed_journal(make_sqlite_storage, tmp_path):
+    directory = str(tmp_path / 'journal')
+    os.makedirs(directory)
+    crashed = WriteJournal(directory, fsync=False)
+    crashed.name, crashed.path = 'appeals-1-1', os.path.join(directory, 'appeals-1-1' + JOURNAL_SUFFIX)
+    crashed.open()
+    crashed.append({'op': 'insert', 'seq': 1, 'ref': -1, 'data': appeal(1, 1)})
+    crashed.append({'op': 'update', 'seq': 2, 'appeal_id': -1, 'data': {'status': 'отвечено'}})
+    crashed.close()
+
+    storage = make_sqlite_storage(write_behind={'enabled': True, 'journal_dir': directory, 'fsync': False})
+    assert wait_until(lambda: storage.write_buffer.get_stats()['recovered'] == 2)
+
+    assert [row['status'] for row in storage.get_appeals()] == ['отвечено']
+    assert not os.path.exists(crashed.path)
+
+
+def skip_ids_after_each_insert(storage):
+    """Как auto_increment_increment = 2: после каждой вставленной строки один ID пропускается"""
+    with storage.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TRIGGER skip_appeal_ids AFTER INSERT ON appeals WHEN NEW.user_id != 'gap' BEGIN
+                INSERT INTO appeals (user_id, text) VALUES ('gap', 'gap');
+                DELETE FROM appeals WHERE user_id = 'gap';
+            END
+        """)
+        cursor.close()
+    storage.consecutive_insert_ids = False
+
+
+def test_batch_ids_are_exact_when_ids_are_not_consecutive(storage):
+    skip_ids_after_each_insert(storage)
+    version = storage.get_changes()['seq']
+
+    ids = storage.store_appeals([appeal(number, hours_ago=1, text=f'Обращение номер{number}') for number in range(4)])
+
+    assert len(set(ids)) == 4
+    assert ids[1] - ids[0] == 2
+    stored = {row['id']: row['text'] for row in storage.get_appeals()}
+    assert {appeal_id: stored[appeal_id] for appeal_id in ids} == {
+        appeal_id: f'Обращение номер{number}' for number, appeal_id in enumerate(ids)
+    }
+    stats = storage.get_real_time_stats()
+    assert (stats['total'], stats['last_24h'], stats['status_stats']) == (4, 4, {'новое': 4})
+    assert sorted(row['id'] for row in storage.get_changes(since=version)['appeals']) == sorted(ids)
+    assert [row['id'] for row in storage.search_appeals('номер2')['appeals']] == [ids[2]]
+
+
+def test_write_behind_batch_ids_are_exact_when_ids_are_not_consecutive(make_sqlite_storage, tmp_path):
+    storage = make_sqlite_storage(write_behind={'enabled': True, 'journal_dir': str(tmp_path / 'journal'),
+                                                'fsync': False, 'max_delay_ms': 10000})
+    skip_ids_after_each_insert(storage)
+    refs = [storage.store_appeal(appeal(number, 1, text=f'Обращение {number}')) for number in range(3)]
+    storage.update_appeal(refs[1], {'status': 'отвечено', 'response': 'Ответ'})
+    assert storage.flush_writes(5)
+
+    stored = {row['text']: row['status'] for row in storage.get_appeals()}
+    assert stored == {'Обращение 0': 'новое', 'Обращение 1': 'отвечено', 'Обращение 2': 'новое'}
+
+
+@pytest.mark.parametrize('ids, ranges', [
+    ([], []),
+    ([5], [(5, 5)]),
+    ([1, 2, 3], [(1, 3)]),
+    ([1, 3, 5], [(1, 1), (3, 3), (5, 5)]),
+    ([7, 1, 2, 8, 4], [(1, 2), (4, 4), (7, 8)]),
+])
+def test_id_ranges(ids, ranges):
+    assert SQLiteDatabaseManager._id_ranges(ids) == ranges
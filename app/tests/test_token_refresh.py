@@ -0,0 +1,232 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from gigachat.async_client import AsyncGigaChatClient
+
+real_sleep = asyncio.sleep
+
+
+class OAuthServer:
+    """Обработчик MockTransport для OAuth: отвечает по очереди заданными ответами,
+    последний повторяется. Ответ 'hang' ждет, пока запрос не будет отменен."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses) or [200]
+        self.requests = []
+        self.hanging = asyncio.Event()
+
+    async def __call__(self, request):
+        self.requests.append(request)
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if response == 'hang':
+            self.hanging.set()
+            await asyncio.Event().wait()
+        if response == 'error':
+            raise httpx.ConnectError("нет соединения", request=request)
+        if response == 200:
+            return httpx.Response(200, json={'access_token': f'token-{len(self.requests)}', 'expires_in': 1800})
+        return httpx.Response(response, text='ошибка')
+
+
+class FakeSleep:
+    """Замена asyncio.sleep в цикле обновления: записывает паузы и не ждет их.
+    После limit пауз цикл останавливается на ожидании, как на длинной паузе;
+    on_sleep вызывается перед каждой паузой (например, чтобы «промотать» время)."""
+
+    def __init__(self, limit, on_sleep=None):
+        self.limit = limit
+        self.on_sleep = on_sleep
+        self.delays = []
+        self.parked = asyncio.Event()
+
+    async def __call__(self, seconds):
+        self.delays.append(seconds)
+        if len(self.delays) >= self.limit:
+            self.parked.set()
+            await asyncio.Event().wait()
+        if self.on_sleep is not None:
+            self.on_sleep(seconds)
+        await real_sleep(0)
+
+
+def make_client(server, monkeypatch, sleep, **http_config):
+    monkeypatch.setattr('gigachat.async_client.asyncio.sleep', sleep)
+    client = AsyncGigaChatClient('key', http_config=http_config)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(server))
+    client._auth_lock = asyncio.Lock()
+    return client
+
+
+def run(scenario):
+    async def with_timeout():
+        return await asyncio.wait_for(scenario(), 5)
+    return asyncio.run(with_timeout())
+
+
+def test_first_token_is_fetched_at_start_and_refreshed_ahead_of_expiry(monkeypatch):
+    async def scenario():
+        server = OAuthServer(200)
+        sleep = FakeSleep(limit=1)
+        client = make_client(server, monkeypatch, sleep, token_refresh_ahead=600)
+
+        started = datetime.now()
+        await client.start()
+        await sleep.parked.wait()
+
+        assert len(server.requests) == 1
+        assert client.access_token == 'token-1'
+        # Токен действует expires_in - 300 с, обновление - за refresh_ahead до этого
+        assert client.token_expires - started >= timedelta(seconds=1500)
+        assert client.refresh_at == client.token_expires - timedelta(seconds=600)
+        assert 899 <= sleep.delays[0] <= 900
+
+        await client.aclose()
+
+    run(scenario)
+
+
+def test_token_is_refreshed_when_refresh_time_comes(monkeypatch):
+    async def scenario():
+        server = OAuthServer(200)
+        client = None
+
+        def time_passes(seconds):
+            # Пауза до refresh_at «прошла»
+            client.refresh_at = datetime.now() - timedelta(seconds=1)
+
+        sleep = FakeSleep(limit=3, on_sleep=time_passes)
+        client = make_client(server, monkeypatch, sleep)
+
+        await client.start()
+        await sleep.parked.wait()
+
+        assert len(server.requests) == 3
+        assert client.access_token == 'token-3'
+        await client.aclose()
+
+    run(scenario)
+
+
+def test_refresh_is_skipped_if_token_was_renewed_meanwhile(monkeypatch):
+    async def scenario():
+        server = OAuthServer(200)
+        sleep = FakeSleep(limit=3)
+        client = make_client(server, monkeypatch, sleep)
+
+        await client.start()
+        await sleep.parked.wait()
+
+        # Паузы до refresh_at не прошли по-настоящему: повторного запроса нет
+        assert len(server.requests) == 1
+        await client.aclose()
+
+    run(scenario)
+
+
+def test_failed_refresh_backs_off_exponentially_up_to_limit(monkeypatch):
+    async def scenario():
+        server = OAuthServer(500, 'error', 401)
+        sleep = FakeSleep(limit=7)
+        client = make_client(server, monkeypatch, sleep, token_refresh_max_backoff=10)
+
+        await client.start()
+        await sleep.parked.wait()
+
+        assert sleep.delays == [1, 2, 4, 8, 10, 10, 10]
+        assert len(server.requests) == 7
+        assert client.access_token is None
+        await client.aclose()
+
+    run(scenario)
+
+
+def test_backoff_resets_after_successful_refresh_and_old_token_is_kept(monkeypatch):
+    async def scenario():
+        server = OAuthServer(500, 500, 200, 500, 500)
+        client = None
+
+        def time_passes(seconds):
+            if client.refresh_at and seconds > 60:
+                client.refresh_at = datetime.now() - timedelta(seconds=1)
+
+        sleep = FakeSleep(limit=10, on_sleep=time_passes)
+        client = make_client(server, monkeypatch, sleep)
+
+        await client.start()
+        await sleep.parked.wait()
+
+        # Нулевые паузы - ожидание уже наступившего refresh_at
+        delays = [delay for delay in sleep.delays if delay]
+        assert delays[:2] == [1, 2]
+        assert delays[2] > 60
+        assert delays[3:6] == [1, 2, 4]
+        # Неудачное обновление не отменяет действующий токен
+        assert client.access_token == 'token-3'
+        assert client._token_valid()
+        await client.aclose()
+
+    run(scenario)
+
+
+def test_start_is_idempotent(monkeypatch):
+    async def scenario():
+        server = OAuthServer(200)
+        sleep = FakeSleep(limit=1)
+        client = make_client(server, monkeypatch, sleep)
+
+        await client.start()
+        task = client._refresh_task
+        await client.start()
+        assert client._refresh_task is task
+
+        await sleep.parked.wait()
+        assert len(server.requests) == 1
+        await client.aclose()
+
+    run(scenario)
+
+
+def test_aclose_cancels_refresh_waiting_for_next_refresh(monkeypatch):
+    async def scenario():
+        sleep = FakeSleep(limit=1)
+        client = make_client(OAuthServer(200), monkeypatch, sleep)
+        await client.start()
+        task = client._refresh_task
+        await sleep.parked.wait()
+
+        await client.aclose()
+
+        assert task.cancelled()
+        assert client._refresh_task is None
+        assert client._client is None
+
+    run(scenario)
+
+
+def test_aclose_cancels_refresh_during_oauth_request(monkeypatch):
+    async def scenario():
+        server = OAuthServer('hang')
+        client = make_client(server, monkeypatch, FakeSleep(limit=1))
+        await client.start()
+        task = client._refresh_task
+        await server.hanging.wait()
+
+        await client.aclose()
+
+        assert task.cancelled()
+        assert client.access_token is None
+        assert client._client is None
+
+    run(scenario)
+
+
+def test_aclose_without_start_closes_client(monkeypatch):
+    async def scenario():
+        client = make_client(OAuthServer(200), monkeypatch, FakeSleep(limit=1))
+        await client.aclose()
+        assert client._client is None
+
+    run(scenario)
@@ -0,0 +1,163 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from conftest import wait_until
+from database.write_behind import JOURNAL_SUFFIX, WriteBehindBuffer, WriteJournal
+
+
+class FakeStorage:
+    """flush_batch с назначением настоящих ID, как у DatabaseManager._flush_write_batch"""
+
+    def __init__(self, first_id=100):
+        self.next_id = first_id
+        self.appeals = {}
+        self.batches = []
+
+    def flush_batch(self, operations, journal_name=None, resolved=None):
+        self.batches.append((journal_name, [operation['seq'] for operation in operations], dict(resolved or {})))
+        new_ids = {}
+        for operation in operations:
+            if operation['op'] == 'insert':
+                new_ids[operation['ref']] = self.next_id
+                self.appeals[self.next_id] = dict(operation['data'])
+                self.next_id += 1
+            else:
+                appeal_id = operation['appeal_id']
+                if appeal_id < 0:
+                    appeal_id = new_ids.get(appeal_id) or resolved[appeal_id]
+                self.appeals[appeal_id].update(operation['data'])
+        return new_ids
+
+
+def write_crashed_journal(directory, operations, name='appeals-1-1'):
+    """Журнал процесса, завершившегося до записи своих операций в базу"""
+    journal = WriteJournal(directory, fsync=False)
+    journal.name, journal.path = name, os.path.join(directory, name + JOURNAL_SUFFIX)
+    journal.open()
+    for operation in operations:
+        journal.append(operation)
+    journal.close()
+    return journal
+
+
+@pytest.fixture
+def storage():
+    return FakeStorage()
+
+
+def test_insert_returns_temporary_negative_ids(storage):
+    buffer = WriteBehindBuffer(storage.flush_batch, max_delay_ms=10000)
+    try:
+        assert buffer.submit_insert({'text': 'первое'}) == -1
+        assert buffer.submit_insert({'text': 'второе'}) == -2
+        assert storage.appeals == {}
+        assert buffer.flush(5)
+        assert storage.appeals == {100: {'text': 'первое'}, 101: {'text': 'второе'}}
+    finally:
+        buffer.close()
+
+
+def test_update_by_temporary_id_after_flush(storage):
+    buffer = WriteBehindBuffer(storage.flush_batch, max_delay_ms=10000)
+    try:
+        ref = buffer.submit_insert({'text': 'обращение', 'status': 'новое'})
+        assert buffer.flush(5)
+
+        buffer.submit_update(ref, {'status': 'отвечено'})
+        assert buffer.flush(5)
+
+        # Второй пакет получает соответствие временного ID настоящему из первого
+        assert storage.batches[-1][2] == {ref: 100}
+        assert storage.appeals[100]['status'] == 'отвечено'
+    finally:
+        buffer.close()
+
+
+def test_batch_is_written_at_max_rows(storage):
+    buffer = WriteBehindBuffer(storage.flush_batch, max_rows=3, max_delay_ms=10000)
+    try:
+        for number in range(3):
+            buffer.submit_insert({'text': str(number)})
+        assert wait_until(lambda: len(storage.appeals) == 3)
+        assert [seqs for _, seqs, _ in storage.batches] == [[1, 2, 3]]
+    finally:
+        buffer.close()
+
+
+def test_failed_batch_is_retried(storage):
+    calls = []
+
+    def flaky(operations, journal_name=None, resolved=None):
+        calls.append(len(operations))
+        if len(calls) == 1:
+            raise RuntimeError("база недоступна")
+        return storage.flush_batch(operations, journal_name, resolved)
+
+    buffer = WriteBehindBuffer(flaky, max_delay_ms=0, retry_interval=0.01)
+    try:
+        buffer.submit_insert({'text': 'обращение'})
+        assert buffer.flush(5)
+        assert storage.appeals == {100: {'text': 'обращение'}}
+        assert buffer.get_stats()['failures'] == 1
+    finally:
+        buffer.close()
+
+
+def test_journal_is_cleared_after_flush(tmp_path, storage):
+    journal = WriteJournal(str(tmp_path), fsync=False)
+    buffer = WriteBehindBuffer(storage.flush_batch, journal=journal, max_delay_ms=10000)
+    buffer.submit_insert({'text': 'обращение'})
+    assert os.path.getsize(journal.path) > 0
+
+    assert buffer.flush(5)
+    assert os.path.getsize(journal.path) == 0
+    assert storage.batches[0][0] == journal.name
+
+    assert buffer.close()
+    assert not os.path.exists(journal.path)
+
+
+def test_orphaned_journal_is_recovered(tmp_path, storage):
+    created_at = datetime(2024, 5, 1, 9, 30)
+    crashed = write_crashed_journal(str(tmp_path), [
+        {'op': 'insert', 'seq': 1, 'ref': -1, 'data': {'text': 'обращение', 'created_at': created_at}},
+        {'op': 'update', 'seq': 2, 'appeal_id': -1, 'data': {'status': 'отвечено'}}
+    ])
+
+    forgotten = []
+    buffer = WriteBehindBuffer(
+        storage.flush_batch, journal=WriteJournal(str(tmp_path), fsync=False), forget_journal=forgotten.append
+    )
+    try:
+        assert wait_until(lambda: buffer.get_stats()['recovered'] == 2)
+        assert storage.batches[0][:2] == (crashed.name, [1, 2])
+        assert storage.appeals == {100: {'text': 'обращение', 'created_at': created_at, 'status': 'отвечено'}}
+        assert forgotten == [crashed.name]
+        assert not os.path.exists(crashed.path)
+    finally:
+        buffer.close()
+
+
+def test_truncated_journal_line_is_skipped(tmp_path, storage):
+    crashed = write_crashed_journal(str(tmp_path), [{'op': 'insert', 'seq': 1, 'ref': -1, 'data': {'text': 'обращение'}}])
+    with open(crashed.path, 'a', encoding='utf-8') as file:
+        file.write('{"op": "insert", "seq": 2, "ref"')
+
+    buffer = WriteBehindBuffer(storage.flush_batch, journal=WriteJournal(str(tmp_path), fsync=False))
+    try:
+        assert wait_until(lambda: buffer.get_stats()['recovered'] == 1)
+        assert storage.appeals == {100: {'text': 'обращение'}}
+    finally:
+        buffer.close()
+
+
+def test_locked_journal_is_not_recovered(tmp_path, storage):
+    running = WriteJournal(str(tmp_path), fsync=False)
+    running.open()
+    try:
+        assert WriteJournal(str(tmp_path), fsync=False).orphans() == []
+        assert [name for name in os.listdir(tmp_path) if name.endswith(JOURNAL_SUFFIX)] == [running.name + JOURNAL_SUFFIX]
+    finally:
+        running.close(remove=True)
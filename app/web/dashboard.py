@@ -1,7 +1,8 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
 import json
 from datetime import datetime, timedelta
 import logging
+from database.export import resolve_export_columns, stream_csv, stream_jsonl, EXPORT_FORMATS
 
 logger = logging.getLogger(__name__)
 
@@ -88,6 +89,18 @@ def create_dashboard_app(appeals_system):
             if 'status' in request.args:
                 filters['status'] = request.args.get('status')
             
+            # Курсорный режим: ?cursor= (пустой для первой страницы), ответ содержит next_cursor.
+            # Параметр page оставлен только для совместимости со старыми клиентами.
+            if 'cursor' in request.args:
+                cursor = request.args.get('cursor') or None
+                logger.info(f"📝 Запрос обращений по курсору (лимит {limit})")
+                try:
+                    result = system.database.get_appeals_page(filters, limit, cursor)
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+                logger.info(f"📝 Возвращаем обращения: {len(result['appeals'])} записей")
+                return jsonify(result)
+            
             logger.info(f"📝 Запрос обращений (страница {page}, лимит {limit})")
             appeals = system.database.get_appeals(filters, limit, offset)
             
@@ -130,6 +143,75 @@ def create_dashboard_app(appeals_system):
             logger.error(f"❌ Ошибка получения обращений: {e}")
             return jsonify({"error": "Ошибка получения обращений"}), 500
 
+    @app.route('/api/appeals/search')
+    def search_appeals():
+        """Полнотекстовый поиск обращений: ?q=, необязательные type, status, limit и cursor"""
+        try:
+            query = request.args.get('q', '').strip()
+            if not query:
+                return jsonify({"error": "Не задан поисковый запрос (параметр q)"}), 400
+            
+            limit = min(request.args.get('limit', 20, type=int), 100)
+            filters = {}
+            if 'type' in request.args:
+                filters['type'] = request.args.get('type')
+            if 'status' in request.args:
+                filters['status'] = request.args.get('status')
+            
+            logger.info(f"🔎 Поиск обращений: '{query}' (лимит {limit})")
+            try:
+                result = system.database.search_appeals(query, filters, request.args.get('cursor') or None, limit)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            return jsonify(result)
+            
+        except Exception as e:
+            logger.error(f"❌ Ошибка поиска обращений: {e}")
+            return jsonify({"error": "Ошибка поиска обращений"}), 500
+
+    @app.route('/api/export')
+    def export_appeals():
+        """Потоковая выгрузка обращений: ?format=csv|jsonl, columns=a,b,c,
+        необязательные type, status, date_from, date_to (ГГГГ-ММ-ДД)"""
+        try:
+            export_format = request.args.get('format', 'csv').lower()
+            if export_format not in EXPORT_FORMATS:
+                return jsonify({"error": f"Неизвестный формат выгрузки: {export_format}"}), 400
+            
+            try:
+                columns = resolve_export_columns(request.args.get('columns'))
+                filters = {}
+                for key in ('type', 'status'):
+                    if key in request.args:
+                        filters[key] = request.args.get(key)
+                for key in ('date_from', 'date_to'):
+                    if key in request.args:
+                        filters[key] = datetime.strptime(request.args.get(key), '%Y-%m-%d')
+                if 'date_to' in filters:
+                    # Дата окончания включительно
+                    filters['date_to'] += timedelta(days=1) - timedelta(microseconds=1)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            logger.info(f"📤 Выгрузка обращений в {export_format}: {', '.join(columns)}")
+            rows = system.database.iter_appeals(columns, filters)
+            if export_format == 'csv':
+                body, mimetype = stream_csv(rows, columns), 'text/csv; charset=utf-8'
+            else:
+                body, mimetype = stream_jsonl(rows, columns), 'application/x-ndjson; charset=utf-8'
+            
+            filename = f"appeals_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+            return Response(
+                stream_with_context(body),
+                mimetype=mimetype,
+                headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+            )
+            
+        except Exception as e:
+            logger.error(f"❌ Ошибка выгрузки обращений: {e}")
+            return jsonify({"error": "Ошибка выгрузки обращений"}), 500
+
     @app.route('/api/realtime_stats')
     def get_realtime_stats():
         """Новый endpoint для получения реальной статистики"""
@@ -298,6 +380,73 @@ def create_dashboard_app(appeals_system):
             logger.error(f"❌ Ошибка получения статистики по типам обращений: {e}")
             return jsonify({"error": "Ошибка получения статистики по типам обращений"}), 500
 
+    @app.route('/api/changes')
+    def get_changes():
+        """Изменения после версии ?since= для инкрементального обновления страницы:
+        новые и измененные обращения и приращения статистики. Без since - только текущая версия."""
+        try:
+            since = request.args.get('since', type=int)
+            limit = min(request.args.get('limit', 500, type=int), 1000)
+            return jsonify(system.database.get_changes(since, limit))
+        except Exception as e:
+            logger.error(f"❌ Ошибка получения изменений: {e}")
+            return jsonify({"error": "Ошибка получения изменений"}), 500
+
+    @app.route('/api/sla_stats')
+    def get_sla_stats():
+        """Время до ответа по районам и типам обращений: медиана, p90 и p99 (в секундах)"""
+        try:
+            period = request.args.get('period', 30, type=int)
+            logger.info(f"⏱️ Запрос статистики времени до ответа за {period} дней")
+            stats = system.database.get_response_time_stats(period)
+            if not stats:
+                return jsonify({"error": "Ошибка получения статистики времени до ответа"}), 500
+            return jsonify(stats)
+        except Exception as e:
+            logger.error(f"❌ Ошибка получения статистики времени до ответа: {e}")
+            return jsonify({"error": "Ошибка получения статистики времени до ответа"}), 500
+
+    @app.route('/api/pool_stats')
+    def get_pool_stats():
+        """Метрики пула соединений с базой данных"""
+        try:
+            return jsonify(system.database.get_pool_stats())
+        except Exception as e:
+            logger.error(f"❌ Ошибка получения метрик пула соединений: {e}")
+            return jsonify({"error": "Ошибка получения метрик пула соединений"}), 500
+
+    @app.route('/api/query_stats')
+    def get_query_stats():
+        """Задержки запросов к базе по методам, ожидание соединений и медленные запросы"""
+        try:
+            slow_limit = request.args.get('slow_limit', 20, type=int)
+            return jsonify(system.database.get_query_stats(slow_limit))
+        except Exception as e:
+            logger.error(f"❌ Ошибка получения метрик запросов: {e}")
+            return jsonify({"error": "Ошибка получения метрик запросов"}), 500
+
+    @app.route('/api/cache_stats')
+    def get_cache_stats():
+        """Метрики кэша результатов статистики"""
+        try:
+            return jsonify(system.database.get_cache_stats())
+        except Exception as e:
+            logger.error(f"❌ Ошибка получения метрик кэша: {e}")
+            return jsonify({"error": "Ошибка получения метрик кэша"}), 500
+
+    @app.route('/api/gigachat_stats')
+    def get_gigachat_stats():
+        """Очереди и ожидание в планировщике запросов к GigaChat, состояние выключателя, переиспользование соединений"""
+        try:
+            return jsonify({
+                'scheduler': system.scheduler.get_stats() if system.scheduler else None,
+                'circuit_breaker': system.circuit_breaker.get_stats(),
+                'http': system.gigachat.get_http_stats()
+            })
+        except Exception as e:
+            logger.error(f"❌ Ошибка получения метрик GigaChat: {e}")
+            return jsonify({"error": "Ошибка получения метрик GigaChat"}), 500
+
     @app.route('/api/update_appeal/<int:appeal_id>', methods=['POST'])
     def update_appeal(appeal_id):
         try: